@@ -0,0 +1,392 @@
+"""Report aggregation over month partitions, in parallel for long histories.
+
+The trend and category reports only need per-task sums, so history is
+split into partitions that are reduced independently: every archive
+segment (one creation month of one compaction run, see archive.py) and
+the hot tasks of each creation month. Each partition becomes a Partial
+holding, per (creation day, category), the sums and counts the reports
+use plus a RatioSketch of per-task efficiency. Partials merge by adding
+cells, which is associative and commutative, so they can be reduced in
+any order as workers finish.
+
+Large histories are reduced on a process pool: workers read and decode
+archive segments themselves, so only the small Partials cross the process
+boundary, and hot tasks are shipped as slim row tuples. Small histories
+are reduced inline, where starting work on the pool costs more than it
+saves. A cancel event stops a reduction between partitions; queued
+partitions are dropped and CancelledError is raised.
+
+Trend charts over long windows are downsampled here before anything is
+drawn: downsample() adds per-day sums up into week, month or year buckets,
+with bucket_unit() picking the finest unit that keeps a window under
+CHART_POINTS buckets.
+
+Side-by-side windows (last 7, 30, 90 and 365 days, and the same periods a
+year earlier) come from one aggregation over the longest span: a
+WindowIndex turns its Partial into per-category prefix sums over the
+sorted days, so each further window is two bisections and a subtraction.
+"""
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ProcessPoolExecutor, wait
+from datetime import date, timedelta
+
+import archive
+from schema import parse_time_to_minutes
+
+PARALLEL_MIN_TASKS = 20000  # Smaller histories are reduced inline
+CANCEL_POLL = 0.1  # Seconds between cancel checks while waiting on workers
+SKETCH_ACCURACY = 0.02  # Relative error of RatioSketch quantiles
+CHART_POINTS = 120  # Buckets a downsampled trend window stays under
+
+# Bucket units from finest to coarsest, with their approximate length in days
+BUCKET_UNITS = {"day": 1, "week": 7, "month": 30.44, "year": 365.25}
+
+# Cell layout: sums and counts over all tasks, then over tracked tasks
+# (time spent or an estimate set), then the efficiency sketch
+ESTIMATED, ACTUAL, TASKS, COMPLETED, TRACKED, TRACKED_COMPLETED, SKETCH = range(7)
+
+class RatioSketch:
+    """Mergeable quantile sketch of positive ratios with bounded relative error.
+    
+    Values are counted in logarithmic buckets, so merging two sketches is
+    adding their counts and a quantile is within SKETCH_ACCURACY of the
+    exact one.
+    """
+    __slots__ = ("counts",)
+    GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+    
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+    
+    def add(self, ratio):
+        bucket = math.ceil(math.log(ratio) / self.LOG_GAMMA)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+    
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        return self
+    
+    def __len__(self):
+        return sum(self.counts.values())
+    
+    def quantile(self, q):
+        """Approximate q-quantile (0..1), or None when empty"""
+        total = len(self)
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen > rank:
+                break
+        return 2 * self.GAMMA ** bucket / (self.GAMMA + 1)
+
+class Partial:
+    """Report sums for a set of tasks, keyed by (creation day, category)"""
+    __slots__ = ("cells",)
+    
+    def __init__(self):
+        self.cells = {}
+    
+    def add(self, day, category, estimated_time, time_spent, completed, minutes_cache=None):
+        """Count one task; minutes_cache memoizes estimate parsing within a partition"""
+        if minutes_cache is None:
+            estimated = parse_time_to_minutes(estimated_time)
+        else:
+            estimated = minutes_cache.get(estimated_time)
+            if estimated is None:
+                estimated = minutes_cache[estimated_time] = parse_time_to_minutes(estimated_time)
+        cell = self.cells.get((day, category))
+        if cell is None:
+            cell = self.cells[(day, category)] = [0, 0, 0, 0, 0, 0, None]
+        cell[ESTIMATED] += estimated
+        cell[ACTUAL] += time_spent
+        cell[TASKS] += 1
+        if completed:
+            cell[COMPLETED] += 1
+        if time_spent > 0 or estimated_time:
+            cell[TRACKED] += 1
+            if completed:
+                cell[TRACKED_COMPLETED] += 1
+        if completed and estimated > 0 and time_spent > 0:
+            if cell[SKETCH] is None:
+                cell[SKETCH] = RatioSketch()
+            cell[SKETCH].add(time_spent / estimated)
+    
+    def merge(self, other):
+        """Add other's cells to this partial and return it"""
+        for key, cell in other.cells.items():
+            mine = self.cells.get(key)
+            if mine is None:
+                mine = self.cells[key] = [0, 0, 0, 0, 0, 0, None]
+            for i in range(SKETCH):
+                mine[i] += cell[i]
+            if cell[SKETCH] is not None:
+                if mine[SKETCH] is None:
+                    mine[SKETCH] = RatioSketch()
+                mine[SKETCH].merge(cell[SKETCH])
+        return self
+    
+    def _window(self, start, end):
+        start, end = start.isoformat(), end.isoformat()
+        return ((key, cell) for key, cell in self.cells.items() if start <= key[0] <= end)
+    
+    def daily(self, start, end):
+        """Sums per creation day between start and end (dates, inclusive), in day order"""
+        days = {}
+        for (day, _), cell in self._window(start, end):
+            totals = days.setdefault(day, {"estimated": 0, "actual": 0, "tasks": 0, "completed": 0})
+            totals["estimated"] += cell[ESTIMATED]
+            totals["actual"] += cell[ACTUAL]
+            totals["tasks"] += cell[TASKS]
+            totals["completed"] += cell[COMPLETED]
+        return dict(sorted(days.items()))
+    
+    def by_category(self, start, end):
+        """Sums per category over tracked tasks created between start and end, most time first"""
+        categories = {}
+        sketches = {}
+        for (_, category), cell in self._window(start, end):
+            if not cell[TRACKED]:
+                continue
+            totals = categories.setdefault(category, {"estimated": 0, "actual": 0, "tasks": 0, "completed": 0})
+            totals["estimated"] += cell[ESTIMATED]
+            totals["actual"] += cell[ACTUAL]
+            totals["tasks"] += cell[TRACKED]
+            totals["completed"] += cell[TRACKED_COMPLETED]
+            if cell[SKETCH] is not None:
+                sketches.setdefault(category, RatioSketch()).merge(cell[SKETCH])
+        for category, totals in categories.items():
+            sketch = sketches.get(category)
+            totals["median_efficiency"] = sketch.quantile(0.5) * 100 if sketch else None
+        return dict(sorted(categories.items(), key=lambda item: item[1]["actual"], reverse=True))
+
+class WindowIndex:
+    """Prefix sums of a Partial over its sorted creation days, per category.
+    
+    A day range's sums are the difference of two prefix sums. Sketches
+    cannot be subtracted, so a range's median merges the sketches of the
+    days inside it instead.
+    """
+    __slots__ = ("days", "sums", "sketches")
+    
+    def __init__(self, partial):
+        self.days = sorted({day for day, _ in partial.cells})
+        position = {day: i for i, day in enumerate(self.days)}
+        columns = {}
+        self.sketches = {}
+        for (day, category), cell in partial.cells.items():
+            column = columns.get(category)
+            if column is None:
+                column = columns[category] = [[0] * len(self.days) for _ in range(SKETCH)]
+            i = position[day]
+            for field in range(SKETCH):
+                column[field][i] = cell[field]
+            if cell[SKETCH] is not None:
+                self.sketches.setdefault(category, []).append((i, cell[SKETCH]))
+        # sums[category][field][i] is the field's total over days[:i]
+        self.sums = {category: [[0, *itertools.accumulate(values)] for values in column]
+                     for category, column in columns.items()}
+        for entries in self.sketches.values():
+            entries.sort(key=lambda entry: entry[0])
+    
+    def _range(self, start, end):
+        return bisect_left(self.days, start.isoformat()), bisect_right(self.days, end.isoformat())
+    
+    def totals(self, start, end):
+        """Sums over every task created between start and end (dates, inclusive)"""
+        lo, hi = self._range(start, end)
+        totals = {"estimated": 0, "actual": 0, "tasks": 0, "completed": 0}
+        for sums in self.sums.values():
+            totals["estimated"] += sums[ESTIMATED][hi] - sums[ESTIMATED][lo]
+            totals["actual"] += sums[ACTUAL][hi] - sums[ACTUAL][lo]
+            totals["tasks"] += sums[TASKS][hi] - sums[TASKS][lo]
+            totals["completed"] += sums[COMPLETED][hi] - sums[COMPLETED][lo]
+        return totals
+    
+    def by_category(self, start, end):
+        """What Partial.by_category returns for the same range"""
+        lo, hi = self._range(start, end)
+        categories = {}
+        for category, sums in self.sums.items():
+            tracked = sums[TRACKED][hi] - sums[TRACKED][lo]
+            if not tracked:
+                continue
+            sketch = RatioSketch()
+            for i, day_sketch in self.sketches.get(category, ()):
+                if lo <= i < hi:
+                    sketch.merge(day_sketch)
+            median = sketch.quantile(0.5)
+            categories[category] = {
+                "estimated": sums[ESTIMATED][hi] - sums[ESTIMATED][lo],
+                "actual": sums[ACTUAL][hi] - sums[ACTUAL][lo],
+                "tasks": tracked,
+                "completed": sums[TRACKED_COMPLETED][hi] - sums[TRACKED_COMPLETED][lo],
+                "median_efficiency": median * 100 if median is not None else None
+            }
+        return dict(sorted(categories.items(), key=lambda item: item[1]["actual"], reverse=True))
+
+def year_earlier(day):
+    """The same date a year before; 29 February becomes the 28th"""
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        return day.replace(year=day.year - 1, day=28)
+
+def windows(tasks, directory, lengths, end, last_year=False, workers=None, cancel=None):
+    """Totals and categories of the trailing windows of each length (days) ending on end.
+    
+    Every window comes from one aggregation over the longest span. With
+    last_year, that span reaches back a further year and each window also
+    carries the same dates a year earlier under "last_year".
+    """
+    start = end - timedelta(days=max(lengths) - 1)
+    since = year_earlier(start) if last_year else start
+    index = WindowIndex(aggregate(tasks, directory, since.isoformat(), end.isoformat(), workers, cancel))
+    
+    def window(start, end):
+        return {"start": start, "end": end, "totals": index.totals(start, end),
+                "by_category": index.by_category(start, end)}
+    
+    result = {}
+    for days in lengths:
+        start = end - timedelta(days=days - 1)
+        result[days] = window(start, end)
+        if last_year:
+            result[days]["last_year"] = window(year_earlier(start), year_earlier(end))
+    return result
+
+def bucket_unit(days, max_points=CHART_POINTS):
+    """Finest bucket unit that covers a window of days in at most max_points buckets"""
+    for unit, length in BUCKET_UNITS.items():
+        if days / length <= max_points:
+            return unit
+    return unit
+
+def bucket_of(day, unit):
+    """First day of the bucket holding a YYYY-MM-DD day; weeks start on Monday"""
+    if unit == "day":
+        return day
+    if unit == "month":
+        return day[:8] + "01"
+    if unit == "year":
+        return day[:5] + "01-01"
+    start = date.fromisoformat(day)
+    return (start - timedelta(days=start.weekday())).isoformat()
+
+def downsample(daily, unit):
+    """Per-day sums (as from Partial.daily) added up per bucket, in bucket order"""
+    if unit == "day":
+        return daily
+    buckets = {}
+    for day, totals in daily.items():
+        key = bucket_of(day, unit)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = dict.fromkeys(totals, 0)
+        for field, value in totals.items():
+            bucket[field] += value
+    return dict(sorted(buckets.items()))
+
+def in_window(day, since, until):
+    """Whether a YYYY-MM-DD day lies between since and until (either may be None)"""
+    return not (since and day < since or until and day > until)
+
+def rows_partial(rows):
+    """Partial of hot task rows (day, category, estimated_time, time_spent, completed)"""
+    partial = Partial()
+    minutes_cache = {}
+    for row in rows:
+        partial.add(*row, minutes_cache)
+    return partial
+
+def segment_partial(directory, name, since=None, until=None, exclude_ids=()):
+    """Partial of one archive segment, skipping tasks that are still hot"""
+    partial = Partial()
+    minutes_cache = {}
+    exclude = set(exclude_ids)
+    # Streamed rather than cached: each worker would otherwise hold its own copies
+    for task in archive.scan_segment(directory, name):
+        day = task["created_at"][:10]
+        if in_window(day, since, until) and task["id"] not in exclude:
+            partial.add(day, task["category"], task["estimated_time"], task["time_spent"],
+                        task["completed"], minutes_cache)
+    return partial
+
+def partitions(tasks, directory, since=None, until=None):
+    """(function, args, size) for every partition holding tasks created since..until.
+    
+    since and until are YYYY-MM-DD strings or None. Hot tasks become one row
+    partition per creation month; archived copies of hot ids are excluded.
+    """
+    months = {}
+    hot_ids = []
+    for task in tasks:
+        hot_ids.append(task["id"])
+        day = task["created_at"][:10]
+        if in_window(day, since, until):
+            months.setdefault(day[:7], []).append(
+                (day, task["category"], task["estimated_time"], task["time_spent"], task["completed"]))
+    hot_ids.sort()
+    
+    parts = [(rows_partial, (rows,), len(rows)) for rows in months.values()]
+    for segment in archive.load_index(directory)["segments"]:
+        if archive.segment_matches(segment, since, until):
+            # Only hot ids in the segment's id range can collide with it
+            exclude = hot_ids[bisect_left(hot_ids, segment["min_id"]):bisect_right(hot_ids, segment["max_id"])]
+            parts.append((segment_partial, (directory, segment["file"], since, until, exclude), segment["count"]))
+    return parts
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def pool(workers=None):
+    """The process-wide pool with the given worker count (default: one per CPU)"""
+    workers = workers or os.cpu_count() or 1
+    with _pools_lock:
+        executor = _pools.get(workers)
+        if executor is None:
+            # Spawned workers never inherit the state of a threaded parent
+            executor = _pools[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        return executor
+
+def aggregate(tasks, directory, since=None, until=None, workers=None, cancel=None):
+    """Merged Partial of hot tasks and the archive in directory, created since..until.
+    
+    workers is the process count (default: one per CPU; 1 reduces inline).
+    cancel is an optional threading.Event; once set, outstanding partitions
+    are dropped and CancelledError is raised.
+    """
+    parts = partitions(tasks, directory, since, until)
+    result = Partial()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(parts) < 2 or sum(size for _, _, size in parts) < PARALLEL_MIN_TASKS:
+        for func, args, _ in parts:
+            if cancel is not None and cancel.is_set():
+                raise CancelledError()
+            result.merge(func(*args))
+        return result
+    
+    # Largest partitions first, so no worker is left with a big one at the end
+    parts.sort(key=lambda part: part[2], reverse=True)
+    executor = pool(workers)
+    pending = {executor.submit(func, *args) for func, args, _ in parts}
+    try:
+        while pending:
+            done, pending = wait(pending, CANCEL_POLL, return_when=FIRST_COMPLETED)
+            for future in done:
+                result.merge(future.result())
+            if cancel is not None and cancel.is_set():
+                raise CancelledError()
+    finally:
+        for future in pending:
+            future.cancel()
+    return result
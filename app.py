@@ -4,14 +4,28 @@ import os
 from datetime import datetime, timedelta, date
 import time
 import re
+import itertools
 from pathlib import Path
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import numpy as np
 from collections import defaultdict
 import statistics
+import copy
+
+import aggregate
+import archive
+import carryover
+import changefeed
+import client
+import export
+import jsonstream
+import memdiag
+import metrics
+import profiler
+import query
+import search
+import sessionstore
+import snapshot
+from merge import TaskMerger
+from schema import SCHEMA_VERSION, migrate, migrate_batches, new_data, parse_time_to_minutes, validate_task
 
 # Set page configuration
 st.set_page_config(
@@ -253,6 +267,21 @@ st.markdown("""
 
 # Data file configuration
 DATA_FILE = "taskflow_data.json"
+PROFILE_HISTORY = 10  # Reruns kept in the profiler panel
+COLD_AFTER_DAYS = 45  # Completed tasks older than this form cold partitions
+ARCHIVE_AFTER_DAYS = 90  # Completed or expired tasks older than this are archived
+ARCHIVE_DIR = archive.archive_dir(DATA_FILE)
+SESSION_STORE = f"{DATA_FILE}.sessions"
+SEARCH_INDEX = f"{DATA_FILE}.search"
+TODAY_SNAPSHOT = f"{DATA_FILE}.today"  # Dashboard served on a fresh session's first paint
+PRIORITIES = ("High", "Medium", "Low")
+TREND_WINDOWS = {"7 days": 7, "90 days": 90, "1 year": 365, "All time": None}
+COMPARISON_WINDOWS = (7, 30, 90, 365)  # Trailing windows compared side by side, in days
+WEBGL_POINTS = 60  # Longer trend series are drawn as WebGL lines instead of SVG bars
+MAX_FIGURE_BYTES = 250000  # Trend charts are coarsened until their JSON fits
+IMPORT_BATCH_SIZE = 1000  # Tasks validated and written per import batch
+EXPORT_DIR = "exports"  # Exports are written here before download
+EXPORT_MAX_AGE = 24 * 3600  # Seconds an export left behind by a session is kept
 
 # Initialize session state
 if 'tasks' not in st.session_state:
@@ -265,30 +294,578 @@ if 'max_carryovers' not in st.session_state:
     st.session_state.max_carryovers = 3
 if 'notifications' not in st.session_state:
     st.session_state.notifications = []
+if 'memory_phases' not in st.session_state:
+    st.session_state.memory_phases = {}
+if 'cold_partitions' not in st.session_state:
+    st.session_state.cold_partitions = {}
+if 'cold_dir' not in st.session_state:
+    # Spill files are private to the session that wrote them
+    st.session_state.cold_dir = os.path.join(f"{DATA_FILE}.cold", os.urandom(6).hex())
+
+memdiag.register_cache(
+    "profile_history",
+    lambda: memdiag.deep_sizeof([p.__dict__ for p in st.session_state.get("profile_history", [])]),
+    lambda: st.session_state.get("profile_history", []).clear()
+)
+
+memdiag.register_cache(
+    "query_results",
+    lambda: memdiag.deep_sizeof([r.steps for r in st.session_state.query_cache.results.values()])
+    if "query_cache" in st.session_state else 0,
+    lambda: st.session_state.pop("query_cache", None)
+)
 
+memdiag.register_cache(
+    "change_feed",
+    lambda: memdiag.deep_sizeof(list(data_feed().history)) if data_feed() else 0,
+    lambda: data_feed() and data_feed().history.clear()
+)
+
+memdiag.register_cache(
+    "report_snapshot",
+    lambda: memdiag.deep_sizeof([dict(t) for t in st.session_state.report_snapshot])
+    if "report_snapshot" in st.session_state else 0,
+    lambda: (st.session_state.pop("report_snapshot", None), data_feed() and data_feed().drop_snapshot())
+)
+
+memdiag.register_cache(
+    "archive_segments",
+    lambda: memdiag.deep_sizeof(archive.cached_segments()),
+    archive.clear_cache
+)
+
+def server_sync():
+    """Document sync with a TaskFlow server when $TASKFLOW_SERVER is set, else None"""
+    address = os.environ.get(client.ENV_VAR)
+    if not address:
+        return None
+    if "server_sync" not in st.session_state:
+        st.session_state.server_sync = client.DocumentSync(client.Client(address))
+    return st.session_state.server_sync
+
+def data_feed():
+    """The process-wide change feed for the data file, or None with a server"""
+    if os.environ.get(client.ENV_VAR):
+        return None
+    return changefeed.watch(DATA_FILE)
+
+def source_stamp():
+    """Changes whenever the stored tasks or the archive index change"""
+    stamp = sessionstore.source_stamp(DATA_FILE, os.path.join(ARCHIVE_DIR, archive.INDEX_FILE))
+    sync = server_sync()
+    if sync is not None:
+        stamp[0] = sync.revision
+    return stamp
+
+def memory_phase(name):
+    """Record memory retained by a phase while diagnostics are enabled"""
+    return memdiag.tracked(name, lambda: st.session_state.memory_phases)
+
+@profiler.traced("load_data")
+@memory_phase("load")
+@metrics.timed(metrics.STORAGE_SECONDS, operation="load")
 def load_data():
-    """Load tasks from JSON file"""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-            st.session_state.tasks = data.get("tasks", [])
-            st.session_state.last_carryover_date = data.get("last_carryover_date", datetime.now().strftime("%Y-%m-%d"))
-            st.session_state.max_carryovers = data.get("max_carryovers", 3)
+    """Load tasks from JSON file, upgrading older schema versions once"""
+    sync = server_sync()
+    feed = data_feed()
+    warmup = st.session_state.pop("dashboard_warmup", None)
+    if sync is not None:
+        # The server has already parsed and migrated the file
+        data = sync.load()
+    elif os.path.exists(DATA_FILE):
+        if warmup is not None:
+            # Parsed in the background while the first paint was served
+            st.session_state.feed_version, data = warmup.result()
+        else:
+            st.session_state.feed_version, data = read_data_file()
+        
+        # Older files are migrated and written back, so current files are
+        # used exactly as stored
+        if migrate(data):
+            write_data(data)
     else:
-        st.session_state.tasks = []
-        st.session_state.last_carryover_date = datetime.now().strftime("%Y-%m-%d")
-        st.session_state.max_carryovers = 3
+        st.session_state.feed_version = feed.poll()
+        data = new_data()
+    
+    # Tasks unloaded under memory pressure stay unloaded across reloads. Only
+    # the spilled ids are skipped: a task of a spilled month that was still
+    # open at the time lives in the data file alone
+    if st.session_state.cold_partitions:
+        spilled = set(itertools.chain.from_iterable(p["ids"] for p in st.session_state.cold_partitions.values()))
+        data["tasks"] = [t for t in data["tasks"] if t["id"] not in spilled]
+    
+    st.session_state.tasks = data["tasks"]
+    st.session_state.last_carryover_date = data["last_carryover_date"]
+    st.session_state.max_carryovers = data["max_carryovers"]
+    metrics.record_store(data["tasks"], DATA_FILE)
 
-def save_data():
-    """Save tasks to JSON file"""
-    data = {
+def read_data_file():
+    """(feed version, document) of the local data file"""
+    # Read after the version, so a write in between is applied again, never missed
+    version = data_feed().poll()
+    with open(DATA_FILE, 'r') as f:
+        data = json.load(f)
+        profiler.add_bytes(read=f.tell())
+    return version, data
+
+@profiler.traced("write_data")
+@metrics.timed(metrics.STORAGE_SECONDS, operation="save")
+def write_data(data, extra_tasks=None):
+    """Atomically write a data document to the JSON file.
+    
+    extra_tasks is an optional iterable of tasks appended after
+    data["tasks"] without materializing them all at once (see
+    jsonstream.write_document). If it raises, the data file is untouched.
+    With a server, the server's document is replaced instead.
+    """
+    sync = server_sync()
+    if sync is not None:
+        sync.replace(data, extra_tasks)
+        return
+    
+    tmp_file = f"{DATA_FILE}.tmp"
+    try:
+        with open(tmp_file, 'w') as f:
+            jsonstream.write_document(f, data, extra_tasks)
+            written = f.tell()
+        os.replace(tmp_file, DATA_FILE)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    profiler.add_bytes(written=written)
+    metrics.DATA_FILE_BYTES.set(written)
+    
+    # Other sessions in this process see the write without parsing the file;
+    # streamed tasks are not all in memory, so those writes are read back
+    stamp = changefeed.file_stamp(DATA_FILE)
+    if extra_tasks is None:
+        data_feed().publish(data, stamp)
+        write_today_snapshot(data, stamp)
+    else:
+        # The old today snapshot no longer matches the file's stamp, so it is not served
+        data_feed().poll()
+
+def write_today_snapshot(data, stamp):
+    """Persist today's dashboard for the first paint of the next session"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    with profiler.span("build_today_snapshot"):
+        overview = today_overview(get_todays_tasks(data["tasks"]))
+    snapshot_data = {
+        "date": today,
+        "carryover_date": data["last_carryover_date"],
+        "stamp": list(stamp),
+        "overview": overview
+    }
+    tmp_file = f"{TODAY_SNAPSHOT}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(snapshot_data, f)
+    os.replace(tmp_file, TODAY_SNAPSHOT)
+
+def load_today_snapshot():
+    """Today's persisted dashboard overview, or None if the data file or the day changed since"""
+    try:
+        with open(TODAY_SNAPSHOT, 'r') as f:
+            snapshot_data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    today = datetime.now().strftime("%Y-%m-%d")
+    # Another writer, or a carryover still due today, would change the dashboard
+    if (snapshot_data["date"] != today or snapshot_data["carryover_date"] != today
+            or snapshot_data["stamp"] != list(changefeed.file_stamp(DATA_FILE))):
+        return None
+    return snapshot_data["overview"]
+
+def first_paint_overview():
+    """The persisted dashboard for a fresh local session's first rerun, or None.
+    
+    While it is on screen the data file is parsed in the background, and the
+    next rerun's load_data() takes that result instead of reading the file.
+    """
+    if (os.environ.get(client.ENV_VAR) or "feed_version" in st.session_state
+            or "dashboard_warmup" in st.session_state or st.session_state.current_tab != "Dashboard"):
+        return None
+    overview = load_today_snapshot()
+    if overview is not None:
+        st.session_state.dashboard_warmup = snapshot.executor().submit(read_data_file)
+    return overview
+
+def sync_data():
+    """Apply writes by other sessions and programs since this session last synced.
+    
+    The first call loads the data file. Later calls apply only the tasks the
+    change feed reports as changed; a session that fell too far behind
+    reloads. A task edited here that another writer also changed keeps the
+    stored version. Returns the ids of such conflicts.
+    """
+    feed = data_feed()
+    if feed is None:
+        return []
+    if "feed_version" not in st.session_state:
+        load_data()
+        return []
+    
+    feed.poll()
+    changes = feed.changes_since(st.session_state.feed_version)
+    if changes is None:
+        load_data()
+        add_notification("Reloaded data changed by another window or program", "warning")
+        return []
+    if not changes:
+        return []
+    
+    applied, conflicts = apply_changes(changes)
+    st.session_state.feed_version = changes[-1].version
+    if conflicts:
+        add_notification(f"Task(s) {', '.join(map(str, conflicts))} were changed elsewhere; "
+                         f"kept the saved version", "warning")
+    elif applied:
+        add_notification(f"Loaded {applied} task change(s) from another window or program", "info")
+    return conflicts
+
+def apply_changes(changes):
+    """Apply change feed entries to the loaded tasks; return (applied count, conflicting ids)"""
+    tasks = st.session_state.tasks
+    positions = {t["id"]: i for i, t in enumerate(tasks)}
+    if st.session_state.cold_partitions and any(
+        task_id not in positions and c.before[task_id] is not None for c in changes for task_id in c.tasks
+    ):
+        # A change to a task that may be spilled; bring the partitions back so it is not duplicated
+        reload_cold_partitions()
+        positions = {t["id"]: i for i, t in enumerate(tasks)}
+    
+    applied = 0
+    conflicts = set()
+    for change in changes:
+        for task_id, task in change.tasks.items():
+            i = positions.get(task_id)
+            local = changefeed.task_checksum(tasks[i]) if i is not None else None
+            if local == change.after[task_id]:
+                # Already applied, e.g. this session's own write
+                continue
+            if local != change.before[task_id]:
+                conflicts.add(task_id)
+            applied += 1
+            if task is None:
+                # Deleted slots are dropped after all changes are applied
+                tasks[i] = None
+                del positions[task_id]
+            elif i is None:
+                positions[task_id] = len(tasks)
+                tasks.append(copy.deepcopy(task))
+            else:
+                tasks[i] = copy.deepcopy(task)
+        if "last_carryover_date" in change.meta:
+            st.session_state.last_carryover_date = change.meta["last_carryover_date"]
+        if "max_carryovers" in change.meta:
+            st.session_state.max_carryovers = change.meta["max_carryovers"]
+    
+    if len(positions) < len(tasks):
+        st.session_state.tasks = [t for t in tasks if t is not None]
+    return applied, sorted(conflicts)
+
+def current_data():
+    """The loaded tasks and settings as a data document"""
+    return {
+        "schema_version": SCHEMA_VERSION,
         "tasks": st.session_state.tasks,
         "last_carryover_date": st.session_state.last_carryover_date,
         "max_carryovers": st.session_state.max_carryovers
     }
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
-    add_notification("Data saved successfully", "success")
+
+@profiler.traced("save_data")
+def save_data(notify=True):
+    """Save tasks to JSON file"""
+    sync = server_sync()
+    if sync is not None:
+        # Only changed tasks are sent; spilled cold tasks are unchanged, not deleted
+        sync.save(current_data(), [t["id"] for t in iter_cold_tasks()])
+    else:
+        # Optimistic concurrency: writes that landed since this session last
+        # synced are applied first instead of being overwritten
+        with changefeed.locked(DATA_FILE):
+            sync_data()
+            write_data(current_data(), iter_cold_tasks() if st.session_state.cold_partitions else None)
+            st.session_state.feed_version = data_feed().version
+    metrics.record_store(st.session_state.tasks)
+    if notify:
+        add_notification("Data saved successfully", "success")
+
+def import_stream(stream, total_bytes=0, progress=None, batch_size=IMPORT_BATCH_SIZE):
+    """Replace the data file with an export read incrementally from stream.
+    
+    Tasks are parsed, migrated and validated in batches and written
+    straight through write_data, so memory is bounded by the batch size.
+    progress(fraction, imported) is called after each batch. Returns the
+    number of tasks imported; on error the data file is left unchanged.
+    The file is replaced under the same lock as save_data, so a concurrent
+    read-check-write by another program cannot interleave with it.
+    """
+    data = new_data()
+    imported = 0
+    
+    def imported_tasks():
+        nonlocal imported
+        for batch, meta in migrate_batches(jsonstream.iter_batches(jsonstream.iter_records(stream), batch_size)):
+            for task in batch:
+                validate_task(task)
+            imported += len(batch)
+            if progress and total_bytes:
+                progress(min(stream.tell() / total_bytes, 1.0), imported)
+            yield from batch
+        
+        data.update((key, meta[key]) for key in ("last_carryover_date", "max_carryovers") if key in meta)
+    
+    if server_sync() is not None:
+        write_data(data, imported_tasks())
+    else:
+        with changefeed.locked(DATA_FILE):
+            write_data(data, imported_tasks())
+    return imported
+
+def merge_import_stream(stream, total_bytes=0, progress=None, batch_size=IMPORT_BATCH_SIZE):
+    """Merge an export into the loaded tasks, deduplicating by content hash.
+    
+    Returns the TaskMerger counts. Cold partitions are reloaded first so
+    every local task takes part in deduplication; exact copies of archived
+    tasks are skipped as duplicates.
+    """
+    reload_cold_partitions()
+    merger = TaskMerger(st.session_state.tasks, archived_tasks())
+    for batch, meta in migrate_batches(jsonstream.iter_batches(jsonstream.iter_records(stream), batch_size)):
+        for task in batch:
+            merger.add(validate_task(task))
+        if progress and total_bytes:
+            progress(min(stream.tell() / total_bytes, 1.0), merger.counts["added"] + merger.counts["merged"])
+    return merger.counts
+
+def cold_cutoff():
+    """Creation date before which completed tasks count as cold"""
+    return (datetime.now().date() - timedelta(days=COLD_AFTER_DAYS)).strftime("%Y-%m-%d")
+
+def cold_partition_key(task, cutoff):
+    """Month partition of a cold task, or None if the task is hot"""
+    if task["completed"] and task["created_at"][:10] < cutoff:
+        return task["created_at"][:7]
+    return None
+
+def cold_partition_path(month):
+    return os.path.join(st.session_state.cold_dir, f"{month}.json")
+
+def iter_cold_tasks():
+    """Yield tasks from unloaded partitions, one partition in memory at a time"""
+    for month in sorted(st.session_state.cold_partitions):
+        with open(cold_partition_path(month), 'r') as f:
+            yield from json.load(f)
+
+def unload_cold_partitions():
+    """Spill cold month partitions to disk and drop them from memory"""
+    cutoff = cold_cutoff()
+    partitions = defaultdict(list)
+    hot = []
+    for task in st.session_state.tasks:
+        key = cold_partition_key(task, cutoff)
+        if key is None:
+            hot.append(task)
+        else:
+            partitions[key].append(task)
+    
+    if not partitions:
+        return 0
+    
+    os.makedirs(st.session_state.cold_dir, exist_ok=True)
+    for month, tasks in partitions.items():
+        if month in st.session_state.cold_partitions:
+            # Tasks reloaded from the data file after the partition was spilled
+            with open(cold_partition_path(month), 'r') as f:
+                tasks = json.load(f) + tasks
+        with open(cold_partition_path(month), 'w') as f:
+            json.dump(tasks, f)
+        st.session_state.cold_partitions[month] = {
+            "count": len(tasks),
+            "max_id": max(t["id"] for t in tasks),
+            "ids": [t["id"] for t in tasks]
+        }
+    
+    st.session_state.tasks = hot
+    return sum(len(tasks) for tasks in partitions.values())
+
+def reload_cold_partitions():
+    """Bring every unloaded partition back into memory"""
+    if not st.session_state.cold_partitions:
+        return 0
+    
+    tasks = list(iter_cold_tasks())
+    st.session_state.tasks.extend(tasks)
+    discard_cold_partitions()
+    return len(tasks)
+
+def discard_cold_partitions():
+    """Forget unloaded partitions and delete their spill files"""
+    for month in st.session_state.cold_partitions:
+        if os.path.exists(cold_partition_path(month)):
+            os.remove(cold_partition_path(month))
+    if os.path.isdir(st.session_state.cold_dir) and not os.listdir(st.session_state.cold_dir):
+        os.rmdir(st.session_state.cold_dir)
+    st.session_state.cold_partitions = {}
+
+def compact_archive():
+    """Move old completed and expired tasks into archive segments and save"""
+    reload_cold_partitions()
+    cutoff = (datetime.now().date() - timedelta(days=ARCHIVE_AFTER_DAYS)).strftime("%Y-%m-%d")
+    hot = archive.compact(ARCHIVE_DIR, st.session_state.tasks, cutoff, st.session_state.max_carryovers)
+    archived = len(st.session_state.tasks) - len(hot)
+    st.session_state.tasks = hot
+    save_data(notify=False)
+    return archived
+
+def archive_session_store():
+    """Memory-mapped session columns of the archive, rebuilt when its index changed"""
+    stamp = sessionstore.source_stamp(os.path.join(ARCHIVE_DIR, archive.INDEX_FILE))
+    store = st.session_state.get("archive_session_store")
+    if store is not None and store.is_current(stamp):
+        return store
+    
+    # Another session may already have rebuilt the file
+    store = None
+    if os.path.exists(SESSION_STORE):
+        try:
+            store = sessionstore.SessionStore(SESSION_STORE)
+        except ValueError:
+            # An older file format; rebuilt below
+            store = None
+    if store is None or not store.is_current(stamp):
+        with profiler.span("build_archive_sessions"):
+            sessionstore.build(SESSION_STORE, archived_tasks(), stamp)
+        store = sessionstore.SessionStore(SESSION_STORE)
+    st.session_state.archive_session_store = store
+    return store
+
+def session_store():
+    """Session columns of every task, refreshed cheaply after a save.
+    
+    Archived sessions are memory-mapped from a file that only changes with
+    the archive. Spilled cold partitions are flattened once per spill, and
+    loaded tasks through a row cache that re-reads only the tasks whose
+    sessions changed, e.g. the one a timer was started or stopped on.
+    """
+    cold_key = tuple((month, p["count"]) for month, p in sorted(st.session_state.cold_partitions.items()))
+    key = (tuple(source_stamp()), cold_key)
+    store = st.session_state.get("session_store")
+    if store is not None and store.key == key:
+        return store
+    
+    cold = st.session_state.get("cold_session_columns")
+    if cold is None or cold[0] != cold_key:
+        cold = st.session_state.cold_session_columns = (
+            cold_key, sessionstore.SessionColumns.from_tasks(iter_cold_tasks()))
+    rows = st.session_state.setdefault("session_rows", sessionstore.RowCache())
+    with profiler.span("build_session_store"):
+        store = sessionstore.LayeredStore([rows.columns(st.session_state.tasks), cold[1], archive_session_store()], key)
+    st.session_state.session_store = store
+    return store
+
+def search_index():
+    """Full-text index over every task, synced when the data file or archive changed.
+    
+    Once this session has synced the index, the change feed tells which
+    tasks changed since, and only those are re-indexed. The index file is
+    shared with terminaltodo, which stamps and scopes it the same way.
+    """
+    stamp = source_stamp()
+    index = st.session_state.get("search_index")
+    if index is not None and index.stamp == stamp:
+        return index
+    
+    changed = None
+    feed = data_feed()
+    if index is None:
+        index = search.load(SEARCH_INDEX)
+    elif feed is not None:
+        changes = feed.changes_since(st.session_state.search_index_version)
+        if changes is not None:
+            changed = set().union(*(change.tasks for change in changes))
+    if index.stamp != stamp:
+        segments = [s["file"] for s in archive.load_index(ARCHIVE_DIR)["segments"]]
+        if not index.segments <= set(segments):
+            # The archive was discarded or replaced
+            index = search.SearchIndex()
+            changed = None
+        if changed is None:
+            hot = itertools.chain(st.session_state.tasks, iter_cold_tasks())
+        else:
+            # Changes to spilled tasks bring their partitions back (see apply_changes)
+            hot = [t for t in st.session_state.tasks if t["id"] in changed]
+        with profiler.span("sync_search_index"):
+            index.sync(
+                hot,
+                ((name, archive.read_segment(ARCHIVE_DIR, name)) for name in segments if name not in index.segments),
+                changed
+            )
+            index.stamp = stamp
+            search.save(index, SEARCH_INDEX)
+    st.session_state.search_index = index
+    st.session_state.search_index_version = st.session_state.get("feed_version")
+    return index
+
+def data_version():
+    """Changes whenever the data file, the archive or the loaded task list changes"""
+    stamp = source_stamp()
+    return (tuple(stamp), len(st.session_state.tasks))
+
+def run_query(plan):
+    """Evaluate a compiled filter plan, reusing results for the same data version"""
+    version = data_version()
+    if st.session_state.get("task_index_version") != version:
+        st.session_state.task_index = query.TaskIndex(st.session_state.tasks)
+        st.session_state.task_index_version = version
+        st.session_state.query_cache = query.QueryCache()
+    cache = st.session_state.setdefault("query_cache", query.QueryCache())
+    result = cache.get(plan, version)
+    metrics.record_cache("query", result is not None)
+    if result is None:
+        def text_search(words):
+            index = search_index()
+            return index.search(words, limit=None)[1]
+        with profiler.span("run_query"):
+            result = plan.run(st.session_state.task_index, ARCHIVE_DIR, text_search)
+        cache.put(plan, version, result)
+    return result
+
+def archived_tasks(since=None, until=None, categories=None):
+    """Archived tasks matching the filters that are not also hot"""
+    segments = archive.load_index(ARCHIVE_DIR)["segments"]
+    if not any(archive.segment_matches(s, since, until, categories) for s in segments):
+        return iter(())
+    hot_ids = {t["id"] for t in st.session_state.tasks}
+    return archive.iter_tasks(ARCHIVE_DIR, since, until, categories, hot_ids)
+
+@memory_phase("reports")
+def report_snapshot():
+    """An immutable snapshot of the tasks for report threads.
+    
+    Locally this is the change feed's snapshot, shared by every session and
+    advanced task by task. With a server the loaded tasks are copied once
+    per data version.
+    """
+    feed = data_feed()
+    if feed is not None:
+        snap = feed.snapshot()
+    else:
+        version = data_version()
+        snap = st.session_state.get("report_snapshot")
+        if snap is None or snap.version != version:
+            meta = {"last_carryover_date": st.session_state.last_carryover_date,
+                    "max_carryovers": st.session_state.max_carryovers}
+            with profiler.span("copy_report_snapshot"):
+                snap = snapshot.Snapshot.of(version, copy.deepcopy(st.session_state.tasks), meta)
+    st.session_state.report_snapshot = snap
+    return snap
+
+def next_task_id():
+    """Next free task id, including tasks in unloaded partitions"""
+    cold_max = max([p["max_id"] for p in st.session_state.cold_partitions.values()] + [archive.max_id(ARCHIVE_DIR)])
+    return max([t["id"] for t in st.session_state.tasks] + [cold_max]) + 1
 
 def add_notification(message, type="info"):
     """Add a notification to the session state"""
@@ -301,23 +878,6 @@ def add_notification(message, type="info"):
     if len(st.session_state.notifications) > 5:
         st.session_state.notifications.pop(0)
 
-def parse_time_to_minutes(time_str):
-    """Convert time string (30m, 1h, 1.5h) to minutes"""
-    if not time_str:
-        return 0
-    
-    time_str = time_str.strip().lower()
-    if 'h' in time_str:
-        hours = float(time_str.replace('h', ''))
-        return int(hours * 60)
-    elif 'm' in time_str:
-        return int(time_str.replace('m', ''))
-    else:
-        try:
-            return int(time_str)
-        except ValueError:
-            return 0
-
 def format_minutes_to_time(minutes):
     """Convert minutes to human-readable format (1h 30m)"""
     if minutes <= 0:
@@ -334,6 +894,9 @@ def format_minutes_to_time(minutes):
     
     return " ".join(parts)
 
+@profiler.traced("perform_carryover")
+@memory_phase("carryover")
+@metrics.timed(metrics.CARRYOVER_SECONDS)
 def perform_carryover():
     """Carry over incomplete tasks with smart rules"""
     today = datetime.now().strftime("%Y-%m-%d")
@@ -341,80 +904,16 @@ def perform_carryover():
     if today == st.session_state.last_carryover_date:
         return False
     
-    carried_count = 0
-    
-    for task in st.session_state.tasks:
-        if (task.get("completed", False) or 
-            task["due_date"] >= today or 
-            task.get("no_carryover", False)):
-            continue
-        
-        if task.get("carry_count", 0) >= st.session_state.max_carryovers:
-            continue
-        
-        task["due_date"] = today
-        task["carry_count"] = task.get("carry_count", 0) + 1
-        carried_count += 1
-    
-    # Handle recurring tasks
-    for task in st.session_state.tasks[:]:
-        if task.get("is_recurring") and task.get("completed", False):
-            if "completed_at" in task and task["completed_at"]:
-                completion_date = datetime.fromisoformat(task["completed_at"]).date()
-                yesterday = date.today() - timedelta(days=1)
-                
-                if completion_date == yesterday:
-                    new_task = task.copy()
-                    new_task["id"] = max([t["id"] for t in st.session_state.tasks] + [0]) + 1
-                    new_task["completed"] = False
-                    new_task["completed_at"] = None
-                    new_task["due_date"] = calculate_next_due_date(task)
-                    new_task["carry_count"] = 0
-                    new_task["subtasks"] = []
-                    new_task["time_spent"] = 0
-                    new_task["time_sessions"] = []
-                    st.session_state.tasks.append(new_task)
-    
+    carried_count, recurred = carryover.carry_over(st.session_state.tasks, st.session_state.max_carryovers, next_task_id)
+    metrics.CARRYOVER_TASKS.inc(len(recurred), action="recurred")
+    metrics.CARRYOVER_TASKS.inc(carried_count, action="carried")
     st.session_state.last_carryover_date = today
-    return carried_count > 0
-
-def calculate_next_due_date(task):
-    """Calculate next due date for recurring tasks"""
-    today = date.today()
-    pattern = task["recurrence_pattern"].lower()
-    
-    if pattern == "daily":
-        return (today + timedelta(days=1)).strftime("%Y-%m-%d")
     
-    elif pattern == "weekly":
-        return (today + timedelta(days=7)).strftime("%Y-%m-%d")
-    
-    elif pattern == "monthly":
-        next_month = today.replace(day=1) + timedelta(days=32)
-        next_month = next_month.replace(day=1)
-        last_day = (next_month.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-        day = min(today.day, last_day.day)
-        return next_month.replace(day=day).strftime("%Y-%m-%d")
-    
-    elif "," in pattern:  # Specific weekdays
-        weekdays = {
-            "mon": 0, "tue": 1, "wed": 2, "thu": 3,
-            "fri": 4, "sat": 5, "sun": 6
-        }
-        valid_days = [weekdays[day.strip()] for day in pattern.split(",") if day.strip() in weekdays]
-        
-        if valid_days:
-            next_dates = [next_weekday(today, wd) for wd in valid_days]
-            return min(next_dates).strftime("%Y-%m-%d")
-    
-    return (today + timedelta(days=1)).strftime("%Y-%m-%d")
-
-def next_weekday(d, weekday):
-    """Find next occurrence of specific weekday"""
-    days_ahead = weekday - d.weekday()
-    if days_ahead <= 0:
-        days_ahead += 7
-    return d + timedelta(days_ahead)
+    # Runs once a day; saving also records today's carryover date
+    archived = compact_archive()
+    if archived:
+        add_notification(f"Archived {archived} old tasks", "info")
+    return carried_count > 0
 
 def start_timer(task_id):
     """Start timing a task"""
@@ -422,14 +921,11 @@ def start_timer(task_id):
     stop_active_timer()
     
     for task in st.session_state.tasks:
-        if task["id"] == task_id and not task.get("completed", False):
+        if task["id"] == task_id and not task["completed"]:
             # Start new session
-            if "time_sessions" not in task:
-                task["time_sessions"] = []
-            
             task["time_sessions"].append({
                 "start_time": datetime.now().isoformat(),
-                "session_id": max([s.get("session_id", 0) for s in task["time_sessions"]] + [0]) + 1
+                "session_id": max([s["session_id"] for s in task["time_sessions"]] + [0]) + 1
             })
             
             st.session_state.active_timer = {
@@ -438,6 +934,7 @@ def start_timer(task_id):
                 "task_name": task["description"]
             }
             
+            metrics.TIMER_EVENTS.inc(event="start")
             add_notification(f"Timer started for '{task['description']}'", "success")
             return True
     
@@ -453,9 +950,6 @@ def stop_active_timer():
         
         for task in st.session_state.tasks:
             if task["id"] == task_id:
-                if "time_sessions" not in task:
-                    task["time_sessions"] = []
-                
                 # Find the active session and update it
                 for session in task["time_sessions"]:
                     if "end_time" not in session:
@@ -463,9 +957,9 @@ def stop_active_timer():
                         session["duration"] = round(duration_minutes, 1)
                 
                 # Update total time spent
-                if "time_spent" not in task:
-                    task["time_spent"] = 0
                 task["time_spent"] += duration_minutes
+                metrics.TIMER_EVENTS.inc(event="stop")
+                metrics.TIMER_SESSION_MINUTES.observe(duration_minutes)
                 
                 add_notification(f"Timer stopped. Spent {format_minutes_to_time(int(duration_minutes))} on '{task['description']}'", "success")
         
@@ -474,21 +968,30 @@ def stop_active_timer():
     
     return False
 
-def get_todays_tasks():
-    """Get today's tasks sorted by priority"""
+@profiler.traced("get_todays_tasks")
+def get_todays_tasks(tasks=None):
+    """Get today's tasks, of the loaded ones by default, sorted by priority"""
     today = datetime.now().strftime("%Y-%m-%d")
-    tasks = [task for task in st.session_state.tasks 
+    if tasks is None:
+        tasks = st.session_state.tasks
+    tasks = [task for task in tasks 
             if task["due_date"] == today]
     
     # Priority order: High (0), Medium (1), Low (2)
     priority_order = {"High": 0, "Medium": 1, "Low": 2}
-    return sorted(tasks, key=lambda x: (priority_order.get(x["priority"], 1), x.get("created_at", "")))
+    return sorted(tasks, key=lambda x: (priority_order.get(x["priority"], 1), x["created_at"]))
 
 def get_task_by_id(task_id):
     """Get task by ID"""
     for task in st.session_state.tasks:
         if task["id"] == task_id:
+            metrics.record_cache("task_lookup", True)
             return task
+    
+    # The task may live in a partition unloaded under memory pressure
+    metrics.record_cache("task_lookup", False)
+    if reload_cold_partitions():
+        return get_task_by_id(task_id)
     return None
 
 def add_task(description, category="General", priority="Medium", 
@@ -497,7 +1000,7 @@ def add_task(description, category="General", priority="Medium",
              subtasks=None):
     """Add a new task with enhanced properties"""
     today = datetime.now().strftime("%Y-%m-%d")
-    new_id = max([task["id"] for task in st.session_state.tasks] + [0]) + 1
+    new_id = next_task_id()
     
     task = {
         "id": new_id,
@@ -527,11 +1030,11 @@ def add_task(description, category="General", priority="Medium",
 def complete_task(task_id, complete_subtasks=False):
     """Mark task as completed with optional subtask completion"""
     for task in st.session_state.tasks:
-        if task["id"] == task_id and not task.get("completed", False):
+        if task["id"] == task_id and not task["completed"]:
             task["completed"] = True
             task["completed_at"] = datetime.now().isoformat()
             
-            if complete_subtasks and "subtasks" in task:
+            if complete_subtasks:
                 for subtask in task["subtasks"]:
                     subtask["completed"] = True
             
@@ -546,29 +1049,31 @@ def complete_task(task_id, complete_subtasks=False):
 def complete_subtask(task_id, subtask_id):
     """Mark a subtask as completed"""
     task = get_task_by_id(task_id)
-    if task and "subtasks" in task:
+    if task:
         for subtask in task["subtasks"]:
-            if subtask["id"] == subtask_id and not subtask.get("completed", False):
+            if subtask["id"] == subtask_id and not subtask["completed"]:
                 subtask["completed"] = True
                 add_notification(f"Subtask '{subtask['description']}' completed", "success")
                 return True
     return False
 
-def generate_daily_report():
-    """Generate daily time report"""
+@profiler.traced("generate_daily_report")
+@metrics.timed(metrics.REPORT_SECONDS, report="daily")
+def generate_daily_report(snap):
+    """Generate daily time report from a snapshot"""
     today = datetime.now().date()
     today_str = today.strftime("%Y-%m-%d")
-    daily_tasks = [t for t in st.session_state.tasks if t["due_date"] == today_str]
+    daily_tasks = [t for t in snap if t["due_date"] == today_str]
     
     if not daily_tasks:
         return None
     
     # Calculate totals
     total_estimated = sum(parse_time_to_minutes(t["estimated_time"]) for t in daily_tasks)
-    total_actual = sum(t.get("time_spent", 0) for t in daily_tasks)
+    total_actual = sum(t["time_spent"] for t in daily_tasks)
     total_max = sum(parse_time_to_minutes(t["max_time"]) for t in daily_tasks)
     total_tasks = len(daily_tasks)
-    completed_tasks = sum(1 for t in daily_tasks if t.get("completed", False))
+    completed_tasks = sum(1 for t in daily_tasks if t["completed"])
     
     return {
         "date": today_str,
@@ -582,66 +1087,55 @@ def generate_daily_report():
         "tasks": daily_tasks
     }
 
-def generate_weekly_report(days=7):
-    """Generate weekly time report"""
+@profiler.traced("generate_weekly_report")
+@metrics.timed(metrics.REPORT_SECONDS, report="weekly")
+def generate_weekly_report(snap, days=7, cancel=None):
+    """Generate the time trend report over the last days (None: all time) from a snapshot"""
     end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=days)
-    
-    daily_data = defaultdict(lambda: {
-        "estimated": 0,
-        "actual": 0,
-        "tasks": 0,
-        "completed": 0
-    })
+    start_date = None if days is None else end_date - timedelta(days=days)
     
-    for task in st.session_state.tasks:
-        if "created_at" in task:
-            task_date = datetime.fromisoformat(task["created_at"]).date()
-            if start_date <= task_date <= end_date:
-                date_str = task_date.strftime("%Y-%m-%d")
-                daily_data[date_str]["estimated"] += parse_time_to_minutes(task["estimated_time"])
-                daily_data[date_str]["actual"] += task.get("time_spent", 0)
-                daily_data[date_str]["tasks"] += 1
-                if task.get("completed", False):
-                    daily_data[date_str]["completed"] += 1
+    # Month partitions of long histories are reduced on the process pool
+    partial = aggregate.aggregate(snap, ARCHIVE_DIR, start_date and start_date.isoformat(), end_date.isoformat(),
+                                  cancel=cancel)
+    if start_date is None:
+        start_date = date.fromisoformat(min((day for day, _ in partial.cells), default=end_date.isoformat()))
+    daily_data = partial.daily(start_date, end_date)
     
     return {
+        "days": days,
         "start_date": start_date,
         "end_date": end_date,
-        "daily_data": dict(sorted(daily_data.items())),
+        "daily_data": daily_data,
         "total_estimated": sum(data["estimated"] for data in daily_data.values()),
         "total_actual": sum(data["actual"] for data in daily_data.values()),
         "total_tasks": sum(data["tasks"] for data in daily_data.values()),
         "total_completed": sum(data["completed"] for data in daily_data.values())
     }
 
-def generate_category_report(days=30):
-    """Generate report by category"""
+@profiler.traced("generate_category_report")
+@metrics.timed(metrics.REPORT_SECONDS, report="category")
+def generate_category_report(snap, days=30, cancel=None):
+    """Generate report by category from a snapshot"""
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days)
     
-    category_data = defaultdict(lambda: {
-        "estimated": 0,
-        "actual": 0,
-        "tasks": 0,
-        "completed": 0
-    })
-    
-    for task in st.session_state.tasks:
-        if "created_at" in task:
-            task_date = datetime.fromisoformat(task["created_at"]).date()
-            if start_date <= task_date <= end_date and (task.get("time_spent", 0) > 0 or task["estimated_time"]):
-                category = task["category"]
-                category_data[category]["estimated"] += parse_time_to_minutes(task["estimated_time"])
-                category_data[category]["actual"] += task.get("time_spent", 0)
-                category_data[category]["tasks"] += 1
-                if task.get("completed", False):
-                    category_data[category]["completed"] += 1
+    partial = aggregate.aggregate(snap, ARCHIVE_DIR, start_date.isoformat(), end_date.isoformat(), cancel=cancel)
     
     return {
         "start_date": start_date,
         "end_date": end_date,
-        "category_data": dict(category_data)
+        "category_data": partial.by_category(start_date, end_date)
+    }
+
+@profiler.traced("generate_window_report")
+@metrics.timed(metrics.REPORT_SECONDS, report="windows")
+def generate_window_report(snap, lengths=COMPARISON_WINDOWS, cancel=None):
+    """Trailing windows ending today and the same periods last year, from one aggregation"""
+    end_date = datetime.now().date()
+    
+    return {
+        "end_date": end_date,
+        "windows": aggregate.windows(snap, ARCHIVE_DIR, lengths, end_date, last_year=True, cancel=cancel)
     }
 
 def display_notifications():
@@ -690,6 +1184,7 @@ def display_active_timer():
                     st.session_state.show_task_details = True
                     st.rerun()
 
+@profiler.traced("build_task_html")
 def render_task_item(task, index=None):
     """Render a single task item with professional styling"""
     priority_colors = {
@@ -699,13 +1194,13 @@ def render_task_item(task, index=None):
     }
     
     task_class = priority_colors.get(task["priority"], "task-medium")
-    if task.get("completed", False):
+    if task["completed"]:
         task_class += " task-completed"
     
     # Format time display
     est_time = parse_time_to_minutes(task["estimated_time"])
     max_time = parse_time_to_minutes(task["max_time"])
-    time_spent = task.get("time_spent", 0)
+    time_spent = task["time_spent"]
     
     time_display = ""
     if time_spent or est_time or max_time:
@@ -722,11 +1217,11 @@ def render_task_item(task, index=None):
     
     # Format indicators
     indicators = []
-    if task.get("is_recurring", False):
+    if task["is_recurring"]:
         indicators.append("⟳")
-    if task.get("notes") and re.search(r'/[\w\./_-]+', task["notes"]):
+    if task["notes"] and re.search(r'/[\w\./_-]+', task["notes"]):
         indicators.append("📎")
-    if task.get("no_carryover", False):
+    if task["no_carryover"]:
         indicators.append("🚫")
     
     indicator_str = " ".join(indicators)
@@ -734,16 +1229,16 @@ def render_task_item(task, index=None):
         indicator_str = f"<span style='color: #6C757D; margin-right: 8px;'>{indicator_str}</span>"
     
     # Format checkbox
-    checkbox = "✓" if task.get("completed", False) else " "
-    checkbox_style = "color: #28A745; font-weight: bold;" if task.get("completed", False) else ""
+    checkbox = "✓" if task["completed"] else " "
+    checkbox_style = "color: #28A745; font-weight: bold;" if task["completed"] else ""
     
     # Subtasks
     subtasks_html = ""
-    if task.get("subtasks"):
+    if task["subtasks"]:
         subtasks_html = "<div style='margin-top: 8px;'>"
         for subtask in task["subtasks"]:
-            st_checkbox = "✓" if subtask.get("completed", False) else " "
-            st_style = "color: #28A745; text-decoration: line-through;" if subtask.get("completed", False) else ""
+            st_checkbox = "✓" if subtask["completed"] else " "
+            st_style = "color: #28A745; text-decoration: line-through;" if subtask["completed"] else ""
             subtasks_html += f"""
             <div class="subtask-item">
                 <span style="display: inline-block; width: 20px; height: 20px; border: 1px solid #6C757D; border-radius: 4px; 
@@ -775,7 +1270,7 @@ def render_task_item(task, index=None):
                 </span>
             </div>
             <div style="font-size: 0.8rem; color: #6C757D;">
-                {len([st for st in task.get('subtasks', []) if st.get('completed', False)])}/{len(task.get('subtasks', []))} subtasks
+                {len([st for st in task['subtasks'] if st['completed']])}/{len(task['subtasks'])} subtasks
             </div>
         </div>
         {time_display}
@@ -785,8 +1280,25 @@ def render_task_item(task, index=None):
     
     return task_html
 
-def render_dashboard():
-    """Render the dashboard view"""
+def today_overview(todays_tasks):
+    """Dashboard metrics and pre-rendered task cards for today's tasks"""
+    return {
+        "total": len(todays_tasks),
+        "completed": sum(1 for t in todays_tasks if t["completed"]),
+        "estimated": sum(parse_time_to_minutes(t["estimated_time"]) for t in todays_tasks),
+        "spent": sum(t["time_spent"] for t in todays_tasks),
+        "priority_counts": {p: sum(1 for t in todays_tasks if t["priority"] == p) for p in PRIORITIES},
+        "recurring": sum(1 for t in todays_tasks if t["is_recurring"]),
+        "cards": {
+            p: [[t["id"], render_task_item(t, i)] for i, t in enumerate((t for t in todays_tasks if t["priority"] == p), 1)]
+            for p in PRIORITIES
+        }
+    }
+
+@profiler.traced("render_dashboard")
+@memory_phase("render")
+def render_dashboard(overview=None):
+    """Render the dashboard view, from a persisted overview on a first paint"""
     st.markdown('<div class="header-container">', unsafe_allow_html=True)
     st.markdown('<div class="header-title">TaskFlow Professional</div>', unsafe_allow_html=True)
     
@@ -804,24 +1316,23 @@ def render_dashboard():
     st.markdown(f'<div class="header-subtitle">{greeting}</div>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # Load data and perform carryover
-    load_data()
-    carryover_performed = perform_carryover()
-    if carryover_performed:
-        add_notification("Carryover completed for today's tasks", "info")
-    
-    # Get today's tasks
-    today = datetime.now().strftime("%A, %B %d, %Y")
-    todays_tasks = get_todays_tasks()
+    if overview is None:
+        # Load data and perform carryover; local sessions are kept current by sync_data()
+        if data_feed() is None:
+            load_data()
+        carryover_performed = perform_carryover()
+        if carryover_performed:
+            add_notification("Carryover completed for today's tasks", "info")
+        overview = today_overview(get_todays_tasks())
     
     # Calculate statistics
-    total_tasks = len(todays_tasks)
-    completed_tasks = sum(1 for t in todays_tasks if t.get("completed", False))
+    total_tasks = overview["total"]
+    completed_tasks = overview["completed"]
     completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
     
     # Time statistics
-    total_estimated = sum(parse_time_to_minutes(t["estimated_time"]) for t in todays_tasks)
-    total_spent = sum(t.get("time_spent", 0) for t in todays_tasks)
+    total_estimated = overview["estimated"]
+    total_spent = overview["spent"]
     time_efficiency = (total_spent / total_estimated * 100) if total_estimated > 0 else 0
     
     # Display metrics
@@ -842,23 +1353,18 @@ def render_dashboard():
             st.metric("Time Spent", format_minutes_to_time(total_spent))
     
     with col3:
-        priority_counts = {
-            "High": len([t for t in todays_tasks if t["priority"] == "High"]),
-            "Medium": len([t for t in todays_tasks if t["priority"] == "Medium"]),
-            "Low": len([t for t in todays_tasks if t["priority"] == "Low"])
-        }
+        priority_counts = overview["priority_counts"]
         st.metric("Priority Tasks", f"{priority_counts['High']} High", 
                  delta=f"{priority_counts['Medium']} Medium", 
                  delta_color="off")
     
     with col4:
-        recurring_count = len([t for t in todays_tasks if t.get("is_recurring", False)])
-        st.metric("Recurring Tasks", recurring_count)
+        st.metric("Recurring Tasks", overview["recurring"])
     
     # Display tasks by priority
     st.markdown("### 📋 Today's Tasks")
     
-    if not todays_tasks:
+    if not total_tasks:
         st.markdown("""
         <div class="stCard" style="text-align: center; padding: 2rem;">
             <h3 style="color: #28A745; margin-bottom: 1rem;">🎉 No Tasks for Today!</h3>
@@ -868,44 +1374,21 @@ def render_dashboard():
         """, unsafe_allow_html=True)
     else:
         # Create tabs for different priority levels
-        tab1, tab2, tab3 = st.tabs(["🔴 High Priority", "🟡 Medium Priority", "🟢 Low Priority"])
-        
-        with tab1:
-            high_pri_tasks = [t for t in todays_tasks if t["priority"] == "High"]
-            if high_pri_tasks:
-                for i, task in enumerate(high_pri_tasks, 1):
-                    st.markdown(render_task_item(task, i), unsafe_allow_html=True)
-                    
-                    # Hidden button for task details (triggered by JavaScript)
-                    st.button("Task Details", key=f"task-{task['id']}-details", 
-                             on_click=lambda tid=task['id']: setattr(st.session_state, 'selected_task_id', tid) or setattr(st.session_state, 'show_task_details', True),
-                             type="secondary", use_container_width=True)
-            else:
-                st.info("No high priority tasks for today")
-        
-        with tab2:
-            med_pri_tasks = [t for t in todays_tasks if t["priority"] == "Medium"]
-            if med_pri_tasks:
-                for i, task in enumerate(med_pri_tasks, 1):
-                    st.markdown(render_task_item(task, i), unsafe_allow_html=True)
-                    
-                    st.button("Task Details", key=f"task-{task['id']}-details", 
-                             on_click=lambda tid=task['id']: setattr(st.session_state, 'selected_task_id', tid) or setattr(st.session_state, 'show_task_details', True),
-                             type="secondary", use_container_width=True)
-            else:
-                st.info("No medium priority tasks for today")
+        tabs = st.tabs(["🔴 High Priority", "🟡 Medium Priority", "🟢 Low Priority"])
         
-        with tab3:
-            low_pri_tasks = [t for t in todays_tasks if t["priority"] == "Low"]
-            if low_pri_tasks:
-                for i, task in enumerate(low_pri_tasks, 1):
-                    st.markdown(render_task_item(task, i), unsafe_allow_html=True)
-                    
-                    st.button("Task Details", key=f"task-{task['id']}-details", 
-                             on_click=lambda tid=task['id']: setattr(st.session_state, 'selected_task_id', tid) or setattr(st.session_state, 'show_task_details', True),
-                             type="secondary", use_container_width=True)
-            else:
-                st.info("No low priority tasks for today")
+        for tab, priority in zip(tabs, PRIORITIES):
+            with tab:
+                cards = overview["cards"][priority]
+                if cards:
+                    for task_id, card in cards:
+                        st.markdown(card, unsafe_allow_html=True)
+                        
+                        # Hidden button for task details (triggered by JavaScript)
+                        st.button("Task Details", key=f"task-{task_id}-details", 
+                                 on_click=lambda tid=task_id: setattr(st.session_state, 'selected_task_id', tid) or setattr(st.session_state, 'show_task_details', True),
+                                 type="secondary", use_container_width=True)
+                else:
+                    st.info(f"No {priority.lower()} priority tasks for today")
     
     # Quick action buttons
     st.markdown("### ⚡ Quick Actions")
@@ -918,7 +1401,7 @@ def render_dashboard():
     
     with col2:
         if st.button("⏱️ Start Timer", use_container_width=True, 
-                    disabled=len([t for t in todays_tasks if not t.get("completed", False)]) == 0):
+                    disabled=completed_tasks == total_tasks):
             st.session_state.show_timer_selector = True
             st.rerun()
     
@@ -1020,6 +1503,8 @@ def render_add_task_form():
                 st.session_state.show_add_task = False
                 st.rerun()
 
+@profiler.traced("render_task_details")
+@memory_phase("render")
 def render_task_details(task_id):
     """Render task details view"""
     task = get_task_by_id(task_id)
@@ -1035,13 +1520,13 @@ def render_task_details(task_id):
         st.markdown(f"**Category:** {task['category']}")
         st.markdown(f"**Priority:** {task['priority']}")
         st.markdown(f"**Due Date:** {task['due_date']}")
-        st.markdown(f"**Status:** {'✅ Completed' if task.get('completed', False) else '⏳ Pending'}")
+        st.markdown(f"**Status:** {'✅ Completed' if task['completed'] else '⏳ Pending'}")
         
-        if task.get("created_at"):
+        if task["created_at"]:
             created_date = datetime.fromisoformat(task["created_at"]).strftime("%B %d, %Y at %I:%M %p")
             st.markdown(f"**Created:** {created_date}")
         
-        if task.get("completed_at"):
+        if task["completed_at"]:
             completed_date = datetime.fromisoformat(task["completed_at"]).strftime("%B %d, %Y at %I:%M %p")
             st.markdown(f"**Completed:** {completed_date}")
         
@@ -1049,7 +1534,7 @@ def render_task_details(task_id):
         st.markdown("### ⏱️ Time Tracking")
         est_time = parse_time_to_minutes(task["estimated_time"])
         max_time = parse_time_to_minutes(task["max_time"])
-        time_spent = task.get("time_spent", 0)
+        time_spent = task["time_spent"]
         
         col_time1, col_time2, col_time3 = st.columns(3)
         
@@ -1071,22 +1556,26 @@ def render_task_details(task_id):
             st.caption(f"{progress*100:.0f}% of estimated time used")
         
         # Time sessions
-        if task.get("time_sessions"):
+        if task["time_sessions"]:
+            import pandas as pd
+            
             st.markdown("**Time Sessions:**")
-            sessions_df = pd.DataFrame(task["time_sessions"])
-            if not sessions_df.empty:
-                sessions_df['duration'] = sessions_df.get('duration', 0).apply(lambda x: format_minutes_to_time(int(x)))
-                sessions_df['start_time'] = pd.to_datetime(sessions_df['start_time']).dt.strftime('%I:%M %p')
-                if 'end_time' in sessions_df.columns:
-                    sessions_df['end_time'] = pd.to_datetime(sessions_df['end_time']).dt.strftime('%I:%M %p')
-                    sessions_df = sessions_df[['session_id', 'start_time', 'end_time', 'duration']]
-                else:
-                    sessions_df = sessions_df[['session_id', 'start_time', 'duration']]
-                st.dataframe(sessions_df, use_container_width=True)
+            rows = session_store().task_sessions(task_id)
+            if len(rows) != len(task["time_sessions"]):
+                # Sessions edited since the last save
+                rows = sessionstore.task_records(task)
+            ended = rows["end"] >= 0
+            sessions_df = pd.DataFrame({
+                "session_id": rows["session_id"],
+                "start_time": pd.to_datetime(rows["start"], unit="s").strftime('%I:%M %p'),
+                "end_time": pd.to_datetime(rows["end"], unit="s").strftime('%I:%M %p').where(ended, "running"),
+                "duration": [format_minutes_to_time(int(m)) for m in rows["duration"]]
+            })
+            st.dataframe(sessions_df, use_container_width=True)
         
         # Notes
         st.markdown("### 📓 Notes")
-        if task.get("notes"):
+        if task["notes"]:
             st.markdown(task["notes"])
         else:
             st.info("No notes added")
@@ -1094,7 +1583,7 @@ def render_task_details(task_id):
     with col2:
         st.markdown("### 🔧 Actions")
         
-        if not task.get("completed", False):
+        if not task["completed"]:
             if st.button("✅ Mark as Complete", use_container_width=True, type="primary"):
                 complete_task(task_id)
                 save_data()
@@ -1116,58 +1605,53 @@ def render_task_details(task_id):
             st.rerun()
     
     # Subtasks section
-    if task.get("subtasks"):
+    if task["subtasks"]:
         st.markdown("### ✅ Subtasks")
         
         for subtask in task["subtasks"]:
             col_sub1, col_sub2 = st.columns([4, 1])
             
             with col_sub1:
-                st.markdown(f"{'~~' if subtask.get('completed', False) else ''}{subtask['description']}{'~~' if subtask.get('completed', False) else ''}")
+                st.markdown(f"{'~~' if subtask['completed'] else ''}{subtask['description']}{'~~' if subtask['completed'] else ''}")
             
             with col_sub2:
-                if not subtask.get("completed", False) and not task.get("completed", False):
+                if not subtask["completed"] and not task["completed"]:
                     if st.button("✓", key=f"complete_subtask_{subtask['id']}", use_container_width=True):
                         complete_subtask(task_id, subtask["id"])
                         save_data()
                         st.rerun()
         
         # Completion stats
-        completed_subtasks = sum(1 for st in task["subtasks"] if st.get("completed", False))
+        completed_subtasks = sum(1 for st in task["subtasks"] if st["completed"])
         total_subtasks = len(task["subtasks"])
         st.progress(completed_subtasks / total_subtasks)
         st.caption(f"{completed_subtasks}/{total_subtasks} subtasks completed")
 
-def render_analytics():
-    """Render analytics and reports view"""
-    st.markdown('<div class="header-container">', unsafe_allow_html=True)
-    st.markdown('<div class="header-title">📊 Analytics & Insights</div>', unsafe_allow_html=True)
-    st.markdown('<div class="header-subtitle">Data-driven insights to optimize your productivity</div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    tab1, tab2, tab3, tab4 = st.tabs(["📈 Daily Report", "📅 Weekly Trends", "🏷️ Category Analysis", "🎯 Estimation Accuracy"])
+def render_daily_report(daily_report):
+    """Render the daily report tab"""
+    # Heavy charting dependencies are only imported once analytics is opened
+    import plotly.graph_objects as go
     
-    with tab1:
-        daily_report = generate_daily_report()
-        if daily_report:
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric("Tasks Completed", f"{daily_report['completed_tasks']}/{daily_report['total_tasks']}", 
-                         delta=f"{daily_report['completion_rate']:.0f}%")
-            
-            with col2:
-                st.metric("Estimated Time", format_minutes_to_time(daily_report['total_estimated']))
-            
-            with col3:
-                st.metric("Actual Time", format_minutes_to_time(daily_report['total_actual']))
-            
-            with col4:
-                st.metric("Efficiency", f"{daily_report['efficiency']:.0f}%", 
-                         delta="on target" if 80 < daily_report['efficiency'] < 120 else "review estimates",
-                         delta_color="normal")
-            
-            # Time comparison chart
+    if daily_report:
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("Tasks Completed", f"{daily_report['completed_tasks']}/{daily_report['total_tasks']}", 
+                     delta=f"{daily_report['completion_rate']:.0f}%")
+        
+        with col2:
+            st.metric("Estimated Time", format_minutes_to_time(daily_report['total_estimated']))
+        
+        with col3:
+            st.metric("Actual Time", format_minutes_to_time(daily_report['total_actual']))
+        
+        with col4:
+            st.metric("Efficiency", f"{daily_report['efficiency']:.0f}%", 
+                     delta="on target" if 80 < daily_report['efficiency'] < 120 else "review estimates",
+                     delta_color="normal")
+        
+        # Time comparison chart
+        with profiler.span("build_charts"):
             fig = go.Figure()
             fig.add_trace(go.Bar(
                 x=["Estimated", "Actual"],
@@ -1183,99 +1667,173 @@ def render_analytics():
                 yaxis_title="Minutes",
                 height=300
             )
+        with profiler.span("plotly_chart"):
             st.plotly_chart(fig, use_container_width=True)
-            
-            # Task details
-            st.markdown("### Task Details")
-            for task in sorted(daily_report['tasks'], key=lambda x: x.get('time_spent', 0), reverse=True):
-                with st.expander(f"{task['description']} - {format_minutes_to_time(task.get('time_spent', 0))} spent"):
-                    col_a, col_b = st.columns(2)
-                    
-                    with col_a:
-                        st.markdown(f"**Priority:** {task['priority']}")
-                        st.markdown(f"**Category:** {task['category']}")
-                        st.markdown(f"**Status:** {'✅ Completed' if task.get('completed', False) else '⏳ Pending'}")
-                    
-                    with col_b:
-                        est_time = parse_time_to_minutes(task['estimated_time'])
-                        act_time = task.get('time_spent', 0)
-                        if est_time > 0:
-                            efficiency = (act_time / est_time) * 100
-                            st.markdown(f"**Efficiency:** {efficiency:.0f}%")
-                            st.progress(min(efficiency/100, 1.0))
-        else:
-            st.info("No data available for today's report. Complete some tasks to generate insights.")
-    
-    with tab2:
-        weekly_report = generate_weekly_report(7)
-        if weekly_report['daily_data']:
-            dates = list(weekly_report['daily_data'].keys())
-            estimated = [data['estimated'] for data in weekly_report['daily_data'].values()]
-            actual = [data['actual'] for data in weekly_report['daily_data'].values()]
-            completion_rates = [data['completed']/data['tasks']*100 if data['tasks'] > 0 else 0 
-                               for data in weekly_report['daily_data'].values()]
-            
-            # Create subplot with two y-axes
-            fig = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            # Add traces
-            fig.add_trace(
-                go.Bar(x=dates, y=estimated, name="Estimated Time", marker_color='#4B55B2'),
-                secondary_y=False,
-            )
-            
-            fig.add_trace(
-                go.Bar(x=dates, y=actual, name="Actual Time", marker_color='#2D9B76'),
-                secondary_y=False,
-            )
-            
-            fig.add_trace(
-                go.Scatter(x=dates, y=completion_rates, name="Completion Rate", 
-                          mode='lines+markers', line=dict(color='#FFC107', width=3)),
-                secondary_y=True,
-            )
-            
-            # Set titles and layout
-            fig.update_layout(
-                title="Weekly Time Tracking & Completion Rates",
-                xaxis_title="Date",
-                height=400,
-                barmode='group'
-            )
-            fig.update_yaxes(title_text="Minutes", secondary_y=False)
-            fig.update_yaxes(title_text="Completion Rate (%)", secondary_y=True, range=[0, 100])
-            
+        
+        # Task details
+        st.markdown("### Task Details")
+        for task in sorted(daily_report['tasks'], key=lambda x: x['time_spent'], reverse=True):
+            with st.expander(f"{task['description']} - {format_minutes_to_time(task['time_spent'])} spent"):
+                col_a, col_b = st.columns(2)
+                
+                with col_a:
+                    st.markdown(f"**Priority:** {task['priority']}")
+                    st.markdown(f"**Category:** {task['category']}")
+                    st.markdown(f"**Status:** {'✅ Completed' if task['completed'] else '⏳ Pending'}")
+                
+                with col_b:
+                    est_time = parse_time_to_minutes(task['estimated_time'])
+                    act_time = task['time_spent']
+                    if est_time > 0:
+                        efficiency = (act_time / est_time) * 100
+                        st.markdown(f"**Efficiency:** {efficiency:.0f}%")
+                        st.progress(min(efficiency/100, 1.0))
+    else:
+        st.info("No data available for today's report. Complete some tasks to generate insights.")
+
+def trend_figure(series, unit):
+    """Time and completion rate chart of bucketed sums, one point per bucket"""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    
+    dates = list(series.keys())
+    estimated = [data['estimated'] for data in series.values()]
+    actual = [data['actual'] for data in series.values()]
+    completion_rates = [data['completed']/data['tasks']*100 if data['tasks'] > 0 else 0 
+                       for data in series.values()]
+    
+    # Create subplot with two y-axes
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    
+    if len(dates) > WEBGL_POINTS:
+        # Hundreds of SVG bars redraw slowly on every pan and zoom
+        fig.add_trace(go.Scattergl(x=dates, y=estimated, name="Estimated Time", mode='lines',
+                                   line=dict(color='#4B55B2')), secondary_y=False)
+        fig.add_trace(go.Scattergl(x=dates, y=actual, name="Actual Time", mode='lines',
+                                   line=dict(color='#2D9B76')), secondary_y=False)
+        fig.add_trace(go.Scattergl(x=dates, y=completion_rates, name="Completion Rate", mode='lines',
+                                   line=dict(color='#FFC107', width=2)), secondary_y=True)
+    else:
+        fig.add_trace(
+            go.Bar(x=dates, y=estimated, name="Estimated Time", marker_color='#4B55B2'),
+            secondary_y=False,
+        )
+        
+        fig.add_trace(
+            go.Bar(x=dates, y=actual, name="Actual Time", marker_color='#2D9B76'),
+            secondary_y=False,
+        )
+        
+        fig.add_trace(
+            go.Scatter(x=dates, y=completion_rates, name="Completion Rate", 
+                      mode='lines+markers', line=dict(color='#FFC107', width=3)),
+            secondary_y=True,
+        )
+    
+    # Set titles and layout
+    fig.update_layout(
+        title=f"Time Tracking & Completion Rates per {unit.title()}",
+        xaxis_title="Date",
+        height=400,
+        barmode='group'
+    )
+    fig.update_yaxes(title_text="Minutes", secondary_y=False)
+    fig.update_yaxes(title_text="Completion Rate (%)", secondary_y=True, range=[0, 100])
+    return fig
+
+def render_weekly_report(weekly_report):
+    """Render the trends tab for the selected window"""
+    if weekly_report['daily_data']:
+        span = (weekly_report['end_date'] - weekly_report['start_date']).days + 1
+        
+        # Downsampled before it reaches the browser: day, week, month or year
+        # buckets by span, coarsened further if the figure is still too heavy
+        with profiler.span("build_charts"):
+            units = list(aggregate.BUCKET_UNITS)
+            unit = aggregate.bucket_unit(span)
+            while True:
+                fig = trend_figure(aggregate.downsample(weekly_report['daily_data'], unit), unit)
+                if unit == units[-1] or len(fig.to_json()) <= MAX_FIGURE_BYTES:
+                    break
+                unit = units[units.index(unit) + 1]
+        
+        with profiler.span("plotly_chart"):
             st.plotly_chart(fig, use_container_width=True)
-            
-            # Summary statistics
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                avg_daily_tasks = weekly_report['total_tasks'] / 7
-                st.metric("Avg Daily Tasks", f"{avg_daily_tasks:.1f}")
-            
-            with col2:
-                total_est = weekly_report['total_estimated']
-                total_act = weekly_report['total_actual']
-                efficiency = (total_act / total_est * 100) if total_est > 0 else 0
-                st.metric("Weekly Efficiency", f"{efficiency:.0f}%")
-            
-            with col3:
-                completion_rate = (weekly_report['total_completed'] / weekly_report['total_tasks'] * 100) if weekly_report['total_tasks'] > 0 else 0
-                st.metric("Task Completion", f"{completion_rate:.0f}%")
+        
+        # Summary statistics
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            avg_daily_tasks = weekly_report['total_tasks'] / span
+            st.metric("Avg Daily Tasks", f"{avg_daily_tasks:.1f}")
+        
+        with col2:
+            total_est = weekly_report['total_estimated']
+            total_act = weekly_report['total_actual']
+            efficiency = (total_act / total_est * 100) if total_est > 0 else 0
+            st.metric("Efficiency", f"{efficiency:.0f}%")
+        
+        with col3:
+            completion_rate = (weekly_report['total_completed'] / weekly_report['total_tasks'] * 100) if weekly_report['total_tasks'] > 0 else 0
+            st.metric("Task Completion", f"{completion_rate:.0f}%")
+        
+        # Recorded session time comes from the columnar store's prefix sums
+        store = session_store()
+        end = weekly_report['end_date'] + timedelta(days=1)
+        if weekly_report['days'] is None:
+            tracked = store.minutes_between(weekly_report['start_date'], end)
+            st.metric("Time Tracked in Sessions", format_minutes_to_time(int(tracked)))
         else:
-            st.info("No data available for weekly report. Track tasks for a week to generate insights.")
-    
-    with tab3:
-        category_report = generate_category_report(30)
-        if category_report['category_data']:
-            categories = list(category_report['category_data'].keys())
-            actual_times = [data['actual'] for data in category_report['category_data'].values()]
-            estimated_times = [data['estimated'] for data in category_report['category_data'].values()]
-            completion_rates = [data['completed']/data['tasks']*100 if data['tasks'] > 0 else 0 
-                               for data in category_report['category_data'].values()]
-            
-            # Pie chart for time distribution
+            days = weekly_report['days']
+            window_start = end - timedelta(days=days)
+            tracked = store.minutes_between(window_start, end)
+            previous = store.minutes_between(window_start - timedelta(days=days), window_start)
+            st.metric("Time Tracked in Sessions", format_minutes_to_time(int(tracked)),
+                      delta=f"{tracked - previous:+.0f} min vs previous {days} days")
+    else:
+        st.info("No data available for this window. Track tasks for a week to generate insights.")
+
+def render_window_report(window_report):
+    """Render trailing windows side by side, each against the same period last year"""
+    import pandas as pd
+    
+    st.markdown("### Period Comparison")
+    windows = window_report['windows']
+    for col, (days, window) in zip(st.columns(len(windows)), windows.items()):
+        totals = window['totals']
+        last_year = window['last_year']['totals']
+        with col:
+            delta = f"{totals['actual'] - last_year['actual']:+.0f} min vs last year" if last_year['tasks'] else None
+            st.metric(f"Last {days} days", format_minutes_to_time(int(totals['actual'])), delta=delta)
+            rate = totals['completed'] / totals['tasks'] * 100 if totals['tasks'] > 0 else 0
+            st.caption(f"{totals['tasks']} tasks · {rate:.0f}% completed")
+    
+    # Categories of the longest window first, then any only seen in shorter ones
+    categories = list(dict.fromkeys(category for window in reversed(windows.values())
+                                    for category in window['by_category']))
+    if categories:
+        category_df = pd.DataFrame({"Category": categories})
+        for days, window in windows.items():
+            category_df[f"{days} days"] = [format_minutes_to_time(int(window['by_category'][category]['actual']))
+                                           if category in window['by_category'] else "—"
+                                           for category in categories]
+        st.dataframe(category_df, use_container_width=True)
+
+def render_category_report(category_report):
+    """Render the category analysis tab"""
+    import pandas as pd
+    import plotly.graph_objects as go
+    import plotly.express as px
+    
+    if category_report['category_data']:
+        categories = list(category_report['category_data'].keys())
+        actual_times = [data['actual'] for data in category_report['category_data'].values()]
+        estimated_times = [data['estimated'] for data in category_report['category_data'].values()]
+        completion_rates = [data['completed']/data['tasks']*100 if data['tasks'] > 0 else 0 
+                           for data in category_report['category_data'].values()]
+        
+        # Pie chart for time distribution
+        with profiler.span("build_charts"):
             fig = px.pie(
                 values=actual_times,
                 names=categories,
@@ -1283,9 +1841,11 @@ def render_analytics():
                 color_discrete_sequence=px.colors.qualitative.Pastel
             )
             fig.update_traces(textposition='inside', textinfo='percent+label')
+        with profiler.span("plotly_chart"):
             st.plotly_chart(fig, use_container_width=True)
-            
-            # Bar chart for completion rates
+        
+        # Bar chart for completion rates
+        with profiler.span("build_charts"):
             fig2 = go.Figure()
             fig2.add_trace(go.Bar(
                 x=categories,
@@ -1301,27 +1861,147 @@ def render_analytics():
                 height=300,
                 yaxis_range=[0, 100]
             )
+        with profiler.span("plotly_chart"):
             st.plotly_chart(fig2, use_container_width=True)
-            
-            # Category table
-            st.markdown("### Category Details")
-            category_df = pd.DataFrame({
-                "Category": categories,
-                "Tasks": [data['tasks'] for data in category_report['category_data'].values()],
-                "Completed": [data['completed'] for data in category_report['category_data'].values()],
-                "Estimated Time": [format_minutes_to_time(data['estimated']) for data in category_report['category_data'].values()],
-                "Actual Time": [format_minutes_to_time(data['actual']) for data in category_report['category_data'].values()],
-                "Efficiency": [f"{(data['actual']/data['estimated']*100):.0f}%" if data['estimated'] > 0 else "N/A" 
-                              for data in category_report['category_data'].values()]
+        
+        # Category table
+        st.markdown("### Category Details")
+        category_df = pd.DataFrame({
+            "Category": categories,
+            "Tasks": [data['tasks'] for data in category_report['category_data'].values()],
+            "Completed": [data['completed'] for data in category_report['category_data'].values()],
+            "Estimated Time": [format_minutes_to_time(data['estimated']) for data in category_report['category_data'].values()],
+            "Actual Time": [format_minutes_to_time(data['actual']) for data in category_report['category_data'].values()],
+            "Efficiency": [f"{(data['actual']/data['estimated']*100):.0f}%" if data['estimated'] > 0 else "N/A" 
+                          for data in category_report['category_data'].values()],
+            # Per completed task, from the mergeable ratio sketch
+            "Median Efficiency": [f"{data['median_efficiency']:.0f}%" if data['median_efficiency'] is not None else "N/A"
+                                  for data in category_report['category_data'].values()]
+        })
+        st.dataframe(category_df, use_container_width=True)
+    else:
+        st.info("No category data available. Categorize your tasks to generate insights.")
+
+@profiler.traced("render_productivity_heatmap")
+def render_productivity_heatmap(days=365):
+    """Render tracked minutes by weekday and hour, overall or for one category"""
+    import plotly.graph_objects as go
+    
+    end = datetime.now().date() + timedelta(days=1)
+    store = session_store()
+    with profiler.span("bin_sessions"):
+        grid = store.hour_of_week(end - timedelta(days=days), end)
+    if not grid.sum():
+        st.info("No tracked time in the last year. Use the timer to see when you work best.")
+        return
+    
+    totals = grid.sum(axis=(1, 2))
+    categories = [store.categories[i] for i in totals.argsort()[::-1] if totals[i] > 0]
+    choice = st.selectbox("Category", ["All categories"] + categories, key="heatmap_category")
+    minutes = grid.sum(axis=0) if choice == "All categories" else grid[store.categories.index(choice)]
+    
+    col1, col2, col3 = st.columns(3)
+    weekday, hour = divmod(int(minutes.argmax()), 24)
+    with col1:
+        st.metric("Tracked (last year)", format_minutes_to_time(int(minutes.sum())))
+    with col2:
+        st.metric("Most productive slot", f"{sessionstore.WEEKDAYS[weekday]} {hour:02d}:00")
+    with col3:
+        st.metric("Best day", sessionstore.WEEKDAYS[int(minutes.sum(axis=1).argmax())])
+    
+    with profiler.span("build_charts"):
+        fig = go.Figure(go.Heatmap(
+            z=minutes,
+            x=[f"{h:02d}:00" for h in range(24)],
+            y=sessionstore.WEEKDAYS,
+            colorscale=[[0, "#F8F9FA"], [1, "#4B55B2"]],
+            hovertemplate="%{y} %{x}<br>%{z:.0f} min<extra></extra>"
+        ))
+        fig.update_layout(title="Tracked Minutes by Hour of Week", height=350,
+                          yaxis=dict(autorange="reversed"))
+    with profiler.span("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+    
+    if choice == "All categories" and len(categories) > 1:
+        st.markdown("### Peak Hours by Category")
+        rows = []
+        for name in categories:
+            category_grid = grid[store.categories.index(name)]
+            weekday, hour = divmod(int(category_grid.argmax()), 24)
+            rows.append({
+                "Category": name,
+                "Tracked": format_minutes_to_time(int(category_grid.sum())),
+                "Share": f"{category_grid.sum() / minutes.sum() * 100:.0f}%",
+                "Peak Slot": f"{sessionstore.WEEKDAYS[weekday]} {hour:02d}:00",
+                "Peak Hour": f"{int(category_grid.sum(axis=0).argmax()):02d}:00"
             })
-            st.dataframe(category_df, use_container_width=True)
-        else:
-            st.info("No category data available. Categorize your tasks to generate insights.")
+        st.dataframe(rows, use_container_width=True)
+
+@profiler.traced("render_analytics")
+@memory_phase("render")
+def render_analytics():
+    """Render analytics and reports view.
+    
+    Reports are computed on the report thread pool against an immutable
+    snapshot. Each tab shows the newest finished result straight away; a
+    result for older data is replaced once the current one is ready, after
+    the rest of the page has been drawn.
+    """
+    st.markdown('<div class="header-container">', unsafe_allow_html=True)
+    st.markdown('<div class="header-title">📊 Analytics & Insights</div>', unsafe_allow_html=True)
+    st.markdown('<div class="header-subtitle">Data-driven insights to optimize your productivity</div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 Daily Report", "📅 Weekly Trends", "🏷️ Category Analysis",
+                                            "🎯 Estimation Accuracy", "⏰ Productivity Insights"])
+    
+    snap = report_snapshot()
+    # Reports also read the archive and depend on today's date
+    version = (snap.version, tuple(source_stamp()), datetime.now().date())
+    jobs = st.session_state.setdefault("report_jobs", snapshot.ReportJobs())
+    with tab2:
+        window = st.selectbox("Window", list(TREND_WINDOWS), key="trend_window")
+    panels = [
+        (tab1, jobs.request("daily", version, generate_daily_report, snap), render_daily_report),
+        # One slot per window, so switching back shows that window's last result
+        (tab2, jobs.request(f"trend:{window}", version, generate_weekly_report, snap, TREND_WINDOWS[window],
+                            cancellable=True), render_weekly_report),
+        (tab2, jobs.request("windows", version, generate_window_report, snap, cancellable=True), render_window_report),
+        (tab3, jobs.request("category", version, generate_category_report, snap, 30, cancellable=True),
+         render_category_report)
+    ]
+    
+    pending = []
+    for tab, job, render in panels:
+        with tab:
+            placeholder = st.empty()
+        with placeholder.container():
+            if job.has_result:
+                render(job.result)
+                if not job.ready:
+                    st.caption("⏳ Updating with your latest changes…")
+            else:
+                st.info("⏳ Computing report…")
+        if not job.ready:
+            pending.append((placeholder, job, render))
     
     with tab4:
         st.markdown("### Coming Soon")
         st.info("Estimation accuracy analysis will be available in the next release. This report will help you improve your time estimates by analyzing patterns in your task completion times.")
+    
+    with tab5:
+        # Vectorized over the memory-mapped session columns, so it runs inline
+        render_productivity_heatmap()
+    
+    # Every tab is on screen; a rerun triggered meanwhile simply stops this
+    # wait, and the finished result is picked up next time
+    for placeholder, job, render in pending:
+        with profiler.span("wait_for_report"):
+            job.collect(timeout=None)
+        with placeholder.container():
+            render(job.result)
 
+@profiler.traced("render_settings")
 def render_settings():
     """Render settings view"""
     st.markdown('<div class="header-container">', unsafe_allow_html=True)
@@ -1347,22 +2027,44 @@ def render_settings():
         if st.button("🗑️ Clear All Data", use_container_width=True):
             st.session_state.confirm_clear_data = True
     
+    feed = data_feed()
+    if feed is not None:
+        st.caption(f"Watching {DATA_FILE} for changes by other windows and programs "
+                   f"({feed.mode}); data version {feed.version}")
+    
     # Carryover settings
     st.markdown("### 🔄 Carryover Settings")
     
     max_carryovers = st.slider("Maximum carryovers per task", 
                               min_value=0, max_value=10, 
                               value=st.session_state.max_carryovers,
-                              help="Number of times a task can be carried over before it's archived")
+                              help=f"Number of times a task can be carried over; tasks over the limit are archived "
+                                   f"{ARCHIVE_AFTER_DAYS} days after their due date")
     
     if max_carryovers != st.session_state.max_carryovers:
         st.session_state.max_carryovers = max_carryovers
         save_data()
         st.success("Carryover settings updated")
     
+    # Archive
+    st.markdown("### 🗄️ Archive")
+    summary = archive.summary(ARCHIVE_DIR)
+    if summary["segments"]:
+        st.caption(f"{summary['tasks']:,} tasks ({summary['completed']:,} completed) created since "
+                   f"{summary['first_created']} in {summary['segments']} compressed segments, "
+                   f"{format_bytes(summary['bytes'])} on disk")
+    else:
+        st.caption("Nothing archived yet")
+    st.caption(f"Completed tasks and tasks over the carryover limit move to the archive "
+               f"{ARCHIVE_AFTER_DAYS} days after completion or their due date. This runs daily with carryover.")
+    if st.button("🗄️ Archive old tasks now", use_container_width=True):
+        add_notification(f"Archived {compact_archive()} old tasks", "success")
+        st.rerun()
+    
     # Display current settings
     st.markdown("### 📋 Current Configuration")
     
+    import pandas as pd
     settings_df = pd.DataFrame({
         "Setting": ["Maximum Carryovers", "Last Carryover Date", "Total Tasks", "Active Timer"],
         "Value": [
@@ -1374,35 +2076,185 @@ def render_settings():
     })
     st.dataframe(settings_df, use_container_width=True)
     
+    # Diagnostics
+    st.markdown("### 🩺 Diagnostics")
+    
+    profiling = st.checkbox("Enable performance profiler", value=st.session_state.profiling,
+                            help="Time each phase of every rerun and show the results in the sidebar")
+    if profiling != st.session_state.profiling:
+        st.session_state.profiling = profiling
+        st.session_state.profile_history = []
+        st.rerun()
+    
+    diagnostics = st.checkbox("Enable memory diagnostics", value=memdiag.is_active(),
+                              help="Trace allocations with tracemalloc around load, carryover, reports and rendering")
+    if diagnostics != memdiag.is_active():
+        memdiag.start() if diagnostics else memdiag.stop()
+        st.session_state.memory_phases = {}
+        st.rerun()
+    
+    if diagnostics:
+        render_memory_diagnostics()
+    
     # Export/Import section
     st.markdown("### 📤 Export & Import")
     
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("📤 Export Data", use_container_width=True):
-            with open(DATA_FILE, 'r') as f:
-                data = f.read()
-            st.download_button(
-                label="⬇️ Download JSON",
-                data=data,
-                file_name=f"taskflow_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
-            )
+        render_export_form()
     
     with col2:
-        uploaded_file = st.file_uploader("📤 Import Data", type=['json'])
-        if uploaded_file is not None:
+        import_mode = st.radio("Import mode", ["Merge", "Replace"], horizontal=True,
+                               help="Merge keeps local data and deduplicates tasks present in both; "
+                                    "Replace overwrites all local data")
+        uploaded_file = st.file_uploader("📤 Import Data", type=['json', 'jsonl'])
+        # The uploader keeps its file across reruns; import each upload once
+        upload_key = (uploaded_file.name, uploaded_file.size, import_mode) if uploaded_file is not None else None
+        if upload_key is not None and upload_key != st.session_state.get("imported_upload"):
+            bar = st.progress(0.0, text="Importing…")
+            show_progress = lambda fraction, imported: bar.progress(fraction, text=f"Imported {imported:,} tasks")
             try:
-                data = json.load(uploaded_file)
-                st.session_state.tasks = data.get("tasks", [])
-                st.session_state.last_carryover_date = data.get("last_carryover_date", datetime.now().strftime("%Y-%m-%d"))
-                st.session_state.max_carryovers = data.get("max_carryovers", 3)
-                save_data()
-                st.success("Data imported successfully")
+                if import_mode == "Merge":
+                    counts = merge_import_stream(uploaded_file, uploaded_file.size, show_progress)
+                    save_data()
+                    message = (f"Added {counts['added']:,} tasks, merged {counts['merged']:,}, "
+                               f"skipped {counts['duplicates']:,} duplicates ({counts['remapped']:,} ids remapped, "
+                               f"{counts['sessions_added']:,} sessions added)")
+                else:
+                    count = import_stream(uploaded_file, uploaded_file.size, show_progress)
+                    discard_cold_partitions()
+                    archive.discard(ARCHIVE_DIR)
+                    load_data()
+                    message = f"Imported {count:,} tasks"
+                st.session_state.imported_upload = upload_key
+                bar.progress(1.0, text=message)
+                st.success(message)
             except Exception as e:
+                bar.empty()
+                if import_mode == "Merge":
+                    # Drop a partial merge; the data file is unchanged
+                    load_data()
                 st.error(f"Error importing data: {str(e)}")
 
+def all_tasks():
+    """Iterate loaded tasks, then unloaded cold partitions, then the archive"""
+    return itertools.chain(st.session_state.tasks, iter_cold_tasks(), archived_tasks())
+
+def render_export_form():
+    """Stream a filtered export to disk and offer it for download"""
+    fmt = st.selectbox("Export format", export.FORMATS,
+                       format_func=lambda f: {"jsonl": "JSON lines", "csv": "CSV tables (zip)",
+                                              "parquet": "Parquet tables (zip)"}[f])
+    # The whole history unless a range is asked for
+    limit_dates = st.checkbox("Only tasks created between…")
+    if limit_dates:
+        today = datetime.now().date()
+        date_range = st.date_input("Created between", value=(today - timedelta(days=365), today))
+    categories = st.multiselect("Categories", sorted({t["category"] for t in st.session_state.tasks}),
+                                help="Leave empty to export every category")
+    
+    if st.button("📤 Export Data", use_container_width=True):
+        since = until = None
+        if limit_dates:
+            # The picker returns a single date while a range is half chosen
+            dates = list(date_range) if isinstance(date_range, (list, tuple)) else [date_range]
+            since, until = dates[0].isoformat(), dates[-1].isoformat()
+        source = lambda: export.select_tasks(all_tasks(), since, until, categories)
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        export.prune(EXPORT_DIR, EXPORT_MAX_AGE)
+        path = os.path.join(EXPORT_DIR, export.file_name(fmt, datetime.now().strftime("%Y%m%d_%H%M%S")))
+        try:
+            export.export_file(source, fmt, path)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        # A session keeps only its latest export on disk
+        previous = st.session_state.get("last_export")
+        if previous and previous != path and os.path.exists(previous):
+            os.remove(previous)
+        st.session_state.last_export = path
+    
+    path = st.session_state.get("last_export")
+    if path and os.path.exists(path):
+        st.caption(f"Written to `{path}` ({format_bytes(os.path.getsize(path))})")
+        with open(path, 'rb') as f:
+            st.download_button(
+                label="⬇️ Download export",
+                data=f,
+                file_name=os.path.basename(path),
+                mime="application/zip" if path.endswith(".zip") else "application/x-ndjson"
+            )
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+def render_memory_diagnostics():
+    """Memory attribution, phase snapshots and the soft budget"""
+    budget_mb = st.number_input("Soft memory budget (MB, 0 = off)", min_value=0, max_value=65536,
+                                value=st.session_state.get("memory_budget_mb", 0), step=64,
+                                help="When this session's data exceeds the budget, caches are evicted first, "
+                                     "then completed tasks older than the cold threshold are unloaded to disk")
+    st.session_state.memory_budget_mb = budget_mb
+    
+    usage, caches = memdiag.attribute(st.session_state.tasks)
+    rows = ["| Subsystem | Retained |", "|---|---:|"]
+    rows += [f"| {name.title()} | {format_bytes(size)} |" for name, size in usage.items() if name != "total"]
+    rows += [f"| &nbsp;&nbsp;↳ cache: {name} | {format_bytes(size)} |" for name, size in caches.items()]
+    rows.append(f"| **Total** | **{format_bytes(usage['total'])}** |")
+    st.markdown("\n".join(rows))
+    
+    if budget_mb:
+        st.progress(min(usage["total"] / (budget_mb * 1024 * 1024), 1.0))
+        st.caption(f"{usage['total'] / (budget_mb * 1024 * 1024) * 100:.0f}% of the {budget_mb} MB soft budget")
+    
+    if st.session_state.memory_phases:
+        st.markdown("**Phase snapshots (last run of each phase)**")
+        rows = ["| Phase | Retained | Peak | Top allocation site |", "|---|---:|---:|---|"]
+        for name, result in st.session_state.memory_phases.items():
+            site = f"`{os.path.basename(result['top'][0][0])}`" if result["top"] else ""
+            rows.append(f"| {name} | {format_bytes(result['retained'])} | {format_bytes(result['peak'])} | {site} |")
+        st.markdown("\n".join(rows))
+    
+    cold = st.session_state.cold_partitions
+    if cold:
+        st.caption(f"{sum(p['count'] for p in cold.values())} cold tasks unloaded in {len(cold)} month partitions")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🧹 Evict caches now", use_container_width=True):
+            released = memdiag.evict_caches()
+            add_notification(f"Evicted caches ({format_bytes(released)})", "success")
+            st.rerun()
+    with col2:
+        if cold and st.button("📥 Reload cold partitions", use_container_width=True):
+            add_notification(f"Reloaded {reload_cold_partitions()} cold tasks", "success")
+            st.rerun()
+        elif not cold and st.button("📤 Unload cold partitions", use_container_width=True):
+            add_notification(f"Unloaded {unload_cold_partitions()} cold tasks", "success")
+            st.rerun()
+
+def enforce_memory_budget():
+    """Apply the soft memory budget after a rerun when diagnostics are on"""
+    budget_mb = st.session_state.get("memory_budget_mb", 0)
+    if not memdiag.is_active() or not budget_mb:
+        return
+    
+    actions = memdiag.enforce_budget(
+        budget_mb * 1024 * 1024,
+        lambda: memdiag.attribute(st.session_state.tasks)[0]["total"],
+        unload_cold_partitions
+    )
+    for action in actions:
+        add_notification(f"Memory budget: {action}", "warning")
+
+@profiler.traced("render_archive")
+@memory_phase("render")
 def render_archive():
     """Render task archive view"""
     st.markdown('<div class="header-container">', unsafe_allow_html=True)
@@ -1410,8 +2262,17 @@ def render_archive():
     st.markdown('<div class="header-subtitle">Review completed and historical tasks</div>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
+    expression = st.text_input(
+        "🔍 Search or filter",
+        placeholder="report category:Work completed:<7d est:>1h carry:>=2 recurring:yes",
+        help="Words search descriptions, notes and subtasks. Filters: category, priority, status, "
+             "created, due, completed, est, max, spent, carry, id, recurring, carryover; "
+             "use :<, :>, :<=, :>= for dates (YYYY-MM-DD, today, 7d) and durations (30m, 1h), "
+             "commas for alternatives and a leading - to negate."
+    ).strip()
+    
     # Filter options
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         days_filter = st.selectbox("Time Period", 
@@ -1424,11 +2285,18 @@ def render_archive():
                                    index=0)
     
     with col3:
+        archived_categories = archive.summary(ARCHIVE_DIR)["categories"]
         category_filter = st.selectbox("Category", 
-                                     ["All"] + list(set(t["category"] for t in st.session_state.tasks)),
+                                     ["All"] + sorted(set(t["category"] for t in st.session_state.tasks) | set(archived_categories)),
                                      index=0)
     
+    with col4:
+        priority_filter = st.selectbox("Priority", ["All", "High", "Medium", "Low"], index=0)
+    
     # Filter tasks
+    if days_filter == "All Time":
+        reload_cold_partitions()
+    
     cutoff_date = datetime.now().date()
     if days_filter == "Today":
         cutoff_date = datetime.now().date()
@@ -1436,24 +2304,31 @@ def render_archive():
         cutoff_date = datetime.now().date() - timedelta(days=7)
     elif days_filter == "This Month":
         cutoff_date = datetime.now().date() - timedelta(days=30)
+    else:
+        cutoff_date = date.min
+    
+    # The selectboxes are shorthand for expression terms
+    terms = [expression]
+    if days_filter != "All Time":
+        terms.append(f"created:>={cutoff_date.isoformat()}")
+    if status_filter != "All":
+        terms.append("status:done" if status_filter == "Completed" else "status:open")
+    if category_filter != "All":
+        terms.append(f'category:"{category_filter}"')
+    if priority_filter != "All":
+        terms.append(f"priority:{priority_filter}")
+    try:
+        plan = query.compile_query(" ".join(terms))
+        result = run_query(plan)
+    except ValueError as e:
+        st.error(f"Invalid filter: {e}")
+        return
     
-    filtered_tasks = []
-    for task in st.session_state.tasks:
-        task_date = datetime.fromisoformat(task["created_at"]).date() if "created_at" in task else datetime.now().date()
-        
-        if task_date < cutoff_date:
-            continue
-        
-        if status_filter == "Completed" and not task.get("completed", False):
-            continue
-        
-        if status_filter == "Incomplete" and task.get("completed", False):
-            continue
-        
-        if category_filter != "All" and task["category"] != category_filter:
-            continue
-        
-        filtered_tasks.append(task)
+    filtered_tasks = list(result.tasks)
+    archived_ids = result.archived_ids
+    with st.expander("🧭 Query plan"):
+        st.code(str(plan) or "(no filters)")
+        st.markdown("\n".join(f"- {step}" for step in result.steps))
     
     # Display statistics
     col1, col2, col3 = st.columns(3)
@@ -1462,7 +2337,7 @@ def render_archive():
         st.metric("Total Tasks", len(filtered_tasks))
     
     with col2:
-        completed = sum(1 for t in filtered_tasks if t.get("completed", False))
+        completed = sum(1 for t in filtered_tasks if t["completed"])
         st.metric("Completed", completed)
     
     with col3:
@@ -1472,16 +2347,17 @@ def render_archive():
     # Display tasks
     if filtered_tasks:
         # Sort by completion date or creation date
-        sort_by = st.radio("Sort by", ["Completion Date", "Creation Date", "Priority"], 
+        sort_options = ["Relevance"] if plan.words else []
+        sort_by = st.radio("Sort by", sort_options + ["Completion Date", "Creation Date", "Priority"], 
                           horizontal=True, index=0)
         
         if sort_by == "Completion Date":
-            filtered_tasks.sort(key=lambda x: x.get("completed_at", x.get("created_at", "")), reverse=True)
+            filtered_tasks.sort(key=lambda x: x["completed_at"] or x["created_at"], reverse=True)
         elif sort_by == "Creation Date":
-            filtered_tasks.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+            filtered_tasks.sort(key=lambda x: x["created_at"], reverse=True)
         elif sort_by == "Priority":
             priority_order = {"High": 0, "Medium": 1, "Low": 2}
-            filtered_tasks.sort(key=lambda x: (priority_order.get(x["priority"], 1), x.get("created_at", "")), reverse=True)
+            filtered_tasks.sort(key=lambda x: (priority_order.get(x["priority"], 1), x["created_at"]), reverse=True)
         
         # Pagination
         tasks_per_page = 10
@@ -1494,15 +2370,17 @@ def render_archive():
         for i, task in enumerate(filtered_tasks[start_idx:end_idx], start_idx + 1):
             st.markdown(render_task_item(task, i), unsafe_allow_html=True)
             
-            if st.button("📋 Details", key=f"archive_task_{task['id']}", use_container_width=True):
+            if task["id"] in archived_ids:
+                st.caption("🗄️ Archived (read-only)")
+            elif st.button("📋 Details", key=f"archive_task_{task['id']}", use_container_width=True):
                 st.session_state.selected_task_id = task['id']
                 st.session_state.show_task_details = True
                 st.rerun()
     else:
         st.info("No tasks match the current filters. Try adjusting your filters to see more tasks.")
 
-def main():
-    """Main application logic"""
+def render_app():
+    """Render the navigation and the current view"""
     # Initialize session state variables
     if 'current_tab' not in st.session_state:
         st.session_state.current_tab = "Dashboard"
@@ -1523,6 +2401,11 @@ def main():
     if 'show_timer_selector' not in st.session_state:
         st.session_state.show_timer_selector = False
     
+    # A fresh session paints the dashboard from the today snapshot while the data loads
+    overview = first_paint_overview()
+    if overview is None:
+        sync_data()
+    
     # Sidebar navigation
     with st.sidebar:
         st.markdown("### 🧭 Navigation")
@@ -1612,6 +2495,8 @@ def main():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("✅ Yes, Clear All Data", use_container_width=True):
+                discard_cold_partitions()
+                archive.discard(ARCHIVE_DIR)
                 st.session_state.tasks = []
                 st.session_state.last_carryover_date = datetime.now().strftime("%Y-%m-%d")
                 st.session_state.max_carryovers = 3
@@ -1626,7 +2511,7 @@ def main():
     elif st.session_state.show_timer_selector:
         st.markdown("### ⏱️ Select Task to Time")
         todays_tasks = get_todays_tasks()
-        incomplete_tasks = [t for t in todays_tasks if not t.get("completed", False)]
+        incomplete_tasks = [t for t in todays_tasks if not t["completed"]]
         
         if incomplete_tasks:
             for task in incomplete_tasks:
@@ -1649,7 +2534,7 @@ def main():
     else:
         # Render the current tab
         if st.session_state.current_tab == "Dashboard":
-            render_dashboard()
+            render_dashboard(overview)
         elif st.session_state.current_tab == "Analytics":
             render_analytics()
         elif st.session_state.current_tab == "Archive":
@@ -1657,5 +2542,55 @@ def main():
         elif st.session_state.current_tab == "Settings":
             render_settings()
 
+def render_profiler_panel():
+    """Sidebar panel with per-phase timings for the current and recent reruns"""
+    history = st.session_state.profile_history
+    if not st.session_state.profiling or not history:
+        return
+    
+    latest = history[-1]
+    with st.sidebar:
+        with st.expander("⏱️ Performance Profile", expanded=False):
+            st.caption(f"This rerun ({latest.label}): {latest.total_ms:.0f} ms • "
+                       f"{latest.bytes_read / 1024:.1f} KiB read • {latest.bytes_written / 1024:.1f} KiB written")
+            
+            rows = ["| Phase | ms | Calls |", "|---|---:|---:|"]
+            rows += [f"| {p['phase']} | {p['ms']:.1f} | {p['calls']} |" for p in latest.summary()]
+            st.markdown("\n".join(rows))
+            
+            if len(history) > 1:
+                st.markdown(f"**Last {len(history)} reruns**")
+                rows = ["| View | Total ms | Read KiB | Written KiB |", "|---|---:|---:|---:|"]
+                rows += [f"| {p.label} | {p.total_ms:.0f} | {p.bytes_read / 1024:.1f} | {p.bytes_written / 1024:.1f} |"
+                         for p in reversed(history)]
+                st.markdown("\n".join(rows))
+            
+            st.caption(f"Spans are logged to {profiler.LOG_FILE}")
+
+def main():
+    """Main application logic"""
+    metrics.start_from_env()
+    if 'profiling' not in st.session_state:
+        st.session_state.profiling = profiler.enabled_by_env()
+    if 'profile_history' not in st.session_state:
+        st.session_state.profile_history = []
+    if 'profile_session_id' not in st.session_state:
+        st.session_state.profile_session_id = os.urandom(6).hex()
+    
+    if st.session_state.profiling:
+        profiler.begin_rerun(st.session_state.profile_session_id,
+                             st.session_state.get("current_tab", "Dashboard"))
+    try:
+        render_app()
+    finally:
+        # st.rerun() unwinds through here too; the rerun is still recorded
+        profile = profiler.end_rerun()
+        if profile is not None:
+            st.session_state.profile_history.append(profile)
+            del st.session_state.profile_history[:-PROFILE_HISTORY]
+    
+    render_profiler_panel()
+    enforce_memory_budget()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""Cold task archive in compressed, immutable segments.
+
+compact() moves completed tasks, and open tasks that ran out of
+carryovers, out of the hot task list once they are older than a cutoff.
+They are written to gzip-compressed JSON-lines segments, one per creation
+month per compaction run, under <data file>.archive/. A segment is never
+rewritten; index.json records for each segment its file, task count, id
+range, creation date range and per-category counts, so readers can skip
+segments that cannot match a query without opening them.
+
+Segments are written before the caller saves the smaller hot file, so an
+interruption can leave a task in both places but never in neither;
+readers drop archived copies of ids that are still hot.
+"""
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+SEGMENT_CACHE_SIZE = 8  # Decoded segments kept in memory
+COMPRESS_LEVEL = 6  # Level 9 is several times slower for a few percent
+
+_segment_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def archive_dir(data_file):
+    """Directory holding the archive of a data file"""
+    return f"{data_file}.archive"
+
+def load_index(directory):
+    """Return the archive index, empty if nothing was archived yet"""
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return {"version": INDEX_VERSION, "segments": []}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _write_index(directory, index):
+    path = os.path.join(directory, INDEX_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, path)
+
+def is_archivable(task, cutoff, max_carryovers):
+    """Return True if a task is completed or expired and older than cutoff (YYYY-MM-DD)"""
+    if task["completed"]:
+        return (task["completed_at"] or task["created_at"])[:10] < cutoff
+    return task["carry_count"] >= max_carryovers and task["due_date"] < cutoff
+
+def compact(directory, tasks, cutoff, max_carryovers):
+    """Archive old tasks into new segments and return the tasks that stay hot"""
+    hot = []
+    months = defaultdict(list)
+    for task in tasks:
+        if is_archivable(task, cutoff, max_carryovers):
+            months[task["created_at"][:7]].append(task)
+        else:
+            hot.append(task)
+    if not months:
+        return hot
+    
+    os.makedirs(directory, exist_ok=True)
+    index = load_index(directory)
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    for month, archived in sorted(months.items()):
+        name = f"{month}-{stamp}-{len(index['segments'])}.jsonl.gz"
+        path = os.path.join(directory, name)
+        with gzip.open(f"{path}.tmp", 'wt', encoding="utf-8", compresslevel=COMPRESS_LEVEL) as f:
+            for task in archived:
+                f.write(json.dumps(task) + "\n")
+        os.replace(f"{path}.tmp", path)
+        
+        categories = defaultdict(int)
+        for task in archived:
+            categories[task["category"]] += 1
+        created = [task["created_at"][:10] for task in archived]
+        index["segments"].append({
+            "file": name,
+            "count": len(archived),
+            "completed": sum(1 for task in archived if task["completed"]),
+            "min_id": min(task["id"] for task in archived),
+            "max_id": max(task["id"] for task in archived),
+            "first_created": min(created),
+            "last_created": max(created),
+            "categories": dict(categories)
+        })
+    _write_index(directory, index)
+    return hot
+
+def segment_matches(segment, since=None, until=None, categories=None):
+    """Return True if a segment may hold tasks matching the filters"""
+    if since and segment["last_created"] < since:
+        return False
+    if until and segment["first_created"] > until:
+        return False
+    if categories and not set(categories) & set(segment["categories"]):
+        return False
+    return True
+
+def read_segment(directory, name):
+    """Decoded tasks of one segment, cached since segments never change"""
+    key = (directory, name)
+    with _cache_lock:
+        if key in _segment_cache:
+            _segment_cache.move_to_end(key)
+            return _segment_cache[key]
+    
+    tasks = tuple(scan_segment(directory, name))
+    with _cache_lock:
+        _segment_cache[key] = tasks
+        if len(_segment_cache) > SEGMENT_CACHE_SIZE:
+            _segment_cache.popitem(last=False)
+    return tasks
+
+def iter_tasks(directory, since=None, until=None, categories=None, exclude_ids=None):
+    """Yield archived tasks created between since and until (YYYY-MM-DD, inclusive).
+    
+    Only segments whose index entry can match are read. exclude_ids skips
+    tasks that are also in the hot file.
+    """
+    for segment in load_index(directory)["segments"]:
+        if not segment_matches(segment, since, until, categories):
+            continue
+        for task in read_segment(directory, segment["file"]):
+            created = task["created_at"][:10]
+            if since and created < since or until and created > until:
+                continue
+            if categories and task["category"] not in categories:
+                continue
+            if exclude_ids and task["id"] in exclude_ids:
+                continue
+            yield task
+
+def scan_segment(directory, name):
+    """Yield the tasks of one segment without caching them, for one-off scans"""
+    with gzip.open(os.path.join(directory, name), 'rt', encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def find_task(directory, task_id):
+    """Return an archived task by id, or None"""
+    for segment in load_index(directory)["segments"]:
+        if segment["min_id"] <= task_id <= segment["max_id"]:
+            for task in read_segment(directory, segment["file"]):
+                if task["id"] == task_id:
+                    return task
+    return None
+
+def summary(directory):
+    """Archive totals from the index alone"""
+    segments = load_index(directory)["segments"]
+    categories = defaultdict(int)
+    for segment in segments:
+        for category, count in segment["categories"].items():
+            categories[category] += count
+    return {
+        "segments": len(segments),
+        "tasks": sum(s["count"] for s in segments),
+        "completed": sum(s["completed"] for s in segments),
+        "first_created": min([s["first_created"] for s in segments], default=None),
+        "bytes": sum(os.path.getsize(os.path.join(directory, s["file"])) for s in segments),
+        "categories": dict(categories)
+    }
+
+def max_id(directory):
+    """Highest task id ever archived, or 0"""
+    return max([s["max_id"] for s in load_index(directory)["segments"]] + [0])
+
+def cached_segments():
+    """Decoded segments currently held in the cache"""
+    with _cache_lock:
+        return list(_segment_cache.values())
+
+def clear_cache():
+    """Drop every decoded segment"""
+    with _cache_lock:
+        _segment_cache.clear()
+
+def discard(directory):
+    """Delete the archive"""
+    clear_cache()
+    for segment in load_index(directory)["segments"]:
+        path = os.path.join(directory, segment["file"])
+        if os.path.exists(path):
+            os.remove(path)
+    if os.path.exists(os.path.join(directory, INDEX_FILE)):
+        os.remove(os.path.join(directory, INDEX_FILE))
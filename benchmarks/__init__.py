@@ -0,0 +1,7 @@
+"""Benchmarks for TaskFlow hot paths.
+
+    python -m benchmarks.startup     cold-start import time
+    python -m benchmarks.hotpaths    storage, carryover, reports and rendering
+    python -m benchmarks.datagen     write a synthetic data file
+    python -m benchmarks.loadtest    server requests per second
+"""
@@ -0,0 +1,94 @@
+"""Scaling benchmark for parallel report aggregation (aggregate.py).
+
+Builds a synthetic history (by default 1M tasks over 5 years), archives
+everything older than --hot-days into month segments the way the app's
+compaction does, then times an all-time aggregate() at each worker count.
+Every run's result is checked against the inline (1 worker) result, and
+throughput is reported with the speedup over it. Pool start-up is timed
+separately, since the app pays it once per process.
+
+Usage:
+    python -m benchmarks.aggregation
+    python -m benchmarks.aggregation --tasks 200000 --years 2 --workers 1,2,4
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import aggregate
+import archive
+from benchmarks.datagen import generate_dataset
+
+def default_workers():
+    """1, 2, 4, ... up to the CPU count, plus the CPU count itself"""
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    return counts if counts[-1] == cpus else counts + [cpus]
+
+def comparable(partial):
+    """A partial's cells with sketches as plain bucket counts"""
+    return {key: cell[:aggregate.SKETCH] + [cell[aggregate.SKETCH] and cell[aggregate.SKETCH].counts]
+            for key, cell in partial.cells.items()}
+
+def build_history(directory, tasks, years, hot_days):
+    """Archive a synthetic history under directory; return (hot tasks, archived count)"""
+    data = generate_dataset(tasks, years)
+    cutoff = (date.today() - timedelta(days=hot_days)).isoformat()
+    hot = archive.compact(directory, data["tasks"], cutoff, data["max_carryovers"])
+    return hot, len(data["tasks"]) - len(hot)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure parallel report aggregation")
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--hot-days", type=int, default=90, help="Tasks newer than this stay hot")
+    parser.add_argument("--workers", help="Comma-separated worker counts (default: powers of two up to the CPU count)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+    workers = [int(n) for n in args.workers.split(",")] if args.workers else default_workers()
+    
+    workdir = tempfile.mkdtemp(prefix="taskflow_aggregate_")
+    try:
+        started = time.perf_counter()
+        hot, archived = build_history(workdir, args.tasks, args.years, args.hot_days)
+        segments = len(archive.load_index(workdir)["segments"])
+        print(f"{args.tasks:,} tasks over {args.years:g} years: {archived:,} archived in {segments} segments, "
+              f"{len(hot):,} hot ({time.perf_counter() - started:.1f} s to build)")
+        
+        expected = None
+        baseline = None
+        print(f"  {'workers':>7} {'startup s':>10} {'median s':>9} {'tasks/s':>12} {'speedup':>8}")
+        for count in workers:
+            startup = 0.0
+            if count > 1:
+                started = time.perf_counter()
+                aggregate.pool(count).submit(int).result()
+                startup = time.perf_counter() - started
+            
+            times = []
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                result = aggregate.aggregate(hot, workdir, workers=count)
+                times.append(time.perf_counter() - started)
+            if expected is None:
+                expected = comparable(result)
+            elif comparable(result) != expected:
+                print(f"Result with {count} workers differs from the inline result", file=sys.stderr)
+                return 1
+            
+            median = statistics.median(times)
+            baseline = baseline or median
+            print(f"  {count:>7} {startup:>10.2f} {median:>9.2f} {args.tasks / median:>12,.0f} {baseline / median:>7.2f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Deterministic synthetic TaskFlow data.
+
+generate_dataset() builds a data document at the current schema version
+with realistic category and priority mixes, recurring templates, subtasks
+and time sessions spread over a number of years ending at a given date.
+The same arguments always produce the same document.
+
+Usage:
+    python -m benchmarks.datagen --tasks 100000 --years 3 -o taskflow_data.json
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from schema import SCHEMA_VERSION, DEFAULT_MAX_CARRYOVERS
+
+CATEGORIES = [("Work", 45), ("Personal", 25), ("Health", 10), ("Shopping", 8), ("Learning", 7), ("Other", 5)]
+PRIORITIES = [("High", 20), ("Medium", 55), ("Low", 25)]
+RECURRENCE_PATTERNS = ["daily", "weekly", "monthly", "mon,wed,fri", "tue,thu"]
+ESTIMATES = ["", "15m", "30m", "45m", "1h", "1.5h", "2h", "3h"]
+VERBS = ["Review", "Write", "Plan", "Fix", "Call", "Prepare", "Update", "Research", "Draft", "Organize"]
+OBJECTS = ["quarterly report", "budget", "grocery list", "workout plan", "client proposal",
+           "release notes", "team sync", "dentist appointment", "reading list", "invoice"]
+NOTES = ["", "", "", "See /projects/report.pdf", "Follow up next week", "Blocked on feedback",
+         "Attach /docs/specs/v2.md before sending"]
+
+def weighted(rng, choices):
+    """Pick from (value, weight) pairs"""
+    total = sum(w for _, w in choices)
+    pick = rng.uniform(0, total)
+    for value, weight in choices:
+        pick -= weight
+        if pick <= 0:
+            return value
+    return choices[-1][0]
+
+def generate_task(rng, task_id, created, today):
+    """Generate one task created at the given datetime"""
+    category = weighted(rng, CATEGORIES)
+    priority = weighted(rng, PRIORITIES)
+    estimated_time = rng.choice(ESTIMATES)
+    is_recurring = rng.random() < 0.08
+    age_days = (today - created.date()).days
+    
+    # Most old tasks are done; today's tasks are mostly open
+    completed = rng.random() < (0.85 if age_days > 1 else 0.3)
+    carry_count = 0 if completed else min(age_days, rng.randint(0, 3))
+    due = created.date() + timedelta(days=carry_count)
+    
+    sessions = []
+    time_spent = 0.0
+    for session_id in range(1, rng.choice([0, 1, 1, 2, 3, 5]) + 1):
+        start = created + timedelta(hours=rng.randint(0, 10), minutes=rng.randint(0, 59))
+        duration = round(rng.lognormvariate(3.2, 0.7), 1)
+        sessions.append({
+            "start_time": start.isoformat(),
+            "session_id": session_id,
+            "end_time": (start + timedelta(minutes=duration)).isoformat(),
+            "duration": duration
+        })
+        time_spent += duration
+    
+    subtasks = [
+        {"id": i, "description": f"Step {i}", "completed": completed or rng.random() < 0.5}
+        for i in range(1, rng.choice([0, 0, 0, 2, 3, 5]) + 1)
+    ]
+    
+    completed_at = None
+    if completed:
+        completed_at = (created + timedelta(hours=rng.randint(1, 30))).isoformat()
+    
+    return {
+        "id": task_id,
+        "description": f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} #{task_id}",
+        "category": category,
+        "priority": priority,
+        "is_recurring": is_recurring,
+        "recurrence_pattern": rng.choice(RECURRENCE_PATTERNS) if is_recurring else "",
+        "notes": rng.choice(NOTES),
+        "due_date": due.strftime("%Y-%m-%d"),
+        "completed": completed,
+        "no_carryover": rng.random() < 0.05,
+        "carry_count": carry_count,
+        "estimated_time": estimated_time,
+        "max_time": rng.choice(["", "", "2h", "4h"]) if estimated_time else "",
+        "subtasks": subtasks,
+        "created_at": created.isoformat(),
+        "completed_at": completed_at,
+        "time_spent": round(time_spent, 1),
+        "time_sessions": sessions
+    }
+
+def generate_dataset(n_tasks, years=1, seed=0, today=None):
+    """Generate a data document with n_tasks spread evenly over the given years"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    span_days = max(int(years * 365), 1)
+    start = datetime.combine(today - timedelta(days=span_days - 1), datetime.min.time())
+    
+    tasks = []
+    for task_id in range(1, n_tasks + 1):
+        # Spread creation times evenly so every day has a similar load, with
+        # the last tasks landing on today
+        offset_days = (task_id - 1) * span_days // max(n_tasks, 1)
+        created = start + timedelta(days=offset_days, hours=rng.randint(7, 19), minutes=rng.randint(0, 59))
+        tasks.append(generate_task(rng, task_id, created, today))
+    
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "tasks": tasks,
+        "last_carryover_date": (today - timedelta(days=1)).strftime("%Y-%m-%d"),
+        "max_carryovers": DEFAULT_MAX_CARRYOVERS
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic TaskFlow data file")
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", help="Reference date YYYY-MM-DD (default: today)")
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+    
+    today = datetime.strptime(args.today, "%Y-%m-%d").date() if args.today else None
+    data = generate_dataset(args.tasks, args.years, args.seed, today)
+    if args.output == "-":
+        json.dump(data, sys.stdout)
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(data, f)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Latency and peak-memory benchmarks for TaskFlow hot paths.
+
+Each case runs against a synthetic data file (see benchmarks.datagen) at
+every requested size. Latency is reported as percentiles over repeated
+runs; peak memory is measured in a separate tracemalloc pass so tracing
+does not distort the timings. Results can be saved as a baseline and later
+runs compared against it to flag regressions.
+
+Cases for app.py need streamlit installed and are skipped otherwise.
+
+Usage:
+    python -m benchmarks.hotpaths --sizes 1000,10000,100000
+    python -m benchmarks.hotpaths --sizes 1000000 --repeats 3
+    python -m benchmarks.hotpaths --save-baseline benchmarks/baseline.json
+    python -m benchmarks.hotpaths --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import terminaltodo
+from benchmarks.datagen import generate_dataset
+
+try:
+    import app
+except ImportError as e:
+    app = None
+    APP_IMPORT_ERROR = str(e)
+
+# Number of tasks rendered per render_task_item/format_task_display sample
+RENDER_BATCH = 500
+
+def reset_carryover():
+    """Reload the store and make today's carryover pending again"""
+    app.load_data()
+    app.st.session_state.last_carryover_date = (date.today() - timedelta(days=1)).strftime("%Y-%m-%d")
+
+def render_sample(tasks):
+    """Pick up to RENDER_BATCH tasks, preferring today's"""
+    today = date.today().strftime("%Y-%m-%d")
+    sample = [t for t in tasks if t["due_date"] == today][:RENDER_BATCH]
+    return sample or tasks[-RENDER_BATCH:]
+
+def build_cases(data):
+    """Return (name, setup, run) triples; setup runs untimed before each run"""
+    noop = lambda: None
+    cases = [
+        ("terminal.load_tasks", noop, terminaltodo.load_tasks),
+        ("terminal.save_tasks", noop, lambda: terminaltodo.save_tasks(data)),
+        ("terminal.get_todays_tasks", noop, lambda: terminaltodo.get_todays_tasks(data)),
+        ("terminal.format_task_display", noop,
+         lambda: [terminaltodo.format_task_display(t) for t in render_sample(data["tasks"])]),
+    ]
+    if app is None:
+        return cases
+    
+    app.load_data()
+    state = app.st.session_state
+    snap = app.report_snapshot()
+    cases += [
+        ("app.load_data", noop, app.load_data),
+        ("app.save_data", noop, app.save_data),
+        ("app.perform_carryover", reset_carryover, app.perform_carryover),
+        ("app.get_todays_tasks", noop, app.get_todays_tasks),
+        ("app.today_overview", noop, lambda: app.today_overview(app.get_todays_tasks())),
+        ("app.load_today_snapshot", noop, app.load_today_snapshot),
+        ("app.generate_daily_report", noop, lambda: app.generate_daily_report(snap)),
+        ("app.generate_weekly_report", noop, lambda: app.generate_weekly_report(snap, 7)),
+        ("app.generate_category_report", noop, lambda: app.generate_category_report(snap, 30)),
+        ("app.generate_window_report", noop, lambda: app.generate_window_report(snap)),
+        ("app.render_task_item", noop,
+         lambda: [app.render_task_item(t) for t in render_sample(state.tasks)]),
+    ]
+    return cases
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def measure(setup, run, repeats):
+    """Time repeated runs and measure peak traced memory of one run"""
+    timings = []
+    for _ in range(repeats):
+        setup()
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    
+    setup()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        "runs": repeats,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p90_ms": round(percentile(timings, 90), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(max(timings), 3),
+        "peak_kb": round(peak / 1024, 1)
+    }
+
+def run_size(n_tasks, years, repeats, workdir, only=None):
+    """Generate a dataset of n_tasks and benchmark every case against it"""
+    data = generate_dataset(n_tasks, years=years, seed=n_tasks)
+    path = os.path.join(workdir, f"taskflow_{n_tasks}.json")
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    
+    terminaltodo.DATA_FILE = path
+    if app is not None:
+        app.DATA_FILE = path
+    
+    # Large stores get fewer repeats so a full run stays practical
+    repeats = repeats or max(3, min(30, 300000 // max(n_tasks, 1)))
+    results = {}
+    for name, setup, run in build_cases(data):
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = measure(setup, run, repeats)
+        print_row(name, results[name])
+    return results
+
+def print_row(name, result):
+    print(f"  {name:34} {result['p50_ms']:10.2f} {result['p90_ms']:10.2f} "
+          f"{result['p99_ms']:10.2f} {result['peak_kb'] / 1024:10.1f}")
+
+def compare(results, baseline, tolerance, min_delta_ms=1.0):
+    """Return regression messages for cases slower or larger than the baseline.
+    
+    Slowdowns smaller than min_delta_ms are ignored as timer noise.
+    """
+    regressions = []
+    for size, cases in results.items():
+        for name, result in cases.items():
+            base = baseline.get(size, {}).get(name)
+            if not base:
+                continue
+            slower = result["p50_ms"] - base["p50_ms"]
+            if result["p50_ms"] > base["p50_ms"] * (1 + tolerance) and slower >= min_delta_ms:
+                regressions.append(f"{name} @ {size}: p50 {result['p50_ms']:.2f} ms vs baseline {base['p50_ms']:.2f} ms")
+            if result["peak_kb"] > base["peak_kb"] * (1 + tolerance):
+                regressions.append(f"{name} @ {size}: peak {result['peak_kb']:.0f} KiB vs baseline {base['peak_kb']:.0f} KiB")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TaskFlow hot paths on synthetic data")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma separated task counts")
+    parser.add_argument("--years", type=float, default=3, help="History span of the synthetic data")
+    parser.add_argument("--repeats", type=int, default=None, help="Timed runs per case (default: scaled by size)")
+    parser.add_argument("--only", help="Comma separated substrings of case names to run")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a stored baseline JSON")
+    parser.add_argument("--save-baseline", help="Store these results as the baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+    
+    if app is None:
+        print(f"Skipping app.py cases: {APP_IMPORT_ERROR}", file=sys.stderr)
+    
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = [s.strip() for s in args.only.split(",")] if args.only else None
+    workdir = tempfile.mkdtemp(prefix="taskflow_bench_")
+    results = {}
+    try:
+        for n_tasks in sizes:
+            print(f"\n{n_tasks:,} tasks over {args.years:g} years")
+            print(f"  {'case':34} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'peak MiB':>10}")
+            results[str(n_tasks)] = run_size(n_tasks, args.years, args.repeats, workdir, only)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+    
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for message in regressions:
+            print(f"REGRESSION: {message}")
+        if regressions:
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Load test for the TaskFlow server (server.py).
+
+Starts a server on a synthetic data file in a subprocess (or targets a
+running one with --address), then runs concurrent client processes, each
+with its own keep-alive connection, for a fixed time. Every client loops over a
+request mix modelled on the apps: today's open tasks, single task
+lookups, timer start/stop pairs and health checks. Reports requests per
+second and latency percentiles per request kind.
+
+Usage:
+    python -m benchmarks.loadtest --tasks 10000 --clients 8 --seconds 10
+    python -m benchmarks.loadtest --address http://127.0.0.1:8765 --clients 32
+"""
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import client
+import jsonstream
+from benchmarks.datagen import generate_dataset
+
+# (kind, weight) of each step in the request mix
+MIX = [("list_today", 50), ("get_task", 30), ("timer", 10), ("health", 10)]
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list of numbers"""
+    rank = max(int(round(pct / 100 * len(samples) + 0.5)) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+def run_client(address, task_ids, deadline, seed):
+    """Issue requests until the deadline (epoch seconds); return ([(kind, seconds)], errors)"""
+    rng = random.Random(seed)
+    conn = client.Client(address)
+    kinds = [kind for kind, weight in MIX for _ in range(weight)]
+    samples = []
+    errors = 0
+    while time.time() < deadline:
+        kind = rng.choice(kinds)
+        start = time.perf_counter()
+        try:
+            if kind == "list_today":
+                conn.request("GET", "/tasks", params={"due": "today", "status": "open"})
+            elif kind == "get_task":
+                conn.request("GET", f"/tasks/{rng.choice(task_ids)}")
+            elif kind == "timer":
+                conn.request("POST", "/timer/start", {"id": rng.choice(task_ids)})
+                conn.request("POST", "/timer/stop")
+            else:
+                conn.request("GET", "/health")
+        except ValueError:
+            # Lost a timer race with another client; still a served request
+            errors += 1
+        samples.append((kind, time.perf_counter() - start))
+    conn.close()
+    return samples, errors
+
+def wait_for(address, timeout=30):
+    """Poll /health until the server answers"""
+    probe = client.Client(address, timeout=2)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return probe.request("GET", "/health")
+        except (OSError, ValueError):
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+        finally:
+            probe.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure TaskFlow server throughput")
+    parser.add_argument("--address", help="Use a running server instead of starting one")
+    parser.add_argument("--tasks", type=int, default=10000, help="Synthetic tasks for a started server")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client connections")
+    parser.add_argument("--seconds", type=float, default=10, help="Test duration")
+    parser.add_argument("--port", type=int, default=18765, help="Port for a started server")
+    args = parser.parse_args(argv)
+    
+    workdir = None
+    process = None
+    address = args.address
+    try:
+        if address is None:
+            workdir = tempfile.mkdtemp(prefix="taskflow_load_")
+            path = os.path.join(workdir, "todo_data.json")
+            data = generate_dataset(args.tasks, 1)
+            with open(path, 'w') as f:
+                jsonstream.write_document(f, data)
+            address = f"http://127.0.0.1:{args.port}"
+            process = subprocess.Popen([sys.executable, "-m", "server", "--file", path, "--port", str(args.port)],
+                                       stderr=subprocess.DEVNULL)
+        wait_for(address)
+        
+        # Timers may only run on open tasks
+        task_ids = [t["id"] for t in client.Client(address).request("GET", "/tasks", params={"due": "all", "status": "open"})]
+        if not task_ids:
+            print("No open tasks to run the test against", file=sys.stderr)
+            return 1
+        
+        # Separate processes, so decoding responses is not serialized on one GIL
+        with ProcessPoolExecutor(args.clients) as pool:
+            started = time.time()
+            deadline = started + args.seconds
+            futures = [pool.submit(run_client, address, task_ids, deadline, i) for i in range(args.clients)]
+            results = [future.result() for future in futures]
+            elapsed = time.time() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    samples = [sample for client_samples, _ in results for sample in client_samples]
+    errors = sum(e for _, e in results)
+    requests = sum(2 if kind == "timer" else 1 for kind, _ in samples)
+    print(f"{args.clients} clients, {elapsed:.1f} s: {requests:,} requests, {requests / elapsed:,.0f} req/s"
+          f" ({errors} rejected timer calls)")
+    print(f"  {'kind':12} {'count':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for kind, _ in MIX:
+        times = sorted(seconds * 1000 for k, seconds in samples if k == kind)
+        if times:
+            print(f"  {kind:12} {len(times):>8,} {percentile(times, 50):>9.2f} "
+                  f"{percentile(times, 90):>9.2f} {percentile(times, 99):>9.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Startup-time benchmark for the TaskFlow apps.
+
+Reports per-module import time (via ``python -X importtime``) for a cold
+interpreter and fails when a lazily imported dependency leaks back into the
+startup path or the total import time exceeds the budget.
+
+With --cli, also times ``python -m terminaltodo list`` end to end against a
+small data file, net of a bare interpreter start, so the batch CLI's
+startup-to-first-output can be held to a budget of its own.
+
+Usage:
+    python -m benchmarks.startup [--module app] [--budget-ms 1500] [--runs 5]
+    python -m benchmarks.startup --module terminaltodo --cli --cli-budget-ms 50
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that must only be imported on demand
+LAZY_MODULES = ["pandas", "plotly", "numpy"]
+# Subsystems terminaltodo imports inside the commands that use them
+TERMINAL_LAZY_MODULES = ["changefeed", "client", "deltasync", "export", "jsonstream", "merge",
+                         "query", "search", "sessionstore", "snapshot", "concurrent.futures"]
+
+def run_importtime(module):
+    """Import a module in a fresh interpreter and return parsed importtime rows"""
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps(sorted(m for m in sys.modules)))"
+    )
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+    
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        indent = len(name) - len(name.lstrip())
+        rows.append({
+            "module": name.strip(),
+            "depth": (indent - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us)
+        })
+    
+    loaded = set(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return rows, loaded
+
+def time_command(argv, runs):
+    """Median wall time in ms of running argv in a fresh interpreter with warm bytecode caches"""
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable] + argv, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+        samples.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} failed:\n{proc.stderr}")
+    return statistics.median(samples)
+
+def time_cli(runs):
+    """(bare interpreter ms, `terminaltodo list` ms) on a one-task data file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "tasks.json")
+        time_command(["-m", "terminaltodo", "--file", data_file, "add", "benchmark"], 1)
+        return time_command(["-c", "pass"], runs), time_command(["-m", "terminaltodo", "--file", data_file, "list"], runs)
+
+def entry_children(rows, module):
+    """Return the modules imported directly by the entry module.
+    
+    importtime output is post-order, so the direct children of the entry
+    are the depth-1 rows between the previous depth-0 row and the entry.
+    """
+    children = []
+    for row in rows:
+        if row["depth"] == 0:
+            if row["module"] == module:
+                return children
+            children = []
+        elif row["depth"] == 1:
+            children.append(row)
+    return []
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure TaskFlow cold-start import time")
+    parser.add_argument("--module", default="app", help="Entry module to import (app or terminaltodo)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold interpreter runs")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if median import time exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="Number of modules to list")
+    parser.add_argument("--cli", action="store_true", help="Also time `python -m terminaltodo list` end to end")
+    parser.add_argument("--cli-budget-ms", type=float, default=None,
+                        help="Fail if the CLI takes longer than this beyond a bare interpreter start")
+    args = parser.parse_args(argv)
+    
+    totals = []
+    per_module = {}
+    loaded = set()
+    for _ in range(args.runs):
+        try:
+            rows, loaded = run_importtime(args.module)
+        except RuntimeError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+        entry = [r for r in rows if r["depth"] == 0 and r["module"] == args.module]
+        totals.append(entry[-1]["cumulative_us"] / 1000 if entry else 0.0)
+        for row in entry_children(rows, args.module):
+            per_module.setdefault(row["module"], []).append(row["cumulative_us"] / 1000)
+    
+    print(f"Cold import of '{args.module}' over {args.runs} runs")
+    print(f"  median {statistics.median(totals):8.1f} ms   min {min(totals):8.1f} ms   max {max(totals):8.1f} ms")
+    print(f"\n{'module':40} {'median ms':>10}")
+    ranked = sorted(per_module.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+    for name, samples in ranked[:args.top]:
+        print(f"{name:40} {statistics.median(samples):10.1f}")
+    
+    failures = []
+    lazy = LAZY_MODULES + (TERMINAL_LAZY_MODULES if args.module == "terminaltodo" else [])
+    leaked = sorted(m for m in lazy if m in loaded)
+    if leaked:
+        failures.append(f"lazy dependencies imported at startup: {', '.join(leaked)}")
+    if args.budget_ms is not None and statistics.median(totals) > args.budget_ms:
+        failures.append(f"median import time {statistics.median(totals):.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+    
+    if args.cli or args.cli_budget_ms is not None:
+        try:
+            bare, cli = time_cli(args.runs)
+        except RuntimeError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+        print(f"\n`terminaltodo list`: median {cli:.1f} ms, {cli - bare:.1f} ms beyond a bare interpreter ({bare:.1f} ms)")
+        if args.cli_budget_ms is not None and cli - bare > args.cli_budget_ms:
+            failures.append(f"CLI startup {cli - bare:.1f} ms exceeds budget {args.cli_budget_ms:.1f} ms")
+    
+    for failure in failures:
+        print(f"\nREGRESSION: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
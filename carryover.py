@@ -0,0 +1,83 @@
+"""Daily carryover rules shared by the web app, the terminal store and the server.
+
+Once a day, open tasks that are overdue move to today until they have
+been carried max_carryovers times (tasks marked no_carryover stay put),
+and recurring tasks completed yesterday get a fresh copy due on their next
+occurrence. A copy is created now, so it gets its own created_at and with
+it its own identity (see merge.task_hash).
+"""
+from datetime import date, datetime, timedelta
+
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+def next_weekday(d, weekday):
+    """Find next occurrence of specific weekday"""
+    days_ahead = weekday - d.weekday()
+    if days_ahead <= 0:
+        days_ahead += 7
+    return d + timedelta(days_ahead)
+
+def next_due_date(task, today=None):
+    """Calculate next due date for recurring tasks"""
+    today = today or date.today()
+    pattern = task["recurrence_pattern"].lower()
+    
+    if pattern == "daily":
+        return (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    
+    elif pattern == "weekly":
+        return (today + timedelta(days=7)).strftime("%Y-%m-%d")
+    
+    elif pattern == "monthly":
+        next_month = today.replace(day=1) + timedelta(days=32)
+        next_month = next_month.replace(day=1)
+        last_day = (next_month.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        day = min(today.day, last_day.day)
+        return next_month.replace(day=day).strftime("%Y-%m-%d")
+    
+    elif "," in pattern:  # Specific weekdays
+        valid_days = [WEEKDAYS[day.strip()] for day in pattern.split(",") if day.strip() in WEEKDAYS]
+        
+        if valid_days:
+            next_dates = [next_weekday(today, wd) for wd in valid_days]
+            return min(next_dates).strftime("%Y-%m-%d")
+    
+    return (today + timedelta(days=1)).strftime("%Y-%m-%d")
+
+def carry_over(tasks, max_carryovers, next_id, today=None):
+    """Apply one day's carryover to a task list in place.
+    
+    next_id() returns a free task id for each recurring copy; copies are
+    appended to tasks. Returns (number of tasks carried, new copies).
+    """
+    today = today or date.today()
+    today_str = today.strftime("%Y-%m-%d")
+    yesterday = today - timedelta(days=1)
+    
+    carried = 0
+    for task in tasks:
+        if task["completed"] or task["due_date"] >= today_str or task["no_carryover"]:
+            continue
+        if task["carry_count"] >= max_carryovers:
+            continue
+        task["due_date"] = today_str
+        task["carry_count"] += 1
+        carried += 1
+    
+    recurred = []
+    for task in tasks[:]:
+        if task["is_recurring"] and task["completed"] and task["completed_at"]:
+            if datetime.fromisoformat(task["completed_at"]).date() == yesterday:
+                new_task = task.copy()
+                new_task["id"] = next_id()
+                new_task["created_at"] = datetime.combine(today, datetime.now().time()).isoformat()
+                new_task["completed"] = False
+                new_task["completed_at"] = None
+                new_task["due_date"] = next_due_date(task, today)
+                new_task["carry_count"] = 0
+                new_task["subtasks"] = []
+                new_task["time_spent"] = 0
+                new_task["time_sessions"] = []
+                tasks.append(new_task)
+                recurred.append(new_task)
+    return carried, recurred
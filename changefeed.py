@@ -0,0 +1,263 @@
+"""Change feed for a data file shared by several writers.
+
+The web app, the terminal app and external scripts all rewrite the same
+JSON file. A ChangeFeed watches that file from a background thread (inotify
+on Linux, stat polling elsewhere) and publishes a version number that
+increases by one for every write it observes. Each version comes with a
+Change listing only the tasks that differ from the previous version, found
+by comparing per-task checksums, so a session that is a few versions behind
+applies those tasks instead of reloading the whole file.
+
+There is one feed per file and process (see watch()), so the file is parsed
+once per write no matter how many Streamlit sessions are open.
+
+snapshot() returns an immutable Snapshot (see snapshot.py) of the file at
+the current version for readers off the UI thread. It is advanced with the
+same Change entries, so it also costs one parse per process.
+
+Writers that read, modify and write the file back hold locked() around the
+cycle and check for writes they have not seen yet before replacing the file
+(optimistic concurrency): a task changed both locally and by the other
+writer keeps the stored version and is reported as a conflict.
+"""
+import contextlib
+import copy
+import json
+import os
+import select
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+
+POLL_INTERVAL = 1.0  # Seconds between stat checks when inotify is unavailable
+HISTORY = 256  # Changes kept for sessions that fall behind
+META_KEYS = ("last_carryover_date", "max_carryovers")
+MISSING = (0, 0, 0)  # Stamp of a file that does not exist
+
+def file_stamp(path):
+    """(mtime_ns, size, inode) of a file, or MISSING"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return MISSING
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def task_checksum(task):
+    """Checksum of a task's full content"""
+    return zlib.crc32(json.dumps(task, sort_keys=True).encode("utf-8"))
+
+@contextlib.contextmanager
+def locked(path):
+    """Hold an exclusive advisory lock on path for a read-check-write cycle"""
+    try:
+        import fcntl
+    except ImportError:
+        # No advisory locks on this platform; the stamp checks still apply
+        yield
+        return
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+class Change:
+    """The tasks one write added, changed or deleted.
+    
+    tasks maps id -> new task (None when deleted); before and after map id
+    -> checksum in the previous and new version (None when absent). meta
+    holds the document-level settings as written.
+    """
+    __slots__ = ("version", "tasks", "before", "after", "meta")
+    
+    def __init__(self, version, tasks, before, after, meta):
+        self.version = version
+        self.tasks = tasks
+        self.before = before
+        self.after = after
+        self.meta = meta
+
+class Inotify:
+    """Wait for writes to one file with Linux inotify, called through ctypes"""
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    MASK = 0x2 | 0x8 | 0x80 | 0x100 | 0x200
+    EVENT = struct.Struct("iIII")
+    
+    def __init__(self, path):
+        import ctypes
+        import ctypes.util
+        
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch the directory: atomic saves replace the file's inode
+        directory = os.path.dirname(os.path.abspath(path))
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.name = os.fsencode(os.path.basename(path))
+    
+    def wait(self, timeout):
+        """Block until the file may have changed or timeout seconds pass; return True on a change"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return False
+        buffer = os.read(self.fd, 65536)
+        offset = 0
+        changed = False
+        while offset < len(buffer):
+            _, _, _, length = self.EVENT.unpack_from(buffer, offset)
+            offset += self.EVENT.size
+            changed = changed or buffer[offset:offset + length].rstrip(b"\0") == self.name
+            offset += length
+        return changed
+
+def open_watcher(path):
+    """An Inotify for path, or None where inotify is unavailable"""
+    try:
+        return Inotify(path)
+    except (OSError, AttributeError):
+        # Not Linux, no libc symbol, or out of watches
+        return None
+
+class ChangeFeed:
+    """Versioned changes to one data file, observed by a background thread"""
+    
+    def __init__(self, path, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.version = 0
+        self.history = deque(maxlen=HISTORY)
+        self.lock = threading.Lock()
+        self.stamp, data = self._read()
+        self.checksums = {task["id"]: task_checksum(task) for task in data.get("tasks", [])}
+        self.meta = {key: data[key] for key in META_KEYS if key in data}
+        self.mode = None
+        self.thread = None
+        self._snapshot = None
+    
+    def _read(self):
+        """(stamp, document) of the file as it is now"""
+        try:
+            with open(self.path, 'r') as f:
+                stamp = os.fstat(f.fileno())
+                data = json.load(f)
+        except FileNotFoundError:
+            return MISSING, {}
+        return (stamp.st_mtime_ns, stamp.st_size, stamp.st_ino), data
+    
+    def start(self):
+        """Start the watcher thread"""
+        watcher = open_watcher(self.path)
+        self.mode = "inotify" if watcher else "polling"
+        self.thread = threading.Thread(target=self._watch, args=(watcher,), name="changefeed", daemon=True)
+        self.thread.start()
+    
+    def _watch(self, watcher):
+        while True:
+            if watcher is None:
+                time.sleep(self.poll_interval)
+            else:
+                # The timeout doubles as a stat poll in case an event was missed
+                watcher.wait(self.poll_interval * 10)
+            try:
+                self.poll()
+            except (OSError, ValueError):
+                # A writer that does not replace the file atomically; retry on the next event
+                pass
+    
+    def poll(self):
+        """Record the file's current content if it changed; return the version"""
+        if file_stamp(self.path) == self.stamp:
+            return self.version
+        with self.lock:
+            stamp, data = self._read()
+            if stamp != self.stamp:
+                self._record(stamp, data.get("tasks", []), data, copy_tasks=False)
+            return self.version
+    
+    def publish(self, data, stamp):
+        """Record a document this process has just written, without reading it back.
+        
+        Changed tasks are copied, since the writer keeps mutating its own.
+        """
+        with self.lock:
+            if stamp != self.stamp:
+                self._record(stamp, data["tasks"], data, copy_tasks=True)
+            return self.version
+    
+    def _record(self, stamp, tasks, data, copy_tasks):
+        checksums = {}
+        changed = {}
+        before = {}
+        for task in tasks:
+            checksum = checksums[task["id"]] = task_checksum(task)
+            previous = self.checksums.get(task["id"])
+            if previous != checksum:
+                changed[task["id"]] = copy.deepcopy(task) if copy_tasks else task
+                before[task["id"]] = previous
+        for task_id, previous in self.checksums.items():
+            if task_id not in checksums:
+                changed[task_id] = None
+                before[task_id] = previous
+        meta = {key: data[key] for key in META_KEYS if key in data}
+        
+        self.stamp = stamp
+        self.checksums = checksums
+        if changed or meta != self.meta:
+            self.version += 1
+            after = {task_id: checksums.get(task_id) for task_id in changed}
+            self.history.append(Change(self.version, changed, before, after, meta))
+            self.meta = meta
+    
+    def changes_since(self, version):
+        """Changes after version, oldest first; None if some are no longer kept"""
+        with self.lock:
+            return self._changes_since(version)
+    
+    def _changes_since(self, version):
+        if version >= self.version:
+            return []
+        if not self.history or self.history[0].version > version + 1:
+            return None
+        return [change for change in self.history if change.version > version]
+    
+    def snapshot(self):
+        """An immutable Snapshot of the tasks as of the current version"""
+        from snapshot import Snapshot
+        
+        with self.lock:
+            current = self._snapshot
+            changes = None if current is None else self._changes_since(current.version)
+            if changes is None:
+                # First use, or fell behind the history: read the file once
+                stamp, data = self._read()
+                if stamp != self.stamp:
+                    self._record(stamp, data.get("tasks", []), data, copy_tasks=False)
+                meta = {key: data[key] for key in META_KEYS if key in data}
+                current = Snapshot.of(self.version, data.get("tasks", []), meta)
+            elif changes:
+                current = current.advance(changes)
+            self._snapshot = current
+            return current
+    
+    def drop_snapshot(self):
+        """Forget the snapshot; the next one is read from the file"""
+        with self.lock:
+            self._snapshot = None
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+def watch(path, poll_interval=POLL_INTERVAL):
+    """The process-wide feed for path, started on first use"""
+    key = os.path.abspath(path)
+    with _feeds_lock:
+        feed = _feeds.get(key)
+        if feed is None:
+            feed = _feeds[key] = ChangeFeed(path, poll_interval)
+            feed.start()
+        return feed
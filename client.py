@@ -0,0 +1,194 @@
+"""Thin clients for the TaskFlow server (see server.py).
+
+Client speaks the server's JSON-over-HTTP API over TCP or a Unix socket,
+reusing one connection for every request. RemoteStore wraps it in the
+TaskStore interface used by terminaltodo's batch CLI. DocumentSync lets the
+web app load the whole document from the server and then send back only
+the tasks that changed.
+
+http.client and urllib.parse are imported on first use so the batch CLI
+starts as fast as before when no server is used.
+"""
+import io
+import json
+import os
+import zlib
+
+import jsonstream
+from changefeed import task_checksum
+
+ENV_VAR = "TASKFLOW_SERVER"
+DEFAULT_PORT = 8765
+TIMEOUT = 30
+
+def _unix_connection(path, timeout):
+    import http.client
+    import socket
+    
+    class UnixHTTPConnection(http.client.HTTPConnection):
+        def connect(self):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.timeout)
+            self.sock.connect(path)
+    
+    return UnixHTTPConnection("localhost", timeout=timeout)
+
+class Client:
+    """JSON requests to a TaskFlow server at http://host:port or unix:/path"""
+    
+    def __init__(self, address, timeout=TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self.conn = None
+    
+    def _connect(self):
+        import http.client
+        from urllib.parse import urlsplit
+        
+        if self.address.startswith("unix:"):
+            return _unix_connection(self.address[5:], self.timeout)
+        parts = urlsplit(self.address if "://" in self.address else f"http://{self.address}")
+        return http.client.HTTPConnection(parts.hostname, parts.port or DEFAULT_PORT, timeout=self.timeout)
+    
+    def request(self, method, path, body=None, params=None):
+        """Send a request and return the decoded response; raise ValueError on errors"""
+        import http.client
+        from urllib.parse import urlencode
+        
+        if params:
+            path += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+        if body is not None and not isinstance(body, (str, bytes)):
+            body = json.dumps(body, separators=(",", ":"))
+        headers = {"Content-Type": "application/json"}
+        
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self._connect()
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                raw = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The server may have closed an idle keep-alive connection
+                self.close()
+                if attempt:
+                    raise
+        
+        result = json.loads(raw) if raw else None
+        if response.status >= 400:
+            message = result.get("error") if isinstance(result, dict) else None
+            raise ValueError(message or f"Server returned HTTP {response.status}")
+        return result
+    
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class RemoteStore:
+    """The TaskStore interface of terminaltodo, backed by a server"""
+    
+    def __init__(self, client):
+        self.client = client
+        self._data = None
+        self.conflicts = []
+    
+    @property
+    def data(self):
+        """The server's whole document, fetched once"""
+        if self._data is None:
+            self._data = self.client.request("GET", "/data")
+        return self._data
+    
+    def add_task(self, **fields):
+        return self.client.request("POST", "/tasks", fields)
+    
+    def complete_task(self, task_id, complete_subtasks=False):
+        return self.client.request("POST", f"/tasks/{int(task_id)}/complete", {"subtasks": complete_subtasks})
+    
+    def start_timer(self, task_id):
+        result = self.client.request("POST", "/timer/start", {"id": task_id})
+        return result["task"], result["session"]
+    
+    def stop_timer(self):
+        result = self.client.request("POST", "/timer/stop")
+        return result["task"], result["session"]
+    
+    def import_tasks(self, tasks, merge=False):
+        body = "".join(json.dumps(task) + "\n" for task in tasks)
+        return self.client.request("POST", "/import", body, {"merge": int(merge)})
+    
+    def list_tasks(self, due="today", status="all", where=None):
+        return self.client.request("GET", "/tasks", params={"due": due, "status": status, "where": where})
+    
+    def search(self, text, category=None, priority=None, status="all", limit=None):
+        params = {"q": text, "category": category, "priority": priority, "status": status, "limit": limit}
+        return [tuple(pair) for pair in self.client.request("GET", "/search", params=params)]
+    
+    def report(self, days=7):
+        return self.client.request("GET", "/reports", params={"days": days})
+    
+    def save(self):
+        """Nothing to do: the server saves on its own schedule"""
+
+class DocumentSync:
+    """Keep a client-side copy of the document in step with the server.
+    
+    load() fetches the document and remembers a checksum per task;
+    save() then sends only tasks whose checksum changed plus the ids that
+    disappeared, in one PATCH.
+    """
+    
+    def __init__(self, client):
+        self.client = client
+        self.synced = {}
+        self.revision = 0
+    
+    def _update_revision(self):
+        # Derived from content, so every client holding the same tasks agrees
+        self.revision = zlib.crc32(json.dumps(sorted(self.synced.items())).encode("utf-8"))
+    
+    def load(self):
+        data = self.client.request("GET", "/data")
+        self.synced = {task["id"]: task_checksum(task) for task in data["tasks"]}
+        self._update_revision()
+        return data
+    
+    def save(self, data, retained_ids=()):
+        """Send changes since the last load or save; return (changed, deleted) counts.
+        
+        retained_ids are tasks missing from data["tasks"] that must not be
+        deleted, such as tasks spilled to cold partitions.
+        """
+        current = {}
+        changed = []
+        for task in data["tasks"]:
+            checksum = current[task["id"]] = task_checksum(task)
+            if self.synced.get(task["id"]) != checksum:
+                changed.append(task)
+        retained = set(retained_ids)
+        deleted = [task_id for task_id in self.synced if task_id not in current and task_id not in retained]
+        
+        patch = {key: data[key] for key in ("last_carryover_date", "max_carryovers") if key in data}
+        if changed or deleted or patch:
+            self.client.request("PATCH", "/data", dict(patch, tasks=changed, deleted=deleted))
+        for task_id in retained:
+            if task_id in self.synced:
+                current[task_id] = self.synced[task_id]
+        self.synced = current
+        self._update_revision()
+        return len(changed), len(deleted)
+    
+    def replace(self, data, extra_tasks=None):
+        """Replace the server's document, e.g. after a full import"""
+        out = io.StringIO()
+        jsonstream.write_document(out, data, extra_tasks)
+        self.client.request("PUT", "/data", out.getvalue())
+        self.synced = {}
+        self.revision = 0
+
+def connect(address=None):
+    """A Client for address, or for $TASKFLOW_SERVER; None if neither is set"""
+    address = address or os.environ.get(ENV_VAR)
+    return Client(address) if address else None
@@ -0,0 +1,381 @@
+"""Delta sync of task lists between machines through a sync hub.
+
+Each machine (replica) keeps its own data file with its own task ids. A
+hub holds the shared history: one record per task, keyed by the task's
+content hash at first sync (see merge.task_hash), with a change sequence
+number (seq) from a hub-wide counter. Every time session inside a record
+carries the seq of the change that last touched it as well.
+
+A sync round on a replica is
+
+    pull   records with seq above the replica's cursor; tasks created
+           before the cursor come with only the sessions changed since
+    push   tasks whose checksum differs from the last sync, and deletions,
+           each with the seq it was based on
+
+so the work and the payload grow with the number of changes, not with the
+length of the history. The replica remembers, per local id, the record key,
+the seq it last saw and the task checksum at that point (SyncState, stored
+next to the data file).
+
+Concurrent changes to one task resolve the same way on every replica and
+on the hub (resolve()):
+
+    - time sessions are unioned by start time; an ended session beats an
+      open one, and of two ended ones the later end wins
+    - completion sticks, with the earlier completion time
+    - carry count and due date take the larger value; subtasks are unioned
+      by description and completion sticks
+    - every other field comes from the newer change (ties broken by
+      checksum), and time_spent never shrinks
+    - an edit beats a concurrent deletion
+
+SyncHub is the reference hub. It runs in memory, so tests can sync two
+task lists through it directly. FileHub keeps one in a JSON file, for a
+shared folder. `python -m server --hub FILE` serves one over HTTP, and
+RemoteHub talks to that server.
+"""
+import copy
+import itertools
+import json
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import changefeed
+import client
+from merge import task_hash
+
+ENV_VAR = "TASKFLOW_SYNC"
+
+def task_key(task):
+    """Hub record key for a task seen for the first time"""
+    return task_hash(task).hex()
+
+def strip_id(task):
+    """A task without its replica-local id"""
+    return {key: value for key, value in task.items() if key != "id"}
+
+def _session_rank(session):
+    # Ended beats open; later end beats earlier
+    return ("end_time" in session, session.get("end_time", ""), session.get("duration", 0))
+
+def session_keys(sessions):
+    """Pair sessions with their identity: the start time, plus a counter for repeated start times"""
+    seen = {}
+    for session in sessions:
+        n = seen[session["start_time"]] = seen.get(session["start_time"], -1) + 1
+        yield (f"{session['start_time']}#{n}" if n else session["start_time"]), session
+
+def merge_sessions(*session_lists):
+    """Union time sessions by identity, sorted by start like merge_task; clashing session ids are renumbered"""
+    by_start = {}
+    for sessions in session_lists:
+        for key, session in session_keys(sessions):
+            current = by_start.get(key)
+            if current is None or _session_rank(session) > _session_rank(current):
+                by_start[key] = session
+    
+    ordered = list(by_start.values())
+    if len(session_lists) > 1:
+        ordered.sort(key=lambda s: s["start_time"])
+    merged = []
+    used = set()
+    next_id = max([s.get("session_id", 0) for s in ordered] + [0]) + 1
+    for session in ordered:
+        if session.get("session_id") in used or "session_id" not in session:
+            session = dict(session, session_id=next_id)
+            next_id += 1
+        used.add(session["session_id"])
+        merged.append(session)
+    return merged
+
+def resolve(ours, theirs, ours_at, theirs_at):
+    """Merge two concurrently changed versions of a task (see the module docstring)"""
+    if (ours_at, changefeed.task_checksum(ours)) >= (theirs_at, changefeed.task_checksum(theirs)):
+        newer, older = ours, theirs
+    else:
+        newer, older = theirs, ours
+    merged = dict(newer)
+    
+    completed_at = [t["completed_at"] for t in (ours, theirs) if t["completed"] and t["completed_at"]]
+    merged["completed"] = ours["completed"] or theirs["completed"]
+    merged["completed_at"] = min(completed_at) if completed_at else None
+    merged["carry_count"] = max(ours["carry_count"], theirs["carry_count"])
+    merged["due_date"] = max(ours["due_date"], theirs["due_date"])
+    
+    subtasks = {}
+    for subtask in newer["subtasks"] + older["subtasks"]:
+        existing = subtasks.get(subtask["description"])
+        if existing is None:
+            subtasks[subtask["description"]] = dict(subtask)
+        elif subtask["completed"]:
+            existing["completed"] = True
+    merged["subtasks"] = [dict(s, id=i) for i, s in enumerate(subtasks.values(), 1)]
+    
+    merged["time_sessions"] = merge_sessions(newer["time_sessions"], older["time_sessions"])
+    tracked = round(sum(s.get("duration", 0) for s in merged["time_sessions"]), 1)
+    merged["time_spent"] = max(ours["time_spent"], theirs["time_spent"], tracked)
+    return merged
+
+class SyncState:
+    """What a replica last synced: its id, its cursor and id -> [key, seq, checksum]"""
+    
+    def __init__(self, replica=None, cursor=0, tasks=None):
+        self.replica = replica or uuid.uuid4().hex
+        self.cursor = cursor
+        self.tasks = tasks or {}
+    
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r') as f:
+            state = json.load(f)
+        return cls(state["replica"], state["cursor"], {int(k): v for k, v in state["tasks"].items()})
+    
+    def save(self, path):
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"replica": self.replica, "cursor": self.cursor, "tasks": self.tasks}, f, separators=(",", ":"))
+        os.replace(tmp_file, path)
+
+def sync(tasks, state, hub, before_change=None, now=None):
+    """Run one pull-then-push round, updating tasks (a list, in place) and state.
+    
+    before_change(task, new=False) is called before a local task is
+    modified or removed and after one is added, so a store can track what
+    the sync touched. Returns counts of pulled and pushed changes and of
+    conflicts resolved.
+    """
+    now = now or datetime.now().isoformat(timespec="seconds")
+    touch = before_change or (lambda task, new=False: None)
+    by_id = {task["id"]: task for task in tasks}
+    keys = {entry[0]: local_id for local_id, entry in state.tasks.items()}
+    changed = {task["id"] for task in tasks
+               if state.tasks.get(task["id"], (None, None, None))[2] != changefeed.task_checksum(task)}
+    deleted = {local_id for local_id in state.tasks if local_id not in by_id}
+    ids = itertools.count(max(itertools.chain(by_id, state.tasks), default=0) + 1)
+    removed = set()
+    counts = {"pulled": 0, "pushed": 0, "conflicts": 0}
+    
+    # Tasks never synced are matched to hub records by content hash, like
+    # merge imports, so replicas that shared an export do not duplicate it
+    for local_id in sorted(changed - state.tasks.keys()):
+        key = task_key(by_id[local_id])
+        if key in keys:
+            key = f"{key}-{state.replica[:8]}-{local_id}"
+        keys[key] = local_id
+        state.tasks[local_id] = [key, 0, None]
+    
+    def apply(change):
+        key = change["key"]
+        local_id = keys.get(key)
+        local = by_id.get(local_id)
+        incoming = change["task"]
+        if local_id in deleted:
+            # The deletion is pushed next; the hub sends the task back if it was edited
+            return
+        if local_id in changed and incoming is not None and incoming == strip_id(local):
+            # The same change made on both sides, e.g. a shared export
+            changed.discard(local_id)
+            state.tasks[local_id] = [key, change["seq"], changefeed.task_checksum(local)]
+            return
+        if local_id in changed:
+            # Changed on both sides; the merged task is pushed next
+            counts["conflicts"] += 1
+            state.tasks[local_id][1] = change["seq"]
+            if incoming is not None:
+                touch(local)
+                merged = resolve(strip_id(local), incoming, now, change["changed_at"])
+                local.clear()
+                local.update(merged, id=local_id)
+            return
+        
+        if incoming is None:
+            if local is not None:
+                touch(local)
+                removed.add(local_id)
+                del by_id[local_id]
+            state.tasks.pop(local_id, None)
+            keys.pop(key, None)
+            return
+        if local is None:
+            if local_id is None or local_id in by_id:
+                local_id = next(ids)
+            local = {"id": local_id, **incoming}
+            local["time_sessions"] = merge_sessions(incoming["time_sessions"])
+            tasks.append(local)
+            by_id[local_id] = local
+            removed.discard(local_id)
+            keys[key] = local_id
+            touch(local, new=True)
+        else:
+            touch(local)
+            # A pull sends only the sessions changed since the cursor
+            sessions = merge_sessions(incoming["time_sessions"], local["time_sessions"])
+            local.update(incoming, id=local_id, time_sessions=sessions)
+        state.tasks[local_id] = [key, change["seq"], changefeed.task_checksum(local)]
+    
+    pulled = hub.pull(state.replica, state.cursor)
+    for change in pulled["changes"]:
+        apply(change)
+    counts["pulled"] = len(pulled["changes"])
+    state.cursor = pulled["cursor"]
+    
+    outgoing = []
+    for local_id in sorted(changed | deleted):
+        key, base, _ = state.tasks[local_id]
+        task = strip_id(by_id[local_id]) if local_id in by_id else None
+        outgoing.append({"key": key, "base": base, "changed_at": now, "task": task})
+    if outgoing:
+        pushed = hub.push(state.replica, outgoing)
+        for change in outgoing:
+            local_id = keys[change["key"]]
+            seq = pushed["seqs"].get(change["key"])
+            if change["task"] is None:
+                state.tasks.pop(local_id)
+            elif seq is not None:
+                state.tasks[local_id] = [change["key"], seq, changefeed.task_checksum(by_id[local_id])]
+        # Conflicts the hub resolved, and deletions it refused, come back whole
+        changed.clear()
+        deleted.clear()
+        for change in pushed["merged"] + pushed["rejected"]:
+            apply(change)
+        counts["pushed"] = len(outgoing)
+    
+    if removed:
+        tasks[:] = [task for task in tasks if task["id"] not in removed]
+    return counts
+
+class SyncHub:
+    """Reference hub: task records ordered by seq, kept in memory"""
+    
+    def __init__(self):
+        self.seq = 0
+        # key -> {"key", "seq", "created", "origin", "changed_at", "task", "sessions"}
+        self.records = OrderedDict()
+        self.dirty = False
+    
+    @classmethod
+    def load(cls, path):
+        hub = cls()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            hub.seq = state["seq"]
+            hub.records = OrderedDict((record["key"], record) for record in state["records"])
+        return hub
+    
+    def save(self, path):
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"seq": self.seq, "records": list(self.records.values())}, f, separators=(",", ":"))
+        os.replace(tmp_file, path)
+        self.dirty = False
+    
+    def _outgoing(self, record, cursor=0):
+        # Copies, so an in-process hub shares nothing with its replicas
+        task = copy.deepcopy(record["task"])
+        if task is not None and record["created"] <= cursor:
+            sessions = record["sessions"]
+            task = dict(task, time_sessions=[s for key, s in session_keys(task["time_sessions"]) if sessions[key] > cursor])
+        return {"key": record["key"], "seq": record["seq"], "changed_at": record["changed_at"], "task": task}
+    
+    def pull(self, replica, cursor):
+        """Changes after cursor made by other replicas, oldest first, and the new cursor"""
+        changes = []
+        for record in reversed(self.records.values()):
+            if record["seq"] <= cursor:
+                break
+            if record["origin"] != replica:
+                changes.append(self._outgoing(record, cursor))
+        changes.reverse()
+        return {"cursor": self.seq, "changes": changes}
+    
+    def push(self, replica, changes):
+        """Apply a replica's changes; return their seqs and the records it must take back"""
+        seqs = {}
+        merged = []
+        rejected = []
+        for change in changes:
+            key = change["key"]
+            record = self.records.get(key)
+            task = copy.deepcopy(change["task"])
+            concurrent = record is not None and record["task"] is not None and record["seq"] > change["base"]
+            conflict = False
+            if task is None:
+                if record is None or record["task"] is None:
+                    continue
+                if concurrent:
+                    rejected.append(self._outgoing(record))
+                    continue
+            elif concurrent:
+                resolved = resolve(record["task"], task, record["changed_at"], change["changed_at"])
+                conflict = resolved != task
+                task = resolved
+            seqs[key] = self._store(key, task, replica, change["changed_at"], record)
+            if conflict:
+                merged.append(self._outgoing(self.records[key]))
+        return {"seqs": seqs, "merged": merged, "rejected": rejected}
+    
+    def _store(self, key, task, origin, changed_at, previous):
+        self.seq += 1
+        sessions = {}
+        if task is not None:
+            old_sessions = {}
+            if previous is not None and previous["task"] is not None:
+                old_sessions = dict(session_keys(previous["task"]["time_sessions"]))
+            for session_key, session in session_keys(task["time_sessions"]):
+                old = old_sessions.get(session_key)
+                unchanged = old is not None and _session_rank(old) == _session_rank(session)
+                sessions[session_key] = previous["sessions"][session_key] if unchanged else self.seq
+        created = previous["created"] if previous is not None and previous["task"] is not None else self.seq
+        self.records[key] = {
+            "key": key, "seq": self.seq, "created": created, "origin": origin,
+            "changed_at": changed_at, "task": task, "sessions": sessions
+        }
+        self.records.move_to_end(key)
+        self.dirty = True
+        return self.seq
+
+class FileHub:
+    """A SyncHub kept in a JSON file, locked for each call"""
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def _call(self, name, *args):
+        with changefeed.locked(self.path):
+            hub = SyncHub.load(self.path)
+            result = getattr(hub, name)(*args)
+            if hub.dirty:
+                hub.save(self.path)
+        return result
+    
+    def pull(self, replica, cursor):
+        return self._call("pull", replica, cursor)
+    
+    def push(self, replica, changes):
+        return self._call("push", replica, changes)
+
+class RemoteHub:
+    """The hub of a TaskFlow server started with --hub"""
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def pull(self, replica, cursor):
+        return self.client.request("GET", "/sync", params={"replica": replica, "since": cursor})
+    
+    def push(self, replica, changes):
+        return self.client.request("POST", "/sync", {"replica": replica, "changes": changes})
+
+def connect(address):
+    """A FileHub for file:PATH or a *.json path, else a RemoteHub for a server address"""
+    if address.startswith("file:"):
+        return FileHub(address[5:])
+    if address.endswith(".json"):
+        return FileHub(address)
+    return RemoteHub(client.Client(address))
@@ -0,0 +1,148 @@
+"""Streaming exports of TaskFlow tasks.
+
+Every exporter consumes tasks from an iterator and writes as it goes, so an
+export never holds more than one task (or one Parquet row group) in memory
+besides the output buffer. Exporters that need several passes, like the
+three flattened tables, take a zero-argument callable returning a fresh
+task iterator.
+
+Formats:
+
+* jsonl: one task per line, nested subtasks and sessions kept as is
+* csv: a zip archive of tasks.csv, subtasks.csv and sessions.csv
+* parquet: a zip archive of the same three tables as Parquet files,
+  written in row groups (requires pyarrow)
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+FORMATS = ("jsonl", "csv", "parquet")
+PARQUET_ROW_GROUP = 10000
+
+TASK_COLUMNS = [
+    "id", "description", "category", "priority", "due_date", "created_at",
+    "completed", "completed_at", "is_recurring", "recurrence_pattern",
+    "no_carryover", "carry_count", "estimated_time", "max_time", "time_spent", "notes"
+]
+SUBTASK_COLUMNS = ["task_id", "subtask_id", "description", "completed"]
+SESSION_COLUMNS = ["task_id", "session_id", "start_time", "end_time", "duration"]
+
+TABLES = {
+    "tasks": TASK_COLUMNS,
+    "subtasks": SUBTASK_COLUMNS,
+    "sessions": SESSION_COLUMNS
+}
+
+def select_tasks(tasks, since=None, until=None, categories=None):
+    """Filter tasks by creation date range (inclusive, YYYY-MM-DD) and category"""
+    categories = set(categories) if categories else None
+    for task in tasks:
+        created = task["created_at"][:10]
+        if since and created < since:
+            continue
+        if until and created > until:
+            continue
+        if categories is not None and task["category"] not in categories:
+            continue
+        yield task
+
+def iter_rows(tasks, table):
+    """Yield flat rows for one table as lists ordered like TABLES[table]"""
+    for task in tasks:
+        if table == "tasks":
+            yield [task[column] for column in TASK_COLUMNS]
+        elif table == "subtasks":
+            for subtask in task["subtasks"]:
+                yield [task["id"], subtask["id"], subtask["description"], subtask["completed"]]
+        else:
+            for session in task["time_sessions"]:
+                yield [task["id"], session["session_id"], session["start_time"],
+                       session.get("end_time"), session.get("duration")]
+
+def write_jsonl(tasks, stream):
+    """Write one JSON task per line; return the number of tasks written"""
+    count = 0
+    for task in tasks:
+        stream.write(json.dumps(task) + "\n")
+        count += 1
+    return count
+
+def write_csv(task_source, stream):
+    """Write the three tables as CSV files in a zip archive"""
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for table, columns in TABLES.items():
+            with archive.open(f"{table}.csv", "w") as raw:
+                out = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                writer = csv.writer(out)
+                writer.writerow(columns)
+                writer.writerows(iter_rows(task_source(), table))
+                out.flush()
+                out.detach()
+
+def _parquet_schema(pa, table):
+    types = {
+        "id": pa.int64(), "task_id": pa.int64(), "subtask_id": pa.int64(), "session_id": pa.int64(),
+        "completed": pa.bool_(), "is_recurring": pa.bool_(), "no_carryover": pa.bool_(),
+        "carry_count": pa.int64(), "time_spent": pa.float64(), "duration": pa.float64()
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in TABLES[table]])
+
+def write_parquet(task_source, stream, row_group=PARQUET_ROW_GROUP):
+    """Write the three tables as Parquet files in a zip archive"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export requires pyarrow (pip install pyarrow)") from None
+    
+    with zipfile.ZipFile(stream, "w") as archive, tempfile.TemporaryDirectory() as tmp:
+        for table, columns in TABLES.items():
+            schema = _parquet_schema(pa, table)
+            path = os.path.join(tmp, f"{table}.parquet")
+            with pq.ParquetWriter(path, schema) as writer:
+                batch = []
+                for row in iter_rows(task_source(), table):
+                    batch.append(row)
+                    if len(batch) >= row_group:
+                        writer.write_table(pa.Table.from_pylist([dict(zip(columns, r)) for r in batch], schema))
+                        batch = []
+                if batch:
+                    writer.write_table(pa.Table.from_pylist([dict(zip(columns, r)) for r in batch], schema))
+            # Parquet files are already compressed
+            archive.write(path, f"{table}.parquet", zipfile.ZIP_STORED)
+
+def export_file(task_source, fmt, path):
+    """Export to path in the given format, writing atomically"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    
+    tmp_path = f"{path}.tmp"
+    try:
+        if fmt == "jsonl":
+            with open(tmp_path, "w") as f:
+                write_jsonl(task_source(), f)
+        else:
+            with open(tmp_path, "wb") as f:
+                (write_csv if fmt == "csv" else write_parquet)(task_source, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+def prune(directory, max_age):
+    """Delete export files in directory last written more than max_age seconds ago"""
+    cutoff = time.time() - max_age
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.startswith("taskflow_export_") and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+
+def file_name(fmt, stamp):
+    """Default export file name for a format"""
+    return f"taskflow_export_{stamp}.{'jsonl' if fmt == 'jsonl' else fmt + '.zip'}"
@@ -0,0 +1,175 @@
+"""Incremental reading and writing of TaskFlow JSON documents.
+
+iter_records() reads a file object in fixed-size chunks and yields the
+records of a data document one at a time, so memory stays proportional to
+the chunk size and the largest single task rather than to the file. Three
+layouts are accepted:
+
+* a data document {"schema_version": ..., "tasks": [...], ...}
+* a bare list of tasks
+* JSON lines, one task per line
+
+Each yielded item is ("task", task) for an element of the task list, or
+("meta", key, value) for any other top-level key of a data document.
+
+write_document() is the matching writer: one compact task per line inside
+an indented document. Each task goes through the C encoder, which is many
+times faster than json.dump(indent=...) on large files. schema_version is
+written before the tasks, so a reader knows how to migrate each batch.
+"""
+import codecs
+import itertools
+import json
+
+CHUNK_SIZE = 1 << 16
+FIRST_LINE_LIMIT = 1 << 20  # Longest first line probed for JSON lines
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+class _Buffer:
+    """Sliding text window over a file object"""
+    
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+        # Chunks of an uploaded file are bytes and may split a character
+        self.decode = codecs.getincrementaldecoder("utf-8")().decode
+    
+    def fill(self):
+        """Read one more chunk, dropping text already consumed"""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = self.decode(chunk, final=not chunk)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self):
+        """Next non-whitespace character, or "" at end of input"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+    
+    def expect(self, chars):
+        """Consume one of chars and return it"""
+        char = self.peek()
+        if not char or char not in chars:
+            found = repr(char) if char else "end of input"
+            raise ValueError(f"Invalid JSON: expected one of {chars!r}, found {found}")
+        self.pos += 1
+        return char
+    
+    def value(self):
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as e:
+                # Incomplete values fail too, so only give up at end of input
+                if self.fill():
+                    continue
+                raise ValueError(f"Invalid JSON: {e.msg}") from None
+            if end == len(self.text) and self.fill():
+                # A number or literal may continue in the next chunk
+                continue
+            self.pos = end
+            return value
+
+def _iter_array(buffer):
+    buffer.expect("[")
+    if buffer.peek() == "]":
+        buffer.pos += 1
+        return
+    while True:
+        yield ("task", buffer.value())
+        if buffer.expect(",]") == "]":
+            return
+
+def iter_records(stream, chunk_size=CHUNK_SIZE):
+    """Yield ("task", task) and ("meta", key, value) items from a JSON export"""
+    buffer = _Buffer(stream, chunk_size)
+    first = buffer.peek()
+    if first == "[":
+        yield from _iter_array(buffer)
+        return
+    if first != "{":
+        raise ValueError("Import file must contain a JSON object, a list of tasks or JSON lines")
+    
+    # A complete object on the first line is either a compact document or
+    # the first of several JSON lines
+    line_end = buffer.text.find("\n", buffer.pos)
+    while line_end == -1 and len(buffer.text) - buffer.pos < FIRST_LINE_LIMIT and buffer.fill():
+        line_end = buffer.text.find("\n", buffer.pos)
+    if line_end != -1 or buffer.eof:
+        end = line_end if line_end != -1 else len(buffer.text)
+        try:
+            first_object = json.loads(buffer.text[buffer.pos:end])
+        except json.JSONDecodeError:
+            first_object = None
+        if isinstance(first_object, dict) and "tasks" not in first_object:
+            buffer.pos = end
+            yield ("task", first_object)
+            while buffer.peek():
+                yield ("task", buffer.value())
+            return
+    
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        key = buffer.value()
+        if not isinstance(key, str):
+            raise ValueError("Invalid JSON: object keys must be strings")
+        buffer.expect(":")
+        if key == "tasks" and buffer.peek() == "[":
+            yield from _iter_array(buffer)
+        else:
+            yield ("meta", key, buffer.value())
+        if buffer.expect(",}") == "}":
+            return
+
+def iter_batches(records, batch_size):
+    """Group the task items of iter_records() into lists, collecting metadata"""
+    meta = {}
+    batch = []
+    for record in records:
+        if record[0] == "meta":
+            meta[record[1]] = record[2]
+            continue
+        batch.append(record[1])
+        if len(batch) >= batch_size:
+            yield batch, meta
+            batch = []
+    yield batch, meta
+
+def write_document(stream, data, extra_tasks=None):
+    """Write a data document one task at a time; return characters written.
+    
+    extra_tasks is an optional iterable appended after data["tasks"].
+    schema_version comes first; the other keys of data are written after
+    the tasks, so extra_tasks may still update them while it is consumed.
+    """
+    tasks = data["tasks"] if extra_tasks is None else itertools.chain(data["tasks"], extra_tasks)
+    header = f'  "schema_version": {json.dumps(data["schema_version"])},\n' if "schema_version" in data else ""
+    written = stream.write('{\n' + header + '  "tasks": [')
+    separator = "\n    "
+    for task in tasks:
+        written += stream.write(separator + json.dumps(task))
+        separator = ",\n    "
+    trailer = {k: v for k, v in data.items() if k not in ("tasks", "schema_version")}
+    written += stream.write("\n  ]" + (",\n" + json.dumps(trailer, indent=2)[2:] if trailer else "\n}"))
+    return written
@@ -0,0 +1,166 @@
+"""Memory diagnostics and soft budget enforcement.
+
+Two complementary measurements:
+
+* phase(): tracemalloc snapshots taken around load, carryover, report
+  generation and rendering. The difference between the snapshots is the
+  memory each phase left allocated, with its top allocation sites.
+* attribute(): retained memory of a session's store split into tasks,
+  sessions, notes, figures and caches. Store objects are sized
+  structurally; figures are the traced allocations made by plotly.
+
+Caches register an estimate and an eviction callback with register_cache()
+so enforce_budget() can release them when a soft budget is exceeded, before
+falling back to the caller's cold-partition unloading.
+
+tracemalloc is process-wide, so with several concurrent sessions the phase
+numbers include their allocations too; the structural attribution is
+per-session.
+"""
+import functools
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+TRACE_FRAMES = 10
+TOP_SITES = 5
+
+_caches = {}
+
+def start():
+    """Start tracing allocations if not already tracing"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+
+def stop():
+    """Stop tracing allocations"""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def is_active():
+    """Return True while allocations are being traced"""
+    return tracemalloc.is_tracing()
+
+@contextmanager
+def phase(name, results):
+    """Record memory retained and peak during a block into results[name]"""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    
+    before = tracemalloc.take_snapshot()
+    current_before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        current_after, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        stats = after.compare_to(before, "lineno")
+        results[name] = {
+            "retained": current_after - current_before,
+            "peak": peak - current_before,
+            "top": [
+                (f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size_diff)
+                for stat in stats[:TOP_SITES] if stat.size_diff > 0
+            ]
+        }
+
+def tracked(name, results_getter):
+    """Decorator running a function inside phase(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracemalloc.is_tracing():
+                return func(*args, **kwargs)
+            with phase(name, results_getter()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def deep_sizeof(obj, seen=None):
+    """Approximate retained size of plain JSON-like data in bytes"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    return size
+
+def register_cache(name, size_fn, evict_fn):
+    """Register a cache by name with a size estimate and an eviction callback"""
+    _caches[name] = (size_fn, evict_fn)
+
+def cache_sizes():
+    """Current estimated size of every registered cache"""
+    return {name: size_fn() for name, (size_fn, _) in _caches.items()}
+
+def evict_caches():
+    """Evict every registered cache and return the bytes released"""
+    released = 0
+    for size_fn, evict_fn in _caches.values():
+        before = size_fn()
+        evict_fn()
+        released += max(before - size_fn(), 0)
+    return released
+
+def figures_size():
+    """Bytes currently held by allocations made inside plotly"""
+    if not tracemalloc.is_tracing():
+        return 0
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(True, "*plotly*", all_frames=True)]
+    )
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+def attribute(tasks):
+    """Split retained memory into tasks, sessions, notes, figures and caches"""
+    seen = set()
+    sessions = 0
+    notes = 0
+    task_bytes = sys.getsizeof(tasks)
+    for task in tasks:
+        # Size sessions and notes first so the task total excludes them
+        sessions += deep_sizeof(task["time_sessions"], seen)
+        notes += deep_sizeof(task["notes"], seen)
+        task_bytes += deep_sizeof(task, seen)
+    
+    caches = cache_sizes()
+    usage = {
+        "tasks": task_bytes,
+        "sessions": sessions,
+        "notes": notes,
+        "figures": figures_size(),
+        "caches": sum(caches.values())
+    }
+    usage["total"] = sum(usage.values())
+    return usage, caches
+
+def enforce_budget(budget_bytes, measure, unload_cold):
+    """Bring usage under a soft budget.
+    
+    measure() returns the current total in bytes. Caches are evicted first;
+    if usage is still over budget, unload_cold() is called to release cold
+    partitions. Returns the list of actions taken.
+    """
+    actions = []
+    if not budget_bytes or measure() <= budget_bytes:
+        return actions
+    
+    released = evict_caches()
+    actions.append(f"Evicted caches ({released / 1024:.0f} KiB)")
+    if measure() <= budget_bytes:
+        return actions
+    
+    unloaded = unload_cold()
+    if unloaded:
+        actions.append(f"Unloaded {unloaded} cold tasks")
+    return actions
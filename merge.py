@@ -0,0 +1,142 @@
+"""Merge-import of task lists with content-hash deduplication.
+
+A task's identity is a hash of the fields that never change after creation
+(created_at and description), so the same task exported at different times,
+or copied between the web and terminal data files, is recognised even after
+it was completed, carried over or timed further. Recurring copies are
+created with their own created_at (see carryover.py), so each occurrence
+is a task of its own. Sessions are identified by their start time within
+a task.
+
+TaskMerger keeps hash indexes of the local tasks, so merging n incoming
+tasks into m local ones is O(n + m). Exact copies are recognised by a hash
+of their whole content before identities are compared: occurrences made
+before they had identities of their own share their original's, and an
+identity may therefore stand for several local tasks. Among those, the one
+with the incoming task's id, else its due date, is merged into.
+"""
+import hashlib
+import json
+
+def task_hash(task):
+    """Stable identity hash of a task"""
+    identity = f"{task['created_at']}\x1f{task['description'].strip()}"
+    return hashlib.blake2b(identity.encode("utf-8"), digest_size=16).digest()
+
+def content_hash(task):
+    """Hash of everything in a task but its id"""
+    content = json.dumps({key: value for key, value in task.items() if key != "id"}, sort_keys=True)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
+class TaskMerger:
+    """Merge incoming tasks into a task list in place.
+    
+    archived is an optional iterable of read-only tasks: incoming exact
+    copies of them count as duplicates and their ids are never reused.
+    Tasks that only share an archived task's identity are added, since
+    recurring occurrences created before they had identities of their own
+    all share their original's.
+    """
+    
+    def __init__(self, tasks, archived=()):
+        self.tasks = tasks
+        # identity hash -> local tasks with it
+        self.index = {}
+        for task in tasks:
+            self.index.setdefault(task_hash(task), []).append(task)
+        self.ids = {task["id"] for task in tasks}
+        self.contents = {content_hash(task) for task in tasks}
+        for task in archived:
+            self.contents.add(content_hash(task))
+            self.ids.add(task["id"])
+        self.next_id = max(self.ids, default=0) + 1
+        self.counts = {"added": 0, "merged": 0, "duplicates": 0, "remapped": 0, "sessions_added": 0}
+    
+    def add(self, task):
+        """Merge one incoming task; return "added", "merged" or "duplicate" """
+        content = content_hash(task)
+        if content in self.contents:
+            self.counts["duplicates"] += 1
+            return "duplicate"
+        
+        key = task_hash(task)
+        local = self.match(self.index.get(key, ()), task)
+        if local is None:
+            if task["id"] in self.ids:
+                task["id"] = self.next_id
+                self.counts["remapped"] += 1
+            self.next_id = max(self.next_id, task["id"] + 1)
+            self.ids.add(task["id"])
+            self.tasks.append(task)
+            self.index.setdefault(key, []).append(task)
+            self.contents.add(content)
+            self.counts["added"] += 1
+            return "added"
+        
+        merge_task(local, task, self.counts)
+        self.contents.add(content_hash(local))
+        self.counts["merged"] += 1
+        return "merged"
+    
+    @staticmethod
+    def match(candidates, task):
+        """Pick the local task with the incoming task's identity to merge into"""
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+        for field in ("id", "due_date"):
+            for local in candidates:
+                if local[field] == task[field]:
+                    return local
+        return candidates[-1]
+    
+    def add_all(self, tasks):
+        """Merge every task from an iterable and return the counts"""
+        for task in tasks:
+            self.add(task)
+        return self.counts
+
+def merge_task(local, incoming, counts=None):
+    """Fold an incoming copy of a task into the local one.
+    
+    Sessions are unioned by start time, with ended sessions taking
+    precedence over open ones; time_spent grows by the duration of the
+    sessions that were new. Completion, carry count, subtasks and notes
+    keep the most advanced state of the two copies.
+    """
+    sessions = {s["start_time"]: s for s in local["time_sessions"]}
+    next_session_id = max([s["session_id"] for s in local["time_sessions"]] + [0]) + 1
+    for session in incoming["time_sessions"]:
+        existing = sessions.get(session["start_time"])
+        if existing is None:
+            session = dict(session, session_id=next_session_id)
+            next_session_id += 1
+            local["time_sessions"].append(session)
+            sessions[session["start_time"]] = session
+            local["time_spent"] += session.get("duration", 0)
+            if counts is not None:
+                counts["sessions_added"] += 1
+        elif "end_time" not in existing and "end_time" in session:
+            existing["end_time"] = session["end_time"]
+            existing["duration"] = session["duration"]
+            local["time_spent"] += session["duration"]
+    local["time_sessions"].sort(key=lambda s: s["start_time"])
+    
+    if incoming["completed"] and not local["completed"]:
+        local["completed"] = True
+        local["completed_at"] = incoming["completed_at"]
+    local["carry_count"] = max(local["carry_count"], incoming["carry_count"])
+    local["due_date"] = max(local["due_date"], incoming["due_date"])
+    
+    subtasks = {s["description"]: s for s in local["subtasks"]}
+    for subtask in incoming["subtasks"]:
+        existing = subtasks.get(subtask["description"])
+        if existing is None:
+            subtask = dict(subtask, id=max([s["id"] for s in local["subtasks"]] + [0]) + 1)
+            local["subtasks"].append(subtask)
+            subtasks[subtask["description"]] = subtask
+        elif subtask["completed"]:
+            existing["completed"] = True
+    
+    if not local["notes"]:
+        local["notes"] = incoming["notes"]
+    return local
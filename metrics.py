@@ -0,0 +1,334 @@
+"""Opt-in operation metrics in the Prometheus text format.
+
+A small process-wide registry of counters, gauges and histograms. Storage,
+carryover, report generation and the timer paths in both apps record into
+the metrics declared at the bottom of this module.
+
+Recording is off until enable() is called, and every metric method returns
+immediately while it is off, so instrumentation can stay in place
+permanently. start_from_env() enables recording and starts whichever
+exporters are configured:
+
+* TASKFLOW_METRICS_FILE: path of a text-format file rewritten every
+  TASKFLOW_METRICS_INTERVAL seconds (default 15), suitable for the node
+  exporter's textfile collector.
+* TASKFLOW_METRICS_PORT: serve /metrics over HTTP on 127.0.0.1.
+
+render() returns the exposition text directly, so everything can be
+checked without a network or a Prometheus server.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_INTERVAL = 15
+
+_enabled = False
+_lock = threading.Lock()
+_exporters = {}
+
+def enable():
+    """Start recording metrics"""
+    global _enabled
+    _enabled = True
+
+def disable():
+    """Stop recording metrics; collected values are kept"""
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    """Return True while metrics are being recorded"""
+    return _enabled
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base class holding one value per combination of label values"""
+    
+    type = "untyped"
+    
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+    
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labels)
+    
+    def samples(self):
+        """(suffix, label text, value) tuples for the exposition format"""
+        return [("", _format_labels(self.labels, key), value) for key, value in sorted(self.values.items())]
+    
+    def render(self):
+        """Exposition text for this metric"""
+        lines = [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} {self.type}"]
+        with _lock:
+            samples = self.samples()
+        lines += [f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in samples]
+        return "\n".join(lines)
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+    
+    type = "counter"
+    
+    def inc(self, amount=1, **labels):
+        """Add amount to the counter"""
+        if not _enabled:
+            return
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+    
+    type = "gauge"
+    
+    def set(self, value, **labels):
+        """Set the gauge to value"""
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = value
+    
+    def inc(self, amount=1, **labels):
+        """Add amount to the gauge"""
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets"""
+    
+    type = "histogram"
+    
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        """Record one observation"""
+        if not _enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket counts plus one overflow slot, sum, count
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of a block in seconds"""
+        if not _enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+    
+    def samples(self):
+        samples = []
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, [("le", _format_value(float(bound)))])
+                samples.append(("_bucket", labels, cumulative))
+            labels = _format_labels(self.labels, key)
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+class Registry:
+    """Named metrics, created once and shared by every caller"""
+    
+    def __init__(self):
+        self.metrics = {}
+    
+    def _get_or_create(self, cls, name, help, labels, **kwargs):
+        with _lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labels, **kwargs)
+        if not isinstance(metric, cls) or metric.labels != tuple(labels):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+    
+    def counter(self, name, help, labels=()):
+        """Return the counter called name, creating it if needed"""
+        return self._get_or_create(Counter, name, help, labels)
+    
+    def gauge(self, name, help, labels=()):
+        """Return the gauge called name, creating it if needed"""
+        return self._get_or_create(Gauge, name, help, labels)
+    
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """Return the histogram called name, creating it if needed"""
+        return self._get_or_create(Histogram, name, help, labels, buckets=buckets)
+    
+    def render(self):
+        """Exposition text for every registered metric"""
+        return "".join(self.metrics[name].render() + "\n" for name in sorted(self.metrics))
+    
+    def reset(self):
+        """Drop all recorded values, keeping the metric definitions"""
+        with _lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+def render():
+    """Exposition text for the default registry"""
+    return REGISTRY.render()
+
+def timed(metric, **labels):
+    """Decorator observing the duration of every call in a histogram"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with metric.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def write_textfile(path):
+    """Atomically write the exposition text to path"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(render())
+    os.replace(temp_path, path)
+
+def start_textfile_writer(path, interval=DEFAULT_INTERVAL):
+    """Rewrite path every interval seconds from a daemon thread"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_textfile(path)
+            except OSError:
+                pass
+    
+    thread = threading.Thread(target=run, name="taskflow-metrics-textfile", daemon=True)
+    thread.start()
+    return thread
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics over HTTP from a daemon thread and return the server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="taskflow-metrics-http", daemon=True).start()
+    return server
+
+def start_from_env():
+    """Enable metrics and start the exporters configured in the environment.
+    
+    Safe to call on every Streamlit rerun: exporters start once per process.
+    Returns True if any exporter is configured.
+    """
+    path = os.environ.get("TASKFLOW_METRICS_FILE")
+    port = os.environ.get("TASKFLOW_METRICS_PORT")
+    if not path and not port:
+        return False
+    
+    enable()
+    with _lock:
+        if path and "textfile" not in _exporters:
+            interval = float(os.environ.get("TASKFLOW_METRICS_INTERVAL", DEFAULT_INTERVAL))
+            _exporters["textfile"] = start_textfile_writer(path, interval)
+        if port and "http" not in _exporters:
+            _exporters["http"] = serve(int(port))
+    return True
+
+def flush():
+    """Write the configured textfile now, for short-lived processes"""
+    path = os.environ.get("TASKFLOW_METRICS_FILE")
+    if path and _enabled:
+        write_textfile(path)
+
+# TaskFlow metrics shared by app.py and terminaltodo.py
+STORAGE_SECONDS = histogram(
+    "taskflow_storage_seconds", "Time spent loading or saving the data file", ["operation"]
+)
+DATA_FILE_BYTES = gauge("taskflow_data_file_bytes", "Size of the data file after the last load or save")
+TASKS = gauge("taskflow_tasks", "Tasks in the loaded store", ["status"])
+CARRYOVER_SECONDS = histogram("taskflow_carryover_seconds", "Duration of carryover runs")
+CARRYOVER_TASKS = counter("taskflow_carryover_tasks_total", "Tasks carried over or recreated", ["action"])
+REPORT_SECONDS = histogram("taskflow_report_build_seconds", "Time to build a report", ["report"])
+TIMER_EVENTS = counter("taskflow_timer_events_total", "Timer starts and stops", ["event"])
+TIMER_SESSION_MINUTES = histogram(
+    "taskflow_timer_session_minutes", "Length of recorded timer sessions",
+    buckets=(1, 5, 15, 30, 60, 120, 240, 480)
+)
+CACHE_REQUESTS = counter("taskflow_cache_requests_total", "Cache lookups by outcome", ["cache", "result"])
+SERVER_SECONDS = histogram("taskflow_server_request_seconds", "Server request handling time", ["route", "status"])
+
+def record_store(tasks, path=None):
+    """Update the task count and data file size gauges"""
+    if not _enabled:
+        return
+    completed = sum(1 for task in tasks if task["completed"])
+    TASKS.set(completed, status="completed")
+    TASKS.set(len(tasks) - completed, status="open")
+    if path and os.path.exists(path):
+        DATA_FILE_BYTES.set(os.path.getsize(path))
+
+def record_cache(cache, hit):
+    """Count one cache lookup as a hit or a miss"""
+    if _enabled:
+        CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
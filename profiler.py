@@ -0,0 +1,164 @@
+"""Opt-in per-rerun phase profiler.
+
+Each Streamlit rerun is recorded as a RerunProfile: the wall time and call
+count of every named phase (load_data, perform_carryover, HTML building,
+chart construction, ...) plus bytes read from and written to the data
+file. Streamlit runs each session's script in its own thread, so the active
+profile is thread-local and sessions never mix.
+
+When no rerun is being profiled, span() and traced() reduce to a single
+attribute lookup, so instrumentation can stay in place permanently.
+
+Finished reruns are appended as JSON lines to a rotating log for offline
+analysis.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+LOG_FILE = os.environ.get("TASKFLOW_PROFILE_LOG", "taskflow_profile.jsonl")
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+_local = threading.local()
+_logger = None
+_logger_lock = threading.Lock()
+
+def enabled_by_env():
+    """Return True if profiling was requested through TASKFLOW_PROFILE"""
+    return os.environ.get("TASKFLOW_PROFILE", "").lower() in ("1", "true", "yes", "on")
+
+class RerunProfile:
+    """Timing spans and I/O counters collected during one rerun"""
+    
+    def __init__(self, session_id=None, label=""):
+        self.rerun_id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.label = label
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.total_ms = 0.0
+        self.phases = {}  # name -> {"ms": total wall time, "calls": count}
+        self.spans = []   # (name, depth, offset_ms, duration_ms) in completion order
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.depth = 0
+    
+    def record(self, name, started, duration_ms, depth):
+        """Add one finished span"""
+        phase = self.phases.setdefault(name, {"ms": 0.0, "calls": 0})
+        phase["ms"] += duration_ms
+        phase["calls"] += 1
+        self.spans.append((name, depth, (started - self.start) * 1000, duration_ms))
+    
+    def finish(self):
+        """Stop the rerun clock"""
+        self.total_ms = (time.perf_counter() - self.start) * 1000
+        return self
+    
+    def summary(self):
+        """Phases ordered by total time, for display"""
+        return sorted(
+            ({"phase": name, "ms": round(p["ms"], 2), "calls": p["calls"]} for name, p in self.phases.items()),
+            key=lambda row: row["ms"],
+            reverse=True
+        )
+    
+    def to_records(self):
+        """One JSON-serializable record per span, plus a rerun total"""
+        base = {
+            "rerun": self.rerun_id,
+            "session": self.session_id,
+            "label": self.label,
+            "ts": self.started_at.isoformat()
+        }
+        records = [
+            dict(base, phase=name, depth=depth, offset_ms=round(offset, 3), ms=round(duration, 3))
+            for name, depth, offset, duration in self.spans
+        ]
+        records.append(dict(base, phase="rerun", depth=0, offset_ms=0.0, ms=round(self.total_ms, 3),
+                            bytes_read=self.bytes_read, bytes_written=self.bytes_written))
+        return records
+
+def active():
+    """Return the profile being recorded on this thread, if any"""
+    return getattr(_local, "profile", None)
+
+def begin_rerun(session_id=None, label=""):
+    """Start profiling the current rerun on this thread"""
+    _local.profile = RerunProfile(session_id, label)
+    return _local.profile
+
+def end_rerun(log=True):
+    """Stop profiling on this thread and return the finished profile"""
+    profile = active()
+    if profile is None:
+        return None
+    _local.profile = None
+    profile.finish()
+    if log:
+        write_log(profile)
+    return profile
+
+@contextmanager
+def span(name):
+    """Time a block as a named phase of the active rerun"""
+    profile = active()
+    if profile is None:
+        yield
+        return
+    
+    depth = profile.depth
+    profile.depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.depth = depth
+        profile.record(name, started, (time.perf_counter() - started) * 1000, depth)
+
+def traced(name=None):
+    """Decorator recording every call of a function as a phase"""
+    def decorator(func):
+        phase = name or func.__name__
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if active() is None:
+                return func(*args, **kwargs)
+            with span(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def add_bytes(read=0, written=0):
+    """Count bytes read from or written to storage during the active rerun"""
+    profile = active()
+    if profile is not None:
+        profile.bytes_read += read
+        profile.bytes_written += written
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = logging.getLogger("taskflow.profile")
+            _logger.setLevel(logging.INFO)
+            _logger.propagate = False
+            handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _logger.addHandler(handler)
+    return _logger
+
+def write_log(profile):
+    """Append a finished profile to the rotating JSON-lines log"""
+    logger = _get_logger()
+    for record in profile.to_records():
+        logger.info(json.dumps(record, separators=(",", ":")))
@@ -0,0 +1,368 @@
+"""Filter expressions over tasks, compiled into index-aware query plans.
+
+An expression is a list of space-separated terms, all of which must hold:
+
+    category:Work,Home      any of several values (case-insensitive)
+    priority:High           status:open or status:done
+    created:>=2025-01-01    due:<=today          completed:<7d
+    est:>1h  max:<=90m  spent:>=30m  carry:>=2  id:>100
+    recurring:yes           carryover:no         completed:no
+    -category:Personal      a leading minus negates a term
+    report "weekly sync"    bare words and quoted phrases are full-text terms
+
+Dates are YYYY-MM-DD, today, yesterday or an age such as 7d, 2w or 3m.
+Comparisons with an age read as "less/more than that long ago", so
+completed:<7d is anything completed during the last week.
+
+compile_query() parses an expression once into a Plan of predicates. A
+Plan runs against a TaskIndex, which holds secondary indexes over the hot
+tasks by category, priority, status and each date field: it estimates how
+many tasks each indexable term selects, fetches candidates through the
+most selective one and tests only the remaining predicates on them.
+Archive segments are pruned by their index entries before any is read.
+Every run records those choices as explain steps, and QueryCache keeps
+results per (expression, data version).
+"""
+import bisect
+import functools
+import operator
+import re
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+
+import archive
+from schema import parse_minutes
+
+CACHE_SIZE = 32  # Cached query results
+
+TERM_PATTERN = re.compile(r'(-?)(?:(\w+):(<=|>=|!=|<|>|=)?("[^"]*"|\S*)|"([^"]*)"|(\S+))')
+AGE_PATTERN = re.compile(r"^(\d+)([dwmy])$")
+AGE_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+FLAGS = {"yes": True, "true": True, "no": False, "false": False}
+STATUSES = {"open": False, "done": True, "completed": True}
+
+COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge
+}
+FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "=": "=", "!=": "!="}
+
+def _completed_date(task):
+    return task["completed_at"][:10] if task["completed"] and task["completed_at"] else None
+
+# field -> (kind, value getter)
+FIELDS = {
+    "category": ("choice", lambda t: t["category"].lower()),
+    "priority": ("choice", lambda t: t["priority"].lower()),
+    "status": ("status", lambda t: t["completed"]),
+    "created": ("date", lambda t: t["created_at"][:10]),
+    "due": ("date", lambda t: t["due_date"]),
+    "completed": ("date", _completed_date),
+    "est": ("minutes", lambda t: parse_minutes(t["estimated_time"])),
+    "max": ("minutes", lambda t: parse_minutes(t["max_time"])),
+    "spent": ("minutes", lambda t: t["time_spent"]),
+    "carry": ("number", lambda t: t["carry_count"]),
+    "id": ("number", lambda t: t["id"]),
+    "recurring": ("flag", lambda t: t["is_recurring"]),
+    "carryover": ("flag", lambda t: not t["no_carryover"])
+}
+
+def _parse_date(value, op, today):
+    value = value.lower()
+    if value == "today":
+        return op, today.isoformat()
+    if value == "yesterday":
+        return op, (today - timedelta(days=1)).isoformat()
+    age = AGE_PATTERN.match(value)
+    if age:
+        cutoff = today - timedelta(days=int(age.group(1)) * AGE_DAYS[age.group(2)])
+        return FLIPPED[op], cutoff.isoformat()
+    try:
+        return op, date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"'{value}' is not a date (YYYY-MM-DD, today, yesterday or an age like 7d)") from None
+
+class Term:
+    """One compiled condition on a task field"""
+    
+    def __init__(self, field, op, value, negate, today):
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field '{field}' (use one of: {', '.join(FIELDS)})")
+        kind, getter = FIELDS[field]
+        if field == "completed" and value.lower() in FLAGS:
+            field, kind, getter = "status", "status", FIELDS["status"][1]
+            value = "done" if FLAGS[value.lower()] else "open"
+        if not value:
+            raise ValueError(f"'{field}:' needs a value")
+        
+        if kind in ("choice", "status", "flag") and op != "=":
+            raise ValueError(f"'{field}' only supports equality")
+        if kind == "choice":
+            value = frozenset(v.strip().lower() for v in value.split(",") if v.strip())
+        elif kind == "status":
+            if value.lower() not in STATUSES:
+                raise ValueError(f"Status must be open or done, not '{value}'")
+            value = STATUSES[value.lower()]
+        elif kind == "flag":
+            if value.lower() not in FLAGS:
+                raise ValueError(f"'{field}' must be yes or no, not '{value}'")
+            value = FLAGS[value.lower()]
+        elif kind == "date":
+            op, value = _parse_date(value, op, today)
+        elif kind == "minutes":
+            value = parse_minutes(value)
+            if value is None:
+                raise ValueError(f"'{field}' needs a duration such as 30m or 1.5h")
+        else:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"'{field}' needs a whole number") from None
+        
+        self.field = field
+        self.kind = kind
+        self.op = op
+        self.value = value
+        self.negate = negate
+        self.test = self._compile(getter)
+    
+    def _compile(self, getter):
+        value, negate = self.value, self.negate
+        if self.kind == "choice":
+            return lambda task: (getter(task) in value) != negate
+        if self.kind in ("status", "flag"):
+            return lambda task: (getter(task) == value) != negate
+        compare = COMPARISONS[self.op]
+        def test(task):
+            actual = getter(task)
+            return (actual is not None and compare(actual, value)) != negate
+        return test
+    
+    def __str__(self):
+        if self.kind == "choice":
+            value = ",".join(sorted(self.value))
+            value = f'"{value}"' if " " in value else value
+        elif self.kind == "status":
+            value = "done" if self.value else "open"
+        elif self.kind == "flag":
+            value = "yes" if self.value else "no"
+        elif self.kind == "minutes":
+            value = f"{self.value:g}m"
+        else:
+            value = self.value
+        op = "" if self.op == "=" else self.op
+        return f"{'-' if self.negate else ''}{self.field}:{op}{value}"
+
+class TaskIndex:
+    """Secondary indexes over an in-memory task list.
+    
+    Every index maps to positions in tasks: a dict of lists for category,
+    priority and status, and for each date field its values in sorted
+    order next to the matching positions, searched with bisect.
+    """
+    
+    DATE_FIELDS = ("created", "due", "completed")
+    
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        self.positions = {task["id"]: i for i, task in enumerate(self.tasks)}
+        self.choices = {"category": defaultdict(list), "priority": defaultdict(list)}
+        self.status = {True: [], False: []}
+        for i, task in enumerate(self.tasks):
+            for field, lists in self.choices.items():
+                lists[FIELDS[field][1](task)].append(i)
+            self.status[task["completed"]].append(i)
+        self.dates = {}
+        for field in self.DATE_FIELDS:
+            getter = FIELDS[field][1]
+            pairs = sorted((getter(task), i) for i, task in enumerate(self.tasks) if getter(task) is not None)
+            self.dates[field] = ([value for value, _ in pairs], [i for _, i in pairs])
+    
+    def _date_range(self, term):
+        values = self.dates[term.field][0]
+        lo, hi = 0, len(values)
+        if term.op in ("<", "<="):
+            hi = (bisect.bisect_left if term.op == "<" else bisect.bisect_right)(values, term.value)
+        elif term.op in (">", ">="):
+            lo = (bisect.bisect_right if term.op == ">" else bisect.bisect_left)(values, term.value)
+        else:
+            lo, hi = bisect.bisect_left(values, term.value), bisect.bisect_right(values, term.value)
+        return lo, hi
+    
+    def estimate(self, term):
+        """Number of tasks a term selects through an index, or None if it has none"""
+        if term.kind == "choice" and term.field in self.choices and not term.negate:
+            return sum(len(self.choices[term.field].get(v, ())) for v in term.value)
+        if term.kind == "status":
+            return len(self.status[term.value != term.negate])
+        if term.kind == "date" and term.field in self.dates and not term.negate and term.op != "!=":
+            lo, hi = self._date_range(term)
+            return hi - lo
+        return None
+    
+    def lookup(self, term):
+        """Positions of the tasks a term selects through its index"""
+        if term.kind == "choice":
+            return [i for v in term.value for i in self.choices[term.field].get(v, ())]
+        if term.kind == "status":
+            return self.status[term.value != term.negate]
+        lo, hi = self._date_range(term)
+        return self.dates[term.field][1][lo:hi]
+
+class QueryResult:
+    """Matching tasks, which of them are archived, and how they were found"""
+    
+    def __init__(self, tasks, archived_ids, steps):
+        self.tasks = tasks
+        self.archived_ids = archived_ids
+        self.steps = steps
+
+class Plan:
+    """A compiled expression: field terms plus optional full-text words"""
+    
+    def __init__(self, terms, words):
+        self.terms = terms
+        self.words = words
+    
+    def __str__(self):
+        words = [f'"{w}"' if " " in w else w for w in self.words]
+        return " ".join(sorted(str(t) for t in self.terms) + words)
+    
+    def _archive_segments(self, archive_dir, matches):
+        """Index entries of the segments that may hold matching tasks"""
+        segments = archive.load_index(archive_dir)["segments"]
+        ids = sorted(matches) if matches is not None else None
+        kept = []
+        for segment in segments:
+            if ids is not None:
+                i = bisect.bisect_left(ids, segment["min_id"])
+                if i == len(ids) or ids[i] > segment["max_id"]:
+                    continue
+            if all(self._segment_may_match(term, segment) for term in self.terms):
+                kept.append(segment)
+        return segments, kept
+    
+    @staticmethod
+    def _segment_may_match(term, segment):
+        if term.negate:
+            return True
+        if term.field == "category":
+            return bool(term.value & {c.lower() for c in segment["categories"]})
+        if term.field == "status":
+            return segment["completed"] > 0 if term.value else segment["completed"] < segment["count"]
+        if term.field == "created" and term.op != "!=":
+            lower = {"<": operator.lt, "<=": operator.le, "=": operator.le}.get(term.op)
+            upper = {">": operator.gt, ">=": operator.ge, "=": operator.ge}.get(term.op)
+            if lower and not lower(segment["first_created"], term.value):
+                return False
+            if upper and not upper(segment["last_created"], term.value):
+                return False
+        return True
+    
+    def run(self, index, archive_dir=None, text_search=None):
+        """Evaluate against a TaskIndex and, optionally, an archive directory.
+        
+        text_search(words) returns [(task_id, score), ...] for the
+        full-text words; matches are returned best first.
+        """
+        steps = []
+        matches = None
+        if self.words:
+            if text_search is None:
+                raise ValueError("Full-text terms need a search index")
+            phrase = " ".join(self.words)
+            matches = dict(text_search(phrase))
+            steps.append(f"Full-text index: '{phrase}' matches {len(matches):,} tasks")
+        
+        # Pick the most selective index
+        estimates = [(index.estimate(term), i, term) for i, term in enumerate(self.terms)]
+        estimates = [e for e in estimates if e[0] is not None]
+        for count, _, term in estimates:
+            steps.append(f"Index estimate: {term} selects {count:,} of {len(index.tasks):,} tasks")
+        access = min(estimates, key=lambda e: e[:2])[2] if estimates else None
+        if matches is not None and (access is None or len(matches) < index.estimate(access)):
+            access = "text"
+            candidates = [index.tasks[p] for p in map(index.positions.get, matches) if p is not None]
+            steps.append(f"Access: full-text matches ({len(candidates):,} hot candidates)")
+        elif access is not None:
+            candidates = [index.tasks[p] for p in index.lookup(access)]
+            steps.append(f"Access: {access} index ({len(candidates):,} candidates)")
+        else:
+            candidates = index.tasks
+            steps.append(f"Access: full scan of {len(candidates):,} tasks")
+        
+        tests = [term.test for term in self.terms if term is not access]
+        if matches is not None and access != "text":
+            tests.append(lambda task: task["id"] in matches)
+        residual = [str(term) for term in self.terms if term is not access]
+        if matches is not None and access != "text":
+            residual.append("full-text matches")
+        steps.append(f"Filter: {', '.join(residual)}" if residual else "Filter: none")
+        
+        tasks = [task for task in candidates if all(test(task) for test in tests)]
+        archived_ids = set()
+        if archive_dir is not None:
+            segments, kept = self._archive_segments(archive_dir, matches)
+            if segments:
+                steps.append(f"Archive: reading {len(kept)} of {len(segments)} segments")
+            tests = [term.test for term in self.terms]
+            if matches is not None:
+                tests.append(lambda task: task["id"] in matches)
+            for segment in kept:
+                for task in archive.read_segment(archive_dir, segment["file"]):
+                    if task["id"] not in index.positions and all(test(task) for test in tests):
+                        tasks.append(task)
+                        archived_ids.add(task["id"])
+        
+        if matches is not None:
+            tasks.sort(key=lambda task: matches[task["id"]], reverse=True)
+            steps.append("Order: relevance")
+        steps.append(f"Result: {len(tasks):,} tasks ({len(archived_ids):,} archived)")
+        return QueryResult(tasks, archived_ids, steps)
+
+def compile_query(expression):
+    """Parse an expression into a Plan; raise ValueError if it is malformed"""
+    return _compile(expression, date.today())
+
+@functools.lru_cache(maxsize=128)
+def _compile(expression, today):
+    # Relative dates resolve against today, so a plan is reused for a day at most
+    terms = []
+    words = []
+    for match in TERM_PATTERN.finditer(expression):
+        negate, field, op, value, phrase, word = match.groups()
+        if field is not None:
+            terms.append(Term(field.lower(), op or "=", value.strip('"'), bool(negate), today))
+        elif negate:
+            raise ValueError("Only field terms can be negated")
+        else:
+            text = phrase if phrase is not None else word
+            if text.strip():
+                words.append(text.strip())
+    return Plan(terms, words)
+
+class QueryCache:
+    """Results of recent queries keyed by (plan, data version)"""
+    
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.results = OrderedDict()
+    
+    def get(self, plan, version):
+        key = (str(plan), version)
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        return result
+    
+    def put(self, plan, version, result):
+        self.results[(str(plan), version)] = result
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+    
+    def clear(self):
+        self.results.clear()
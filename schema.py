@@ -0,0 +1,146 @@
+"""Versioned schema migrations for TaskFlow data files.
+
+Both app.py and terminaltodo.py store a JSON document of the form
+{"tasks": [...], "last_carryover_date": ..., "max_carryovers": ...}.
+Files carry a "schema_version"; files written before versioning are
+treated as version 0. A file is upgraded once by migrate() and then
+persisted, so loading a current-version file does no per-record work.
+The parsing of a task's duration fields (estimated_time, max_time) lives
+here too, so both apps, query and aggregate read them the same way.
+"""
+from datetime import datetime
+
+SCHEMA_VERSION = 1
+DEFAULT_MAX_CARRYOVERS = 3
+
+# Field defaults for a version 1 task; list values are factories so
+# every task gets its own list
+TASK_DEFAULTS = {
+    "category": "General",
+    "priority": "Medium",
+    "is_recurring": False,
+    "recurrence_pattern": "",
+    "notes": "",
+    "completed": False,
+    "completed_at": None,
+    "no_carryover": False,
+    "carry_count": 0,
+    "estimated_time": "",
+    "max_time": "",
+    "subtasks": list,
+    "time_spent": 0,
+    "time_sessions": list
+}
+
+def new_data():
+    """Return an empty data document at the current schema version"""
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "tasks": [],
+        "last_carryover_date": datetime.now().strftime("%Y-%m-%d"),
+        "max_carryovers": DEFAULT_MAX_CARRYOVERS
+    }
+
+def normalize_task(task):
+    """Bring a single task record up to the current schema in place"""
+    for key, default in TASK_DEFAULTS.items():
+        if key not in task:
+            task[key] = default() if callable(default) else default
+
+    if not task.get("created_at"):
+        due = task.get("due_date") or datetime.now().strftime("%Y-%m-%d")
+        task["created_at"] = f"{due}T00:00:00"
+    if not task.get("due_date"):
+        task["due_date"] = task["created_at"][:10]
+
+    for i, subtask in enumerate(task["subtasks"], 1):
+        subtask.setdefault("id", i)
+        subtask.setdefault("completed", False)
+
+    for i, session in enumerate(task["time_sessions"], 1):
+        session.setdefault("session_id", i)
+        if "end_time" in session:
+            session.setdefault("duration", 0)
+    return task
+
+def validate_task(task):
+    """Raise ValueError unless a record can be used as a task"""
+    if not isinstance(task, dict):
+        raise ValueError("Task records must be JSON objects")
+    if not isinstance(task.get("id"), int) or isinstance(task["id"], bool):
+        raise ValueError(f"Task id must be an integer, got {task.get('id')!r}")
+    if not isinstance(task.get("description"), str):
+        raise ValueError(f"Task {task['id']} has no description")
+    for key in ("subtasks", "time_sessions"):
+        if not isinstance(task.get(key, []), list):
+            raise ValueError(f"Task {task['id']} field '{key}' must be a list")
+    return task
+
+def parse_minutes(value):
+    """Minutes in a duration such as 30m, 1.5h or 45; None if unparseable"""
+    value = str(value).strip().lower()
+    try:
+        if value.endswith("h"):
+            return float(value[:-1]) * 60
+        if value.endswith("m"):
+            return float(value[:-1])
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+def parse_time_to_minutes(time_str):
+    """Convert time string (30m, 1h, 1.5h) to whole minutes; 0 if empty or unparseable"""
+    minutes = parse_minutes(time_str) if time_str else None
+    return int(minutes) if minutes is not None else 0
+
+def _migrate_v0_to_v1(data):
+    """Backfill every task field that older app versions may have omitted"""
+    for task in data.setdefault("tasks", []):
+        normalize_task(task)
+    data.setdefault("last_carryover_date", datetime.now().strftime("%Y-%m-%d"))
+    data.setdefault("max_carryovers", DEFAULT_MAX_CARRYOVERS)
+
+# Maps a schema version to the function upgrading it to the next version
+MIGRATIONS = {
+    0: _migrate_v0_to_v1
+}
+
+def needs_migration(data):
+    """Return True if the document is older than the current schema"""
+    return data.get("schema_version", 0) < SCHEMA_VERSION
+
+def migrate(data):
+    """Upgrade a data document in place; return True if anything changed.
+
+    Raises ValueError for files written by a newer version of the app.
+    """
+    version = data.get("schema_version", 0)
+    if version > SCHEMA_VERSION:
+        raise ValueError(
+            f"Data file schema version {version} is newer than supported version {SCHEMA_VERSION}"
+        )
+    if version == SCHEMA_VERSION:
+        return False
+
+    while version < SCHEMA_VERSION:
+        MIGRATIONS[version](data)
+        version += 1
+    data["schema_version"] = SCHEMA_VERSION
+    return True
+
+def migrate_batches(batches):
+    """Migrate the task batches of jsonstream.iter_batches() as they stream past.
+
+    Tasks are upgraded from the schema_version declared before them; a
+    document declaring none there is version 0. A document from a newer
+    version of the app raises ValueError before its first batch.
+    """
+    version = None
+    meta = {}
+    for batch, meta in batches:
+        if version is None:
+            version = meta.get("schema_version", 0)
+        migrate({"schema_version": version, "tasks": batch})
+        yield batch, meta
+    # Older writers put the version after the tasks
+    migrate({"schema_version": meta.get("schema_version", 0), "tasks": []})
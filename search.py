@@ -0,0 +1,260 @@
+"""Persistent inverted index for full-text task search.
+
+Descriptions, notes and subtask descriptions are tokenized into an
+inverted index mapping each term to the tasks containing it, weighted by
+field (a match in the description counts more than one in the notes).
+Queries match every term, the last one as a prefix so results update while
+typing, rank by BM25 and then combine with category, priority, status and
+date filters kept per task. Matches are found with set operations on the
+posting lists; when a limited search matches more than MAX_SCORED tasks,
+only the most recently created of them are ranked, so common terms and
+short prefixes cost the same as rare ones.
+
+The index is maintained incrementally: each task's terms are kept with it,
+so removing a task touches only its own postings. sync() either re-indexes
+the tasks a caller knows changed (e.g. from a change feed) or compares a
+cheap signature of every hot task with the one indexed, while archive
+segments, being immutable, are indexed once each. Between runs it is
+pickled next to the data file together with a stamp of its sources, so an
+unchanged store is never re-scanned.
+"""
+import bisect
+import heapq
+import math
+import os
+import pickle
+import re
+import zlib
+
+INDEX_VERSION = 2
+FIELD_WEIGHTS = {"description": 3, "subtasks": 2, "notes": 1}
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_LIMIT = 50
+MAX_SCORED = 5000  # Matches ranked by a limited search
+MAX_EXPANSIONS = 64  # Terms a prefix expands to, in lexicographic order
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    """Lowercase word tokens of a string"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+def task_terms(task):
+    """Weighted term frequencies of a task's searchable fields"""
+    weights = {}
+    fields = [
+        ("description", task["description"]),
+        ("notes", task["notes"]),
+        ("subtasks", " ".join(s["description"] for s in task["subtasks"]))
+    ]
+    for field, text in fields:
+        weight = FIELD_WEIGHTS[field]
+        for term in tokenize(text):
+            weights[term] = weights.get(term, 0) + weight
+    return weights
+
+def signature(task):
+    """Checksum of everything the index stores about a task"""
+    parts = [task["description"], task["notes"], task["category"], task["priority"],
+             str(task["completed"]), task["created_at"], task["due_date"]]
+    parts.extend(s["description"] for s in task["subtasks"])
+    return zlib.crc32("\x1f".join(parts).encode("utf-8"))
+
+class SearchIndex:
+    """Inverted index over task text with per-task filter fields"""
+    
+    def __init__(self):
+        self.version = INDEX_VERSION
+        self.postings = {}   # term -> {task_id: weighted term frequency}
+        self.docs = {}       # task_id -> (signature, length, category, priority, completed, created, archived, terms)
+        self.segments = set()
+        self.stamp = None
+        self.total_length = 0
+        self._terms = None   # Sorted vocabulary for prefix lookups, built lazily
+    
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_terms"] = None
+        return state
+    
+    def add(self, task, archived=False):
+        """Index a task, replacing any previous version"""
+        if task["id"] in self.docs:
+            self.remove(task["id"])
+        terms = task_terms(task)
+        for term, weight in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                if self._terms is not None:
+                    bisect.insort(self._terms, term)
+            postings[task["id"]] = weight
+        length = sum(terms.values())
+        self.total_length += length
+        self.docs[task["id"]] = (
+            signature(task), length, task["category"], task["priority"],
+            task["completed"], task["created_at"][:10], archived, tuple(terms)
+        )
+    
+    def remove(self, task_id):
+        """Drop a task from the index"""
+        if task_id in self.docs:
+            self._purge([task_id])
+    
+    def sync(self, hot_tasks, segments=(), changed=None):
+        """Bring the index up to date; return the number of tasks re-indexed.
+        
+        hot_tasks is every task in the data file. segments yields
+        (name, tasks) for archive segments; only unseen ones are read.
+        changed is an optional set of ids covering every hot task added,
+        edited or deleted since the last sync; only those are re-indexed,
+        hot_tasks then needs to include just them, and the ones it lacks
+        are removed.
+        """
+        indexed = 0
+        for name, tasks in segments:
+            if name in self.segments:
+                continue
+            for task in tasks:
+                self.add(task, archived=True)
+                indexed += 1
+            self.segments.add(name)
+        
+        if changed is not None:
+            stale = [task for task in hot_tasks if task["id"] in changed]
+            present = {task["id"] for task in stale}
+            gone = [task_id for task_id in changed
+                    if task_id not in present and task_id in self.docs and not self.docs[task_id][6]]
+            self._purge(gone)
+            for task in stale:
+                self.add(task)
+            return indexed + len(stale) + len(gone)
+        
+        seen = set()
+        stale = []
+        for task in hot_tasks:
+            seen.add(task["id"])
+            doc = self.docs.get(task["id"])
+            if doc is None or doc[0] != signature(task) or doc[6]:
+                stale.append(task)
+        gone = [task_id for task_id, doc in self.docs.items() if not doc[6] and task_id not in seen]
+        self._purge(gone + [task["id"] for task in stale if task["id"] in self.docs])
+        for task in stale:
+            self.add(task)
+        return indexed + len(stale) + len(gone)
+    
+    def _purge(self, task_ids):
+        """Remove tasks from the postings of their own terms"""
+        for task_id in task_ids:
+            doc = self.docs.pop(task_id)
+            self.total_length -= doc[1]
+            for term in doc[7]:
+                postings = self.postings[term]
+                del postings[task_id]
+                if not postings:
+                    del self.postings[term]
+                    if self._terms is not None:
+                        del self._terms[bisect.bisect_left(self._terms, term)]
+    
+    def _expand(self, token, prefix):
+        """Posting lists matching a query token, exactly or as a prefix"""
+        if not prefix:
+            postings = self.postings.get(token)
+            return [(token, postings)] if postings else []
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        start = bisect.bisect_left(self._terms, token)
+        end = bisect.bisect_left(self._terms, token + "\uffff", start, min(start + MAX_EXPANSIONS, len(self._terms)))
+        return [(term, self.postings[term]) for term in self._terms[start:end]]
+    
+    def search(self, query, category=None, priority=None, completed=None,
+               since=None, until=None, limit=DEFAULT_LIMIT, archived=None):
+        """Return (total matches, [(task_id, score), ...] best first).
+        
+        Every query term must match; the last term also matches as a
+        prefix. Filters use the values stored at index time; since and
+        until compare creation dates as YYYY-MM-DD, and archived selects
+        tasks indexed from archive segments or from the data file. With
+        limit None every match is ranked and returned.
+        """
+        tokens = tokenize(query)
+        if not tokens or not self.docs:
+            return 0, []
+        expansions = [self._expand(token, i == len(tokens) - 1) for i, token in enumerate(tokens)]
+        if not all(expansions):
+            return 0, []
+        
+        # Rarest terms first keeps the running candidate set small
+        expansions.sort(key=lambda lists: sum(len(p) for _, p in lists))
+        matches = None
+        for lists in expansions:
+            ids = lists[0][1].keys() if len(lists) == 1 else set().union(*(p.keys() for _, p in lists))
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return 0, []
+        
+        docs = self.docs
+        def keep(task_id):
+            doc = docs[task_id]
+            return ((category is None or doc[2] == category) and
+                    (priority is None or doc[3] == priority) and
+                    (completed is None or doc[4] == completed) and
+                    (since is None or doc[5] >= since) and
+                    (until is None or doc[5] <= until) and
+                    (archived is None or doc[6] == archived))
+        if any(f is not None for f in (category, priority, completed, since, until, archived)):
+            matches = [task_id for task_id in matches if keep(task_id)]
+        total = len(matches)
+        if limit is not None and total > MAX_SCORED:
+            # Ids grow with creation, so these are the newest matches
+            matches = sorted(matches)[-MAX_SCORED:]
+        
+        doc_count = len(docs)
+        # BM25 length normalization: k1 * (1 - b + b * length / average)
+        norm_base = BM25_K1 * (1 - BM25_B)
+        norm_scale = BM25_K1 * BM25_B * doc_count / (self.total_length or 1)
+        
+        scores = dict.fromkeys(matches, 0.0)
+        for lists in expansions:
+            # A prefix scores by its best expansion in each task
+            best = {}
+            for term, postings in lists:
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                weight = idf * (BM25_K1 + 1)
+                for task_id in (scores if len(lists) == 1 else scores.keys() & postings.keys()):
+                    tf = postings[task_id]
+                    score = weight * tf / (tf + norm_base + norm_scale * docs[task_id][1])
+                    if score > best.get(task_id, 0.0):
+                        best[task_id] = score
+            for task_id, score in best.items():
+                scores[task_id] += score
+        
+        # Newer tasks win ties
+        key = lambda item: (item[1], docs[item[0]][5])
+        if limit is None:
+            return total, sorted(scores.items(), key=key, reverse=True)
+        return total, heapq.nlargest(limit, scores.items(), key=key)
+    
+    def is_archived(self, task_id):
+        """Return True if a task was indexed from an archive segment"""
+        return self.docs[task_id][6]
+
+def load(path):
+    """Load a persisted index, or return a new one if missing or outdated"""
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                index = pickle.load(f)
+            if getattr(index, "version", None) == INDEX_VERSION:
+                return index
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+    return SearchIndex()
+
+def save(index, path):
+    """Persist an index atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
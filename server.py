@@ -0,0 +1,478 @@
+"""Optional local TaskFlow server.
+
+One asyncio process owns the task store in memory and serves it to any
+number of clients over a small JSON-over-HTTP API, so the data file is
+parsed once when the server starts instead of once per client run:
+
+    python -m server --file todo_data.json              # http://127.0.0.1:8765
+    python -m server --socket /tmp/taskflow.sock        # Unix socket
+    TASKFLOW_SERVER=http://127.0.0.1:8765 python -m terminaltodo list
+    TASKFLOW_SERVER=http://127.0.0.1:8765 streamlit run app.py
+
+Endpoints (JSON request and response bodies):
+
+    GET    /health                      store size, request count, uptime
+    GET    /metrics                     Prometheus text format
+    GET    /data                        the whole document
+    PUT    /data                        replace the document
+    PATCH  /data                        {"tasks": [...], "deleted": [ids], ...}
+    GET    /tasks?due=&status=&where=   like `terminaltodo list`
+    POST   /tasks                       add a task (terminaltodo add fields)
+    GET    /tasks/<id>
+    PUT    /tasks/<id>                  replace a task
+    DELETE /tasks/<id>
+    POST   /tasks/<id>/complete         {"subtasks": true}
+    GET    /timer
+    POST   /timer/start                 {"id": 12}
+    POST   /timer/stop
+    POST   /carryover?force=1
+    GET    /reports?days=7
+    GET    /search?q=&category=&priority=&status=&limit=
+    POST   /batch                       JSON lines of terminaltodo batch operations
+    POST   /import?merge=1              JSON lines, a task list or an export
+    GET    /sync?replica=&since=        hub changes after a cursor (with --hub)
+    POST   /sync                        {"replica": ..., "changes": [...]}
+
+Handlers run one at a time on the event loop, so the store needs no locks.
+Writes mark the store dirty; the data file is saved SAVE_DELAY seconds
+after the first unsaved change and once more on shutdown. Saves take the
+data file's lock like every other writer, and changes the terminal app,
+local web sessions or scripts saved meanwhile are replayed first (see
+TaskStore.rebase); the server serves them from its next save on. The daily
+carryover runs on the first check after midnight.
+
+With --hub FILE the server is also a delta sync hub (see deltasync) for
+other machines, saved to FILE on the same schedule.
+"""
+import argparse
+import asyncio
+import io
+import json
+import re
+import signal
+import sys
+import time
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+import changefeed
+import client
+import deltasync
+import jsonstream
+import metrics
+import search
+import terminaltodo
+from schema import migrate, validate_task
+
+SAVE_DELAY = 2.0  # Seconds between the first unsaved change and the save
+CARRYOVER_CHECK = 60  # Seconds between checks for a new day
+MAX_BODY = 256 * 1024 * 1024
+RESPONSE_CACHE_SIZE = 256  # Encoded GET responses kept for the current store version
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"
+}
+
+class NotFound(Exception):
+    """The requested task or route does not exist"""
+
+class ServerStore(terminaltodo.TaskStore):
+    """TaskStore that keeps its search index in memory and counts changes"""
+    
+    def __init__(self, data, stamp=None):
+        super().__init__(data, stamp)
+        self.version = 0
+        self._index = None
+        # Ids of tasks changed since the index was synced; None when unknown
+        self._unindexed = None
+    
+    def _touch(self, task, new=False):
+        super()._touch(task, new)
+        if self._unindexed is not None:
+            self._unindexed.add(task["id"])
+    
+    def rebase(self, stored):
+        super().rebase(stored)
+        self._unindexed = None
+    
+    def search_index(self):
+        if self._index is None:
+            self._index = search.load(f"{terminaltodo.DATA_FILE}.search")
+        if self._unindexed is None:
+            self._index.sync(self.data["tasks"])
+        elif self._unindexed:
+            changed = [self.tasks_by_id[i] for i in self._unindexed if i in self.tasks_by_id]
+            self._index.sync(changed, changed=self._unindexed)
+        self._unindexed = set()
+        return self._index
+    
+    def replaced(self, data):
+        """A store holding data instead, saved as a change to every differing task"""
+        store = ServerStore(data, self.stamp)
+        store.version = self.version
+        store.dirty = True
+        if self.stamp is not None:
+            # Bases as of the last load or save, so rebase keeps other writers' changes
+            for task_id in self.tasks_by_id.keys() | store.tasks_by_id.keys():
+                if task_id in self.base_checksums:
+                    store.base_checksums[task_id] = self.base_checksums[task_id]
+                elif task_id in self.tasks_by_id:
+                    store.base_checksums[task_id] = changefeed.task_checksum(self.tasks_by_id[task_id])
+                else:
+                    store.base_checksums[task_id] = None
+        return store
+
+def _json(body):
+    return json.loads(body) if body else {}
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "yes")
+
+class TaskServer:
+    """Routes HTTP requests to a ServerStore"""
+    
+    ROUTES = [
+        ("GET", r"/health", "health"),
+        ("GET", r"/metrics", "metrics"),
+        ("GET", r"/data", "get_data"),
+        ("PUT", r"/data", "put_data"),
+        ("PATCH", r"/data", "patch_data"),
+        ("GET", r"/tasks", "list_tasks"),
+        ("POST", r"/tasks", "add_task"),
+        ("GET", r"/tasks/(\d+)", "get_task"),
+        ("PUT", r"/tasks/(\d+)", "put_task"),
+        ("DELETE", r"/tasks/(\d+)", "delete_task"),
+        ("POST", r"/tasks/(\d+)/complete", "complete_task"),
+        ("GET", r"/timer", "get_timer"),
+        ("POST", r"/timer/start", "start_timer"),
+        ("POST", r"/timer/stop", "stop_timer"),
+        ("POST", r"/carryover", "carry_over"),
+        ("GET", r"/reports", "reports"),
+        ("GET", r"/search", "search"),
+        ("POST", r"/batch", "batch"),
+        ("POST", r"/import", "import_tasks"),
+        ("GET", r"/sync", "sync_pull"),
+        ("POST", r"/sync", "sync_push")
+    ]
+    
+    def __init__(self, store, save_delay=SAVE_DELAY, hub=None, hub_path=None):
+        self.store = store
+        self.save_delay = save_delay
+        self.hub = hub
+        self.hub_path = hub_path
+        self.routes = [(method, re.compile(f"^{pattern}$"), name) for method, pattern, name in self.ROUTES]
+        self.requests = 0
+        self.started = time.time()
+        self._save_handle = None
+        self._responses = {}
+        self._responses_version = None
+    
+    def dispatch(self, method, target, body=b""):
+        """Handle one request and return (status, payload)"""
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        allowed = []
+        for route_method, pattern, name in self.routes:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed.append(route_method)
+                continue
+            
+            start = time.perf_counter()
+            try:
+                status, payload = getattr(self, name)(params, body, *match.groups())
+            except NotFound as e:
+                status, payload = 404, {"error": str(e)}
+            except (ValueError, KeyError, TypeError) as e:
+                status, payload = 400, {"error": str(e)}
+            except Exception as e:
+                print(f"Error handling {method} {target}: {e!r}", file=sys.stderr)
+                status, payload = 500, {"error": "Internal server error"}
+            metrics.SERVER_SECONDS.observe(time.perf_counter() - start, route=name, status=str(status))
+            if method != "GET" and (self.store.dirty or self.hub is not None and self.hub.dirty):
+                self.store.version += 1
+                self.schedule_save()
+            return status, payload
+        
+        if allowed:
+            return 405, {"error": f"{url.path} allows {', '.join(allowed)}"}
+        return 404, {"error": f"No route for {url.path}"}
+    
+    def response(self, method, target, body=b""):
+        """Handle one request and return (status, content type, encoded body).
+        
+        Encoding large task lists costs more than finding them, so GET
+        responses are kept until the store changes or the date rolls over.
+        """
+        self.requests += 1
+        key = None
+        if method == "GET" and not target.startswith(("/health", "/metrics")):
+            if self._responses_version != self.store.version:
+                self._responses.clear()
+                self._responses_version = self.store.version
+            key = (target, date.today())
+            cached = self._responses.get(key)
+            metrics.record_cache("server_responses", cached is not None)
+            if cached is not None:
+                return cached
+        
+        status, payload = self.dispatch(method, target, body)
+        if isinstance(payload, str):
+            encoded = status, "text/plain; version=0.0.4; charset=utf-8", payload.encode("utf-8")
+        else:
+            encoded = status, "application/json", json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+        if key is not None and status == 200 and self._responses_version == self.store.version:
+            if len(self._responses) >= RESPONSE_CACHE_SIZE:
+                self._responses.clear()
+            self._responses[key] = encoded
+        return encoded
+    
+    def schedule_save(self):
+        """Save once SAVE_DELAY seconds after the first unsaved change"""
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(self.save_delay, self.save)
+    
+    def save(self):
+        self._save_handle = None
+        if self.store.dirty:
+            self.store.save()
+            # The save may have replayed other writers' changes
+            self.store.version += 1
+            if self.store.conflicts:
+                print(f"Tasks {', '.join(map(str, self.store.conflicts))} were changed by another program; "
+                      f"kept the saved version", file=sys.stderr)
+                self.store.conflicts = []
+        if self.hub is not None and self.hub.dirty and self.hub_path:
+            self.hub.save(self.hub_path)
+    
+    def _task(self, task_id):
+        task = self.store.tasks_by_id.get(int(task_id))
+        if task is None:
+            raise NotFound(f"Task {task_id} not found")
+        return task
+    
+    # Handlers take (params, body, *path groups) and return (status, payload)
+    
+    def health(self, params, body):
+        return 200, {
+            "ok": True,
+            "tasks": len(self.store.data["tasks"]),
+            "version": self.store.version,
+            "dirty": self.store.dirty,
+            "requests": self.requests,
+            "uptime": round(time.time() - self.started, 1)
+        }
+    
+    def metrics(self, params, body):
+        return 200, metrics.render()
+    
+    def get_data(self, params, body):
+        return 200, self.store.data
+    
+    def put_data(self, params, body):
+        data = _json(body)
+        if not isinstance(data, dict) or not isinstance(data.get("tasks"), list):
+            raise ValueError("Expected a document with a task list")
+        migrate(data)
+        for task in data["tasks"]:
+            validate_task(task)
+        self.store = self.store.replaced(data)
+        return 200, {"tasks": len(data["tasks"])}
+    
+    def patch_data(self, params, body):
+        patch = _json(body)
+        for task in patch.get("tasks", []):
+            self.store.put_task(task)
+        deleted = self.store.delete_tasks(patch.get("deleted", []))
+        for key in ("last_carryover_date", "max_carryovers"):
+            if key in patch and patch[key] != self.store.data.get(key):
+                self.store.data[key] = patch[key]
+                self.store.dirty = True
+        return 200, {"updated": len(patch.get("tasks", [])), "deleted": deleted}
+    
+    def list_tasks(self, params, body):
+        return 200, self.store.list_tasks(params.get("due", "today"), params.get("status", "all"), params.get("where"))
+    
+    def add_task(self, params, body):
+        return 201, self.store.add_task(**_json(body))
+    
+    def get_task(self, params, body, task_id):
+        return 200, self._task(task_id)
+    
+    def put_task(self, params, body, task_id):
+        task = _json(body)
+        if task.get("id") != int(task_id):
+            raise ValueError(f"Task body id {task.get('id')!r} does not match the URL")
+        return 200, self.store.put_task(task)
+    
+    def delete_task(self, params, body, task_id):
+        self._task(task_id)
+        self.store.delete_tasks([task_id])
+        return 200, {"deleted": int(task_id)}
+    
+    def complete_task(self, params, body, task_id):
+        self._task(task_id)
+        return 200, self.store.complete_task(task_id, _json(body).get("subtasks", False))
+    
+    def get_timer(self, params, body):
+        task, session = self.store.active_session() or (None, None)
+        return 200, {"task": task, "session": session}
+    
+    def start_timer(self, params, body):
+        task_id = _json(body)["id"]
+        self._task(task_id)
+        task, session = self.store.start_timer(task_id)
+        return 200, {"task": task, "session": session}
+    
+    def stop_timer(self, params, body):
+        task, session = self.store.stop_timer()
+        return 200, {"task": task, "session": session}
+    
+    def carry_over(self, params, body):
+        carried, recurred = self.store.carry_over(force=_flag(params.get("force")))
+        return 200, {"carried": carried, "recurred": recurred}
+    
+    def reports(self, params, body):
+        return 200, self.store.report(int(params.get("days", 7)))
+    
+    def search(self, params, body):
+        limit = int(params.get("limit", search.DEFAULT_LIMIT))
+        results = self.store.search(params.get("q", ""), params.get("category"), params.get("priority"),
+                                    params.get("status", "all"), limit)
+        return 200, [[task, round(score, 3)] for task, score in results]
+    
+    def batch(self, params, body):
+        results = []
+        for op in terminaltodo.read_json_lines(io.StringIO(body.decode("utf-8"))):
+            try:
+                results.append(terminaltodo.apply_operation(self.store, op))
+            except (ValueError, KeyError, TypeError) as e:
+                results.append(terminaltodo.operation_error(op, e))
+        return 200, results
+    
+    def import_tasks(self, params, body):
+        records = jsonstream.iter_records(io.StringIO(body.decode("utf-8")))
+        tasks = (validate_task(record[1]) for record in records if record[0] == "task")
+        return 200, self.store.import_tasks(tasks, merge=_flag(params.get("merge")))
+    
+    def _hub(self):
+        if self.hub is None:
+            raise NotFound("This server is not a sync hub (start it with --hub FILE)")
+        return self.hub
+    
+    def sync_pull(self, params, body):
+        return 200, self._hub().pull(params["replica"], int(params.get("since", 0)))
+    
+    def sync_push(self, params, body):
+        request = _json(body)
+        return 200, self._hub().push(request["replica"], request["changes"])
+    
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, (400, "application/json", b'{"error":"Malformed request line"}'), False)
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY:
+                    await self._respond(writer, (413, "application/json", b'{"error":"Request body too large"}'), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                
+                response = self.response(method.upper(), target, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _respond(self, writer, response, keep_alive):
+        status, content_type, data = response
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+    
+    async def carryover_loop(self, interval=CARRYOVER_CHECK):
+        """Run the daily carryover whenever the date changes"""
+        while True:
+            carried, recurred = self.store.carry_over()
+            if self.store.dirty:
+                self.store.version += 1
+                self.schedule_save()
+            await asyncio.sleep(interval)
+
+async def serve(task_server, host="127.0.0.1", port=client.DEFAULT_PORT, socket_path=None, ready=None):
+    """Run the server until cancelled, saving the store on the way out.
+    
+    ready, if given, is called with the listening asyncio server.
+    """
+    if socket_path:
+        server = await asyncio.start_unix_server(task_server.handle_connection, socket_path)
+    else:
+        server = await asyncio.start_server(task_server.handle_connection, host, port)
+    carryover = asyncio.create_task(task_server.carryover_loop())
+    if ready:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        carryover.cancel()
+        task_server.save()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="server.py", description="Serve one TaskFlow store to many clients")
+    parser.add_argument("--file", default=terminaltodo.DATA_FILE, help="Data file (default: %(default)s)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=client.DEFAULT_PORT)
+    parser.add_argument("--socket", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--save-delay", type=float, default=SAVE_DELAY, help="Seconds to batch changes before saving")
+    parser.add_argument("--hub", help="Also serve a delta sync hub kept in this file")
+    args = parser.parse_args(argv)
+    
+    terminaltodo.DATA_FILE = args.file
+    metrics.enable()
+    hub = deltasync.SyncHub.load(args.hub) if args.hub else None
+    task_server = TaskServer(ServerStore.load(), args.save_delay, hub, args.hub)
+    where = f"unix:{args.socket}" if args.socket else f"http://{args.host}:{args.port}"
+    print(f"Serving {args.file} ({len(task_server.store.data['tasks']):,} tasks) on {where}", file=sys.stderr)
+    
+    async def run():
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, task.cancel)
+        await serve(task_server, args.host, args.port, args.socket)
+    
+    try:
+        asyncio.run(run())
+    except asyncio.CancelledError:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""Memory-mapped columnar store of time sessions.
+
+Time sessions live as nested dicts of ISO strings inside each task, which
+is convenient for editing but slow to aggregate. build() flattens every
+session into one fixed-width binary file; SessionStore memory-maps it and
+exposes each column as a NumPy view, so lookups never copy or parse.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    header    magic, row count, source stamp (3 x int64), category table size
+    records   RECORD_DTYPE rows sorted by (task_id, start)
+    starts    int64 start times in ascending order
+    cum       float64 running total of duration in start order, n + 1 values
+    order     int64 row index of each entry of starts
+    names     UTF-8 JSON list of category names; records hold indexes into it
+
+Sorting the records by task makes a task's sessions one contiguous slice.
+The start-ordered sections answer time-range questions with two binary
+searches: cum[hi] - cum[lo] is the minutes recorded in a range.
+
+Times are the apps' naive local timestamps as seconds since 1970-01-01,
+so pandas.to_datetime(..., unit="s") gives back the same wall-clock time
+and a day is always 86400 seconds. Open sessions have end == -1 and
+duration 0.
+
+SessionColumns answers the same queries over in-memory arrays, and
+LayeredStore queries several stores as one. The app keeps archived
+sessions in the file, which only changes with the archive, and flattens
+loaded tasks through a RowCache, which re-reads only tasks whose sessions
+changed, so a save does not rebuild the whole history.
+
+hour_of_week() bins minutes by weekday and hour with one bincount. A
+session crossing hour boundaries is first cut into one piece per hour it
+touches, and its duration is shared between the pieces by wall-clock time.
+
+NumPy is imported on first use so it never slows down app startup.
+"""
+import json
+import os
+from datetime import datetime
+
+MAGIC = b"TFSESS02"
+HEADER_SIZE = 48  # magic + count + 3 stamp fields + category table size
+
+RECORD_FIELDS = [
+    ("task_id", "<i8"),
+    ("session_id", "<i8"),
+    ("start", "<i8"),
+    ("end", "<i8"),
+    ("duration", "<f8"),
+    ("category", "<i8")
+]
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday; Monday is 0
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def _seconds(iso):
+    return int((datetime.fromisoformat(iso).replace(tzinfo=None) - EPOCH).total_seconds())
+
+def _rows(task, category=0):
+    for session in task["time_sessions"]:
+        ended = "end_time" in session
+        yield (
+            task["id"],
+            session["session_id"],
+            _seconds(session["start_time"]),
+            _seconds(session["end_time"]) if ended else -1,
+            session.get("duration", 0) if ended else 0.0,
+            category
+        )
+
+def task_records(task):
+    """A single task's sessions as a record array, for unsaved edits"""
+    import numpy as np
+    
+    records = np.array(list(_rows(task)), dtype=np.dtype(RECORD_FIELDS))
+    records.sort(order="start")
+    return records
+
+def source_stamp(*paths):
+    """Modification time and size of the files the store is built from"""
+    stamp = []
+    for path in paths:
+        stat = os.stat(path) if os.path.exists(path) else None
+        stamp.append(stat.st_mtime_ns ^ stat.st_size if stat else 0)
+    return (stamp + [0, 0, 0])[:3]
+
+def session_records(tasks):
+    """(record array, category names) of every session of an iterable of tasks"""
+    import numpy as np
+    
+    codes = {}
+    rows = [row for task in tasks
+            for row in _rows(task, codes.setdefault(task["category"], len(codes)))]
+    return np.array(rows, dtype=np.dtype(RECORD_FIELDS)), list(codes)
+
+def _columns(records):
+    """Sort records by (task_id, start) in place; return (records, starts, cum, order)"""
+    import numpy as np
+    
+    records.sort(order=["task_id", "start"])
+    order = np.argsort(records["start"], kind="stable")
+    starts = records["start"][order]
+    cum = np.concatenate(([0.0], np.cumsum(records["duration"][order])))
+    return records, starts, cum, order.astype("<i8")
+
+def build(path, tasks, stamp=(0, 0, 0)):
+    """Write the columnar session file for an iterable of tasks"""
+    import numpy as np
+    
+    records, categories = session_records(tasks)
+    records, starts, cum, order = _columns(records)
+    
+    names = json.dumps(categories).encode("utf-8")
+    
+    header = np.zeros(6, dtype="<i8")
+    header[1] = len(records)
+    header[2:5] = stamp
+    header[5] = len(names)
+    header_bytes = bytearray(header.tobytes())
+    header_bytes[:8] = MAGIC
+    
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header_bytes)
+        for section in (records, starts, cum, order):
+            f.write(section.tobytes())
+        f.write(names)
+    os.replace(tmp_path, path)
+    return len(records)
+
+class SessionColumns:
+    """Session queries over in-memory columns laid out like the file sections"""
+    
+    def __init__(self, records, categories):
+        import numpy as np
+        
+        self.records, self.starts, self.cum, self.order = _columns(records)
+        self.count = len(self.records)
+        self.categories = categories
+        self._np = np
+    
+    @classmethod
+    def from_tasks(cls, tasks):
+        return cls(*session_records(tasks))
+    
+    def task_sessions(self, task_id):
+        """A task's sessions in start order, as a view into the columns"""
+        task_ids = self.records["task_id"]
+        lo = self._np.searchsorted(task_ids, task_id, side="left")
+        hi = self._np.searchsorted(task_ids, task_id, side="right")
+        return self.records[lo:hi]
+    
+    def range_bounds(self, start, end):
+        """Positions in start order of sessions starting in [start, end)"""
+        lo = int(self._np.searchsorted(self.starts, _to_seconds(start), side="left"))
+        hi = int(self._np.searchsorted(self.starts, _to_seconds(end), side="left"))
+        return lo, hi
+    
+    def minutes_between(self, start, end):
+        """Total recorded minutes of sessions starting in [start, end)"""
+        lo, hi = self.range_bounds(start, end)
+        return float(self.cum[hi] - self.cum[lo])
+    
+    def sessions_between(self, start, end):
+        """Rows of sessions starting in [start, end), in start order"""
+        lo, hi = self.range_bounds(start, end)
+        return self.records[self.order[lo:hi]]
+    
+    def daily_minutes(self, start, days):
+        """Minutes recorded on each of days consecutive days from start"""
+        edges = _to_seconds(start) + 86400 * self._np.arange(days + 1)
+        positions = self._np.searchsorted(self.starts, edges, side="left")
+        return self._np.diff(self.cum[positions])
+    
+    def hour_of_week(self, start, end):
+        """Minutes by (category, weekday, hour) of sessions starting in [start, end)"""
+        rows = self.sessions_between(start, end)
+        return hour_of_week(rows["start"], rows["end"], rows["duration"], rows["category"], len(self.categories))
+
+class SessionStore(SessionColumns):
+    """Read-only NumPy views over a memory-mapped session file"""
+    
+    def __init__(self, path):
+        import numpy as np
+        
+        self.path = path
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        if raw[:8].tobytes() != MAGIC:
+            raise ValueError(f"{path} is not a session store")
+        header = raw[:HEADER_SIZE].view("<i8")
+        self.count = n = int(header[1])
+        self.stamp = [int(v) for v in header[2:5]]
+        
+        dtype = np.dtype(RECORD_FIELDS)
+        offset = HEADER_SIZE
+        self.records = raw[offset:offset + n * dtype.itemsize].view(dtype)
+        offset += n * dtype.itemsize
+        self.starts = raw[offset:offset + n * 8].view("<i8")
+        offset += n * 8
+        self.cum = raw[offset:offset + (n + 1) * 8].view("<f8")
+        offset += (n + 1) * 8
+        self.order = raw[offset:offset + n * 8].view("<i8")
+        offset += n * 8
+        self.categories = json.loads(raw[offset:offset + int(header[5])].tobytes())
+        self._np = np
+    
+    def is_current(self, stamp):
+        """Return True if the store was built from sources with this stamp"""
+        return self.stamp == list(stamp)
+
+class RowCache:
+    """Session columns of live tasks, re-reading only tasks whose sessions changed"""
+    
+    def __init__(self):
+        self.rows = {}  # task id -> (signature, session rows)
+    
+    @staticmethod
+    def signature(task):
+        # Timers append or end the last session; any other edit moves time_spent
+        sessions = task["time_sessions"]
+        last = sessions[-1] if sessions else {}
+        return (len(sessions), last.get("start_time"), last.get("end_time"), task["time_spent"])
+    
+    def columns(self, tasks):
+        """SessionColumns of an iterable of tasks"""
+        import numpy as np
+        
+        rows = {}
+        codes = {}
+        task_codes = []
+        counts = []
+        for task in tasks:
+            signature = self.signature(task)
+            cached = self.rows.get(task["id"])
+            if cached is None or cached[0] != signature:
+                cached = (signature, list(_rows(task)))
+            rows[task["id"]] = cached
+            task_codes.append(codes.setdefault(task["category"], len(codes)))
+            counts.append(len(cached[1]))
+        self.rows = rows
+        
+        records = np.array([row for _, task_rows in rows.values() for row in task_rows], dtype=np.dtype(RECORD_FIELDS))
+        records["category"] = np.repeat(np.array(task_codes, dtype=np.int64), counts)
+        return SessionColumns(records, list(codes))
+
+class LayeredStore:
+    """Several session stores queried as one.
+    
+    A task's sessions come from the first layer holding any. Category codes
+    differ between layers, so categories is their union and hour_of_week
+    adds each layer's grids up by name.
+    """
+    
+    def __init__(self, layers, key=None):
+        self.layers = layers
+        self.key = key
+        self.categories = list(dict.fromkeys(name for layer in layers for name in layer.categories))
+    
+    def task_sessions(self, task_id):
+        for layer in self.layers:
+            rows = layer.task_sessions(task_id)
+            if len(rows):
+                return rows
+        return rows
+    
+    def minutes_between(self, start, end):
+        return sum(layer.minutes_between(start, end) for layer in self.layers)
+    
+    def daily_minutes(self, start, days):
+        return sum(layer.daily_minutes(start, days) for layer in self.layers)
+    
+    def hour_of_week(self, start, end):
+        import numpy as np
+        
+        positions = {name: i for i, name in enumerate(self.categories)}
+        grid = np.zeros((len(self.categories), 7, 24))
+        for layer in self.layers:
+            for name, layer_grid in zip(layer.categories, layer.hour_of_week(start, end)):
+                grid[positions[name]] += layer_grid
+        return grid
+
+def hour_of_week(starts, ends, durations, groups=None, n_groups=1):
+    """Minutes per (group, weekday, hour) as an (n_groups, 7, 24) array.
+    
+    starts and ends are epoch seconds; open sessions (end <= start) are
+    skipped. groups holds each session's group index, e.g. its category.
+    """
+    import numpy as np
+    
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    durations = np.asarray(durations, dtype=np.float64)
+    closed = ends > starts
+    starts, ends, durations = starts[closed], ends[closed], durations[closed]
+    groups = np.zeros(len(starts), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)[closed]
+    
+    # One piece per clock hour a session touches
+    first_hour = starts // 3600
+    pieces = (ends - 1) // 3600 - first_hour + 1
+    session = np.repeat(np.arange(len(starts)), pieces)
+    hour = first_hour[session] + np.arange(len(session)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    seconds = np.minimum(ends[session], (hour + 1) * 3600) - np.maximum(starts[session], hour * 3600)
+    
+    # Recorded durations may differ from wall-clock spans; share them pro rata
+    minutes = durations[session] * seconds / (ends - starts)[session]
+    weekday = (hour // 24 + EPOCH_WEEKDAY) % 7
+    slot = groups[session] * 168 + weekday * 24 + hour % 24
+    return np.bincount(slot, weights=minutes, minlength=n_groups * 168).reshape(n_groups, 7, 24)
+
+def _to_seconds(value):
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        return _seconds(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return int((value.replace(tzinfo=None) - EPOCH).total_seconds())
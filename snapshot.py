@@ -0,0 +1,128 @@
+"""Immutable task snapshots and report jobs computed against them.
+
+A Snapshot is the task list and settings as of one version, behind
+read-only mappings, so a background thread can read it while the UI keeps
+editing the live list. Snapshots share structure: advance() copies only
+the id -> task table and swaps in the tasks a change feed entry lists, so
+the snapshot after one edit costs one task plus a dict copy rather than a
+deep copy of every task.
+
+Snapshot.of() takes ownership of the tasks it is given; callers holding a
+live, mutable list pass a deep copy.
+
+ReportJobs runs report functions on a small process-wide thread pool. Each
+named slot remembers the newest finished result, so a view can show it
+straight away while the result for the current version is computed. A
+computation superseded by a newer version is cancelled: it is dropped if
+still queued, and cancellable functions also see their cancel event set.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+WORKERS = 2  # Report threads shared by every session in the process
+
+class Snapshot:
+    """Read-only tasks and settings as of one version"""
+    __slots__ = ("version", "by_id", "meta")
+    
+    def __init__(self, version, by_id, meta):
+        self.version = version
+        self.by_id = by_id
+        self.meta = MappingProxyType(dict(meta))
+    
+    @classmethod
+    def of(cls, version, tasks, meta):
+        """Snapshot of tasks nothing else will mutate"""
+        return cls(version, {task["id"]: MappingProxyType(task) for task in tasks}, meta)
+    
+    def advance(self, changes):
+        """A new snapshot with change feed entries applied, sharing unchanged tasks"""
+        by_id = dict(self.by_id)
+        meta = self.meta
+        for change in changes:
+            for task_id, task in change.tasks.items():
+                if task is None:
+                    by_id.pop(task_id, None)
+                else:
+                    by_id[task_id] = MappingProxyType(task)
+            meta = change.meta
+        return Snapshot(changes[-1].version, by_id, meta)
+    
+    def __iter__(self):
+        return iter(self.by_id.values())
+    
+    def __len__(self):
+        return len(self.by_id)
+    
+    def ids(self):
+        """Ids of every task in the snapshot"""
+        return self.by_id.keys()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def executor():
+    """The process-wide report thread pool, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(WORKERS, thread_name_prefix="taskflow-reports")
+        return _executor
+
+class Job:
+    """The newest finished result of one report and the computation in flight"""
+    __slots__ = ("version", "future", "cancel", "result_version", "result")
+    
+    def __init__(self):
+        self.version = None
+        self.future = None
+        self.cancel = None
+        self.result_version = None
+        self.result = None
+    
+    @property
+    def ready(self):
+        """Whether result is for the version last requested"""
+        return self.result_version is not None and self.result_version == self.version
+    
+    @property
+    def has_result(self):
+        return self.result_version is not None
+    
+    def collect(self, timeout=0):
+        """Take the computed result if it finished within timeout seconds; return ready"""
+        if self.future is not None and not self.ready:
+            try:
+                result = self.future.result(timeout)
+            except TimeoutError:
+                return False
+            self.result_version = self.version
+            self.result = result
+        return self.ready
+
+class ReportJobs:
+    """Named report computations, each run at most once per version"""
+    
+    def __init__(self):
+        self.jobs = {}
+    
+    def request(self, name, version, func, *args, cancellable=False):
+        """The Job for name, computing func(*args) in the background if version is new.
+        
+        With cancellable, func is also passed cancel=threading.Event, set
+        once a newer version is requested. A failed computation raises from
+        collect(), and is retried on the next request for the same version.
+        """
+        job = self.jobs.setdefault(name, Job())
+        failed = job.future is not None and job.future.done() and job.future.exception() is not None
+        if job.version != version or (failed and not job.ready):
+            if job.future is not None and not job.future.done():
+                job.future.cancel()
+                job.cancel.set()
+            job.version = version
+            job.cancel = threading.Event()
+            kwargs = {"cancel": job.cancel} if cancellable else {}
+            job.future = executor().submit(func, *args, **kwargs)
+        job.collect()
+        return job
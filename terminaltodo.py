@@ -4,10 +4,12 @@ from datetime import datetime, timedelta, date
 import time
 import sys
 import re
-from pathlib import Path
-import textwrap
+import itertools
 from collections import defaultdict
-import statistics
+
+import carryover
+import metrics
+from schema import migrate, new_data, normalize_task, parse_time_to_minutes, validate_task
 
 # File to store tasks
 DATA_FILE = "todo_data.json"
@@ -64,22 +66,95 @@ class Theme:
         shortcut_text = f" {cls.LIGHT_TEXT}[{shortcut}]{cls.RESET}" if shortcut else ""
         return f"{cls.BOLD}{cls.PRIMARY}{number}.{cls.RESET} {text}{shortcut_text}"
     
+    SPARK_CHARS = "▁▂▃▄▅▆▇█"
+    
+    @classmethod
+    def sparkline(cls, values, color=None):
+        """Render a sequence of numbers as a one-line sparkline"""
+        values = list(values)
+        if not values:
+            return ""
+        peak = max(values)
+        steps = len(cls.SPARK_CHARS) - 1
+        chars = "".join(
+            cls.SPARK_CHARS[int(v / peak * steps)] if peak > 0 else cls.SPARK_CHARS[0]
+            for v in values
+        )
+        return f"{color or cls.ACCENT}{chars}{cls.RESET}"
+    
+    # Heatmap cells shade from HEAT_LOW to HEAT_HIGH (RGB)
+    HEAT_LOW = (230, 240, 255)
+    HEAT_HIGH = (75, 85, 192)
+    
+    @classmethod
+    def heatmap(cls, grid, row_labels):
+        """Render rows of 24 hourly values as a colored grid"""
+        peak = max((max(row) for row in grid), default=0)
+        lines = [f"{cls.LIGHT_TEXT}{'':4}" + "".join(f"{hour:<6}" for hour in range(0, 24, 3)) + cls.RESET]
+        for label, row in zip(row_labels, grid):
+            cells = []
+            for value in row:
+                if value <= 0 or peak <= 0:
+                    cells.append(f"{cls.BORDER}··")
+                    continue
+                t = value / peak
+                r, g, b = (round(low + (high - low) * t) for low, high in zip(cls.HEAT_LOW, cls.HEAT_HIGH))
+                cells.append(f"\033[38;2;{r};{g};{b}m██")
+            lines.append(f"{cls.LIGHT_TEXT}{label:<4}" + "".join(cells) + cls.RESET)
+        return "\n".join(lines)
+    
+    @classmethod
+    def table(cls, headers, rows, align=None):
+        """Render rows as an ANSI table; cells may contain color codes"""
+        align = align or ["<"] + [">"] * (len(headers) - 1)
+        widths = [visible_len(h) for h in headers]
+        for row in rows:
+            for i, cell in enumerate(row):
+                widths[i] = max(widths[i], visible_len(str(cell)))
+        
+        def fmt(cells, style=""):
+            out = []
+            for i, cell in enumerate(cells):
+                cell = str(cell)
+                pad = " " * (widths[i] - visible_len(cell))
+                out.append(f"{style}{cell}{cls.RESET}{pad}" if align[i] == "<" else f"{pad}{style}{cell}{cls.RESET}")
+            return f" {cls.BORDER}│{cls.RESET} ".join(out)
+        
+        lines = [fmt(headers, f"{cls.BOLD}{cls.TEXT}")]
+        lines.append(f"{cls.BORDER}{'─┼─'.join('─' * w for w in widths)}{cls.RESET}")
+        lines.extend(fmt(row) for row in rows)
+        return "\n".join(lines)
+    
+    # Precomputed gradient bars, keyed by width
+    _gradients = {}
+    
+    @classmethod
+    def gradient(cls, width):
+        """Return the filled-bar string for every fill level at the given width"""
+        cached = width in cls._gradients
+        metrics.record_cache("gradient", cached)
+        if not cached:
+            cells = []
+            for i in range(width):
+                # Gradient from light to dark blue
+                ratio = i / max(width, 1)
+                r = int(120 + ratio * 30)
+                g = int(140 + ratio * 50)
+                b = int(210 + ratio * 40)
+                cells.append(f"\033[38;2;{r};{g};{b}m█")
+            
+            cls._gradients[width] = [""] + [
+                "".join(cells[:filled]) + cls.RESET for filled in range(1, width + 1)
+            ]
+        return cls._gradients[width]
+    
     @classmethod
     def progress_bar(cls, progress, width=30):
         """Create a professional progress bar with gradient effect"""
-        filled = int(progress * width)
+        filled = min(max(int(progress * width), 0), width)
         empty = width - filled
         
-        # Create gradient effect for filled portion
-        bar = ""
-        for i in range(filled):
-            # Gradient from light to dark blue
-            ratio = i / max(width, 1)
-            r = int(120 + ratio * 30)
-            g = int(140 + ratio * 50)
-            b = int(210 + ratio * 40)
-            bar += f"\033[38;2;{r};{g};{b}m█{cls.RESET}"
-        
+        bar = cls.gradient(width)[filled]
         bar += f"{cls.BORDER}{'░' * empty}{cls.RESET}"
         percentage = f"{cls.BOLD}{int(progress*100)}%{cls.RESET}"
         
@@ -107,67 +182,137 @@ class Theme:
         output += f"{border_color}└{'─' * (max_width)}┘{cls.RESET}"
         return output
 
+ANSI_PATTERN = re.compile(r"\033\[[0-9;]*[A-Za-z]")
+
+def visible_len(text):
+    """Length of text as displayed, ignoring ANSI escape sequences"""
+    return len(ANSI_PATTERN.sub("", text))
+
+class Renderer:
+    """Double-buffered terminal writer.
+    
+    Each screen is composed into an in-memory frame and written with a single
+    write call. On a terminal, only lines that differ from the previously
+    written frame are repainted, using ANSI cursor addressing; a full clear is
+    an escape sequence rather than a subprocess.
+    """
+    CLEAR = "\033[2J\033[H"
+    CLEAR_LINE = "\033[K"
+    CLEAR_BELOW = "\033[J"
+    
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.frame = []
+        self.previous = None  # Lines currently on screen, None forces a full redraw
+        self.emitted = 0      # Characters of the frame already written (non-tty)
+    
+    def begin(self):
+        """Start composing a new frame"""
+        self.frame = []
+        self.emitted = 0
+    
+    def print(self, *values, sep=" ", end="\n"):
+        """Append text to the current frame (same signature as print)"""
+        self.frame.append(sep.join(str(v) for v in values) + end)
+    
+    def invalidate(self):
+        """Force the next flush to repaint the whole screen"""
+        self.previous = None
+    
+    def flush(self):
+        """Write the current frame, repainting only the lines that changed"""
+        text = "".join(self.frame)
+        
+        if not self.stream.isatty():
+            self.stream.write(text[self.emitted:])
+            self.stream.flush()
+            self.emitted = len(text)
+            return
+        
+        lines = text.split("\n")
+        rows = os.get_terminal_size(self.stream.fileno()).lines
+        
+        if self.previous is None or len(lines) >= rows:
+            # Full redraw; a frame taller than the terminal scrolls, so row
+            # addressing is unreliable until the next full redraw
+            out = self.CLEAR + text
+            self.previous = None if len(lines) >= rows else lines
+        else:
+            parts = []
+            last = len(lines) - 1
+            for i, line in enumerate(lines[:last]):
+                if i >= len(self.previous) or self.previous[i] != line:
+                    parts.append(f"\033[{i + 1};1H{line}{self.CLEAR_LINE}")
+            if len(self.previous) > len(lines):
+                parts.append(f"\033[{len(lines) + 1};1H{self.CLEAR_BELOW}")
+            # Always rewrite the last line so the cursor ends after its text
+            parts.append(f"\033[{last + 1};1H{lines[last]}{self.CLEAR_LINE}")
+            out = "".join(parts)
+            self.previous = lines
+        
+        self.stream.write(out)
+        self.stream.flush()
+        self.emitted = len(text)
+    
+    def input(self, prompt=""):
+        """Flush the frame with a trailing prompt and read a line of input.
+        
+        The answer and its newline, echoed by the terminal, become part of
+        the frame, so the next flush compares against what is on screen.
+        """
+        self.print(prompt, end="")
+        self.flush()
+        value = input()
+        self.frame.append(value + "\n")
+        text = "".join(self.frame)
+        self.emitted = len(text)
+        if self.previous is not None:
+            lines = text.split("\n")
+            size = os.get_terminal_size(self.stream.fileno())
+            # A wrapped answer or a scrolled screen moves lines off their rows
+            if len(lines) >= size.lines or visible_len(lines[-2]) > size.columns:
+                self.previous = None
+            else:
+                self.previous = lines
+        return value
+    
+    def pause(self, seconds):
+        """Flush the frame and keep it on screen for a moment"""
+        self.flush()
+        time.sleep(seconds)
+
+screen = Renderer()
+
+@metrics.timed(metrics.STORAGE_SECONDS, operation="load")
 def load_tasks():
-    """Load tasks from JSON file with backward compatibility"""
+    """Load tasks from JSON file, upgrading older schema versions once"""
     if os.path.exists(DATA_FILE):
         with open(DATA_FILE, 'r') as f:
             data = json.load(f)
-            
-            # Backward compatibility for existing data files
-            for task in data["tasks"]:
-                if "priority" not in task:
-                    task["priority"] = "Medium"
-                if "is_recurring" not in task:
-                    task["is_recurring"] = False
-                    task["recurrence_pattern"] = ""
-                if "notes" not in task:
-                    task["notes"] = ""
-                if "no_carryover" not in task:
-                    task["no_carryover"] = False
-                if "carry_count" not in task:
-                    task["carry_count"] = 0
-                if "estimated_time" not in task:
-                    task["estimated_time"] = ""
-                if "max_time" not in task:
-                    task["max_time"] = ""
-                if "subtasks" not in task:
-                    task["subtasks"] = []
-                if "time_spent" not in task:
-                    task["time_spent"] = 0  # Total minutes spent
-                if "time_sessions" not in task:
-                    task["time_sessions"] = []  # List of {start, end, duration}
-            
-            if "max_carryovers" not in data:
-                data["max_carryovers"] = MAX_CARRYOVERS
-            
-            return data
+        
+        # Older files are migrated and written back, so current files are
+        # used exactly as stored
+        if migrate(data):
+            save_tasks(data)
+        metrics.record_store(data["tasks"], DATA_FILE)
+        return data
     
-    return {
-        "tasks": [],
-        "last_carryover_date": datetime.now().strftime("%Y-%m-%d"),
-        "max_carryovers": MAX_CARRYOVERS
-    }
+    return new_data()
 
-def parse_time_to_minutes(time_str):
-    """Convert time string (30m, 1h, 1.5h) to minutes"""
-    if not time_str:
-        return 0
-    
-    time_str = time_str.strip().lower()
-    if 'h' in time_str:
-        hours = float(time_str.replace('h', ''))
-        return int(hours * 60)
-    elif 'm' in time_str:
-        return int(time_str.replace('m', ''))
-    else:
-        # Assume minutes if no unit specified
-        try:
-            return int(time_str)
-        except ValueError:
-            return 0
+@metrics.timed(metrics.STORAGE_SECONDS, operation="save")
+def save_tasks(data):
+    """Atomically write tasks to the JSON file"""
+    import jsonstream
+    
+    tmp_file = f"{DATA_FILE}.tmp"
+    with open(tmp_file, 'w') as f:
+        jsonstream.write_document(f, data)
+    os.replace(tmp_file, DATA_FILE)
+    metrics.record_store(data["tasks"], DATA_FILE)
 
 def format_minutes_to_time(minutes):
     """Convert minutes to human-readable format (1h 30m)"""
+    minutes = int(minutes)
     if minutes <= 0:
         return "0m"
     
@@ -196,11 +341,11 @@ def format_time_to_words(minutes):
         return "Extended task"
 
 def clear_screen():
-    """Clear the terminal screen"""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    """Start a new screen frame"""
+    screen.begin()
     # Print header on every screen
-    print(f"{Theme.BOLD}{Theme.PRIMARY}TASKFLOW │ Professional Task Management{Theme.RESET}")
-    print(f"{Theme.BORDER}{'═' * (MAX_LINE_WIDTH - 10)}{Theme.RESET}\n")
+    screen.print(f"{Theme.BOLD}{Theme.PRIMARY}TASKFLOW │ Professional Task Management{Theme.RESET}")
+    screen.print(f"{Theme.BORDER}{'═' * (MAX_LINE_WIDTH - 10)}{Theme.RESET}\n")
 
 def format_task_display(task, index=None, show_subtasks=True):
     """Professional task formatting with clean typography"""
@@ -331,30 +476,30 @@ def display_todays_tasks(tasks):
         f"{Theme.BOLD}{today}{Theme.RESET}\n"
         f"{Theme.LIGHT_TEXT}Plan your day, achieve your goals{Theme.RESET}"
     )
-    print(Theme.card("DAILY OVERVIEW", header_content, Theme.PRIMARY))
+    screen.print(Theme.card("DAILY OVERVIEW", header_content, Theme.PRIMARY))
     
     # Progress summary
-    print(f"\n{Theme.header('PROGRESS SUMMARY')}")
+    screen.print(f"\n{Theme.header('PROGRESS SUMMARY')}")
     
     # Tasks progress bar
-    print(f"\n{Theme.TEXT}Tasks Completed:{Theme.RESET}")
-    print(Theme.progress_bar(completed_tasks / max(total_tasks, 1)))
-    print(f"{Theme.LIGHT_TEXT}{completed_tasks} of {total_tasks} tasks completed{Theme.RESET}")
+    screen.print(f"\n{Theme.TEXT}Tasks Completed:{Theme.RESET}")
+    screen.print(Theme.progress_bar(completed_tasks / max(total_tasks, 1)))
+    screen.print(f"{Theme.LIGHT_TEXT}{completed_tasks} of {total_tasks} tasks completed{Theme.RESET}")
     
     # Time progress bar (if estimates exist)
     if total_estimated > 0:
-        print(f"\n{Theme.TEXT}Time Utilization:{Theme.RESET}")
-        print(Theme.progress_bar(min(total_spent / max(total_estimated, 1), 1.0)))
+        screen.print(f"\n{Theme.TEXT}Time Utilization:{Theme.RESET}")
+        screen.print(Theme.progress_bar(min(total_spent / max(total_estimated, 1), 1.0)))
         
         efficiency_text = f"{time_efficiency:.0f}% of estimated time used"
         efficiency_color = Theme.SUCCESS if time_efficiency <= 100 else Theme.WARNING
-        print(f"{efficiency_color}{efficiency_text}{Theme.RESET}")
+        screen.print(f"{efficiency_color}{efficiency_text}{Theme.RESET}")
     
     # Task distribution by priority
-    print(f"\n{Theme.header('TODAY\'S TASKS')}")
+    screen.print("\n" + Theme.header("TODAY'S TASKS"))
     
     if not tasks:
-        print(f"\n{Theme.status('No tasks scheduled for today. Well done!', 'success')}")
+        screen.print(f"\n{Theme.status('No tasks scheduled for today. Well done!', 'success')}")
         return
     
     # Group by priority with professional section headers
@@ -374,27 +519,27 @@ def display_todays_tasks(tasks):
             count = len(data["tasks"])
             completed = sum(1 for t in data["tasks"] if t["completed"])
             
-            print(f"\n{Theme.BOLD}{data['color']}{priority} PRIORITY "
+            screen.print(f"\n{Theme.BOLD}{data['color']}{priority} PRIORITY "
                   f"{Theme.LIGHT_TEXT}({completed}/{count} completed){Theme.RESET}")
             
             for i, task in enumerate(data["tasks"], 1):
-                print(format_task_display(task, i))
+                screen.print(format_task_display(task, i))
     
     # Quick stats footer
     if total_tasks > 0:
-        print(f"\n{Theme.BORDER}{'─' * (MAX_LINE_WIDTH - 10)}{Theme.RESET}")
+        screen.print(f"\n{Theme.BORDER}{'─' * (MAX_LINE_WIDTH - 10)}{Theme.RESET}")
         stats = []
         if total_estimated > 0:
             stats.append(f"Est. time: {Theme.LIGHT_TEXT}{format_minutes_to_time(total_estimated)}{Theme.RESET}")
         stats.append(f"Avg. task time: {Theme.LIGHT_TEXT}{format_minutes_to_time(total_spent // max(total_tasks, 1))}{Theme.RESET}")
         stats.append(f"Efficiency: {Theme.LIGHT_TEXT}{time_efficiency:.0f}%{Theme.RESET}")
         
-        print(f" {Theme.LIGHT_TEXT}│ {Theme.RESET}".join(stats))
+        screen.print(f" {Theme.LIGHT_TEXT}│ {Theme.RESET}".join(stats))
 
 def time_tracking_menu(data):
     """Professional time tracking interface"""
     clear_screen()
-    print(Theme.header("TIME TRACKING", "⏱"))
+    screen.print(Theme.header("TIME TRACKING", "⏱"))
     
     # Show active timer if any
     active = get_active_timer(data)
@@ -408,14 +553,14 @@ def time_tracking_menu(data):
             f"{Theme.ACCENT}◉ {elapsed_str}{Theme.RESET} {Theme.LIGHT_TEXT}({elapsed_word}){Theme.RESET}\n"
             f"Started: {active['start_time'].strftime('%I:%M %p')}"
         )
-        print(Theme.card("CURRENT TIMER", timer_content, Theme.ACCENT))
+        screen.print(Theme.card("CURRENT TIMER", timer_content, Theme.ACCENT))
         
-        print(f"\n{Theme.header('TIMER CONTROLS')}")
-        print(Theme.menu_item(1, "Stop timer", "S"))
-        print(Theme.menu_item(2, "View today's time report", "R"))
-        print(Theme.menu_item(0, "Return to main menu", "ESC"))
+        screen.print(f"\n{Theme.header('TIMER CONTROLS')}")
+        screen.print(Theme.menu_item(1, "Stop timer", "S"))
+        screen.print(Theme.menu_item(2, "View today's time report", "R"))
+        screen.print(Theme.menu_item(0, "Return to main menu", "ESC"))
     else:
-        print(Theme.status("No active timer. Select a task to begin timing.", "info"))
+        screen.print(Theme.status("No active timer. Select a task to begin timing.", "info"))
         
         # Show incomplete tasks for timing
         today = datetime.now().strftime("%Y-%m-%d")
@@ -423,36 +568,311 @@ def time_tracking_menu(data):
                           if t["due_date"] == today and not t["completed"]]
         
         if incomplete_tasks:
-            print(f"\n{Theme.header('AVAILABLE TASKS')}")
+            screen.print(f"\n{Theme.header('AVAILABLE TASKS')}")
             for i, task in enumerate(incomplete_tasks, 1):
-                print(f"  {i}. {format_task_display(task)}")
+                screen.print(f"  {i}. {format_task_display(task)}")
             
-            print(f"\n{Theme.header('ACTIONS')}")
-            print(Theme.menu_item(1, f"Start timer for task #", "1-{len(incomplete_tasks)}"))
+            screen.print(f"\n{Theme.header('ACTIONS')}")
+            screen.print(Theme.menu_item(1, f"Start timer for task #", "1-{len(incomplete_tasks)}"))
         
-        print(Theme.menu_item(0, "Return to main menu", "ESC"))
+        screen.print(Theme.menu_item(0, "Return to main menu", "ESC"))
     
     return active
 
 def reports_menu(data):
     """Professional reports interface"""
     clear_screen()
-    print(Theme.header("TIME ANALYTICS", "📊"))
+    screen.print(Theme.header("TIME ANALYTICS", "📊"))
+    
+    screen.print(Theme.status("Gain insights into your productivity patterns and time usage", "info"))
+    
+    screen.print(f"\n{Theme.header('REPORT CATALOG')}")
+    screen.print(Theme.menu_item(1, "Daily Summary", "D"))
+    screen.print(Theme.menu_item(2, "Weekly Trends", "W"))
+    screen.print(Theme.menu_item(3, "Category Analysis", "C"))
+    screen.print(Theme.menu_item(4, "Estimation Accuracy", "E"))
+    screen.print(Theme.menu_item(5, "Productivity Insights", "P"))
+    screen.print(Theme.menu_item(6, "All reports", "A"))
+    screen.print(Theme.menu_item(0, "Return to main menu", "ESC"))
+    
+    screen.print(f"\n{Theme.BORDER}{'─' * (MAX_LINE_WIDTH - 10)}{Theme.RESET}")
+    screen.print(f"{Theme.LIGHT_TEXT}Tip: Use these reports to optimize your planning and improve time estimation accuracy{Theme.RESET}")
+
+def split_hours(slots, start, end, minutes):
+    """Add minutes to 168 weekday-by-hour slots, shared pro rata by wall-clock
+    time between the clock hours from start to end; open sessions (end <=
+    start) are credited to their start hour"""
+    span = (end - start).total_seconds()
+    if span <= 0:
+        slots[start.weekday() * 24 + start.hour] += minutes
+        return
+    while start < end:
+        piece_end = min(start.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1), end)
+        slots[start.weekday() * 24 + start.hour] += minutes * (piece_end - start).total_seconds() / span
+        start = piece_end
+
+class ReportAccumulator:
+    """Computes all five terminal reports in a single pass.
+    
+    Tasks are fed one at a time with add(); every report is updated from the
+    task and its time sessions, so results() can be rendered at any point
+    during the scan and becomes exact once every task has been added.
+    """
+    NAMES = ["daily", "weekly", "category", "estimation", "productivity"]
+    TITLES = {
+        "daily": "Daily Summary",
+        "weekly": "Weekly Trends",
+        "category": "Category Analysis",
+        "estimation": "Estimation Accuracy",
+        "productivity": "Productivity Insights"
+    }
+    # Upper bounds of actual/estimated ratio buckets for the accuracy histogram
+    RATIO_BUCKETS = [0.5, 0.8, 1.2, 1.5, 2.0, float("inf")]
     
-    print(Theme.status("Gain insights into your productivity patterns and time usage", "info"))
+    def __init__(self, days=7, category_days=30, today=None):
+        self.today = today or date.today()
+        self.today_str = self.today.strftime("%Y-%m-%d")
+        self.days = [(self.today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days - 1, -1, -1)]
+        self.category_start = (self.today - timedelta(days=category_days - 1)).strftime("%Y-%m-%d")
+        
+        self.scanned = 0
+        self.sessions = 0
+        self.daily = {"tasks": 0, "completed": 0, "estimated": 0, "actual": 0.0, "tracked_today": 0.0}
+        self.weekly = {d: {"tasks": 0, "completed": 0, "estimated": 0, "actual": 0.0, "tracked": 0.0} for d in self.days}
+        self.categories = defaultdict(lambda: {"tasks": 0, "completed": 0, "estimated": 0, "actual": 0.0})
+        self.estimation = {"samples": 0, "ratio_sum": 0.0, "abs_error_sum": 0.0,
+                           "under": 0, "on_target": 0, "over": 0,
+                           "buckets": [0] * len(self.RATIO_BUCKETS)}
+        self.longest_session = 0.0
+        # Tracked minutes per category in 168 weekday-by-hour slots; every
+        # hourly figure of the productivity report is derived from these
+        self.hour_grids = {}
     
-    print(f"\n{Theme.header('REPORT CATALOG')}")
-    print(Theme.menu_item(1, "Daily Summary", "D"))
-    print(Theme.menu_item(2, "Weekly Trends", "W"))
-    print(Theme.menu_item(3, "Category Analysis", "C"))
-    print(Theme.menu_item(4, "Estimation Accuracy", "E"))
-    print(Theme.menu_item(5, "Productivity Insights", "P"))
-    print(Theme.menu_item(0, "Return to main menu", "ESC"))
+    def add(self, task):
+        """Fold one task and its sessions into every report"""
+        self.scanned += 1
+        due = task["due_date"]
+        est = parse_time_to_minutes(task["estimated_time"])
+        spent = task["time_spent"]
+        completed = task["completed"]
+        
+        if due == self.today_str:
+            self.daily["tasks"] += 1
+            self.daily["completed"] += completed
+            self.daily["estimated"] += est
+            self.daily["actual"] += spent
+        
+        day = self.weekly.get(due)
+        if day is not None:
+            day["tasks"] += 1
+            day["completed"] += completed
+            day["estimated"] += est
+            day["actual"] += spent
+        
+        if due >= self.category_start and (spent > 0 or est):
+            category = self.categories[task["category"]]
+            category["tasks"] += 1
+            category["completed"] += completed
+            category["estimated"] += est
+            category["actual"] += spent
+        
+        if completed and est > 0 and spent > 0:
+            ratio = spent / est
+            acc = self.estimation
+            acc["samples"] += 1
+            acc["ratio_sum"] += ratio
+            acc["abs_error_sum"] += abs(ratio - 1)
+            if ratio > 1.2:
+                acc["under"] += 1
+            elif ratio < 0.8:
+                acc["over"] += 1
+            else:
+                acc["on_target"] += 1
+            for i, bound in enumerate(self.RATIO_BUCKETS):
+                if ratio < bound:
+                    acc["buckets"][i] += 1
+                    break
+        
+        grid = self.hour_grids.get(task["category"])
+        for session in task["time_sessions"]:
+            duration = session.get("duration")
+            if not duration:
+                continue
+            self.sessions += 1
+            start = datetime.fromisoformat(session["start_time"]).replace(tzinfo=None)
+            end = datetime.fromisoformat(session["end_time"]).replace(tzinfo=None) if "end_time" in session else start
+            if grid is None:
+                grid = self.hour_grids[task["category"]] = [0.0] * 168
+            split_hours(grid, start, end, duration)
+            start_day = session["start_time"][:10]
+            self.longest_session = max(self.longest_session, duration)
+            if start_day == self.today_str:
+                self.daily["tracked_today"] += duration
+            tracked_day = self.weekly.get(start_day)
+            if tracked_day is not None:
+                tracked_day["tracked"] += duration
+    
+    def heatmap(self):
+        """Minutes by weekday and hour as 7 rows of 24, overall and per category"""
+        def rows(slots):
+            return [slots[day * 24:(day + 1) * 24] for day in range(7)]
+        
+        minutes = [sum(slot) for slot in zip(*self.hour_grids.values())] or [0.0] * 168
+        by_category = sorted(self.hour_grids.items(), key=lambda item: sum(item[1]), reverse=True)
+        return {
+            "minutes": rows(minutes),
+            "by_category": {name: rows(slots) for name, slots in by_category if any(slots)}
+        }
     
-    print(f"\n{Theme.BORDER}{'─' * (MAX_LINE_WIDTH - 10)}{Theme.RESET}")
-    print(f"{Theme.LIGHT_TEXT}Tip: Use these reports to optimize your planning and improve time estimation accuracy{Theme.RESET}")
+    def results(self):
+        """Return all five reports as plain data"""
+        daily = dict(self.daily)
+        daily["completion_rate"] = daily["completed"] / daily["tasks"] * 100 if daily["tasks"] else 0
+        daily["efficiency"] = daily["actual"] / daily["estimated"] * 100 if daily["estimated"] else 0
+        
+        acc = self.estimation
+        samples = acc["samples"]
+        estimation = {
+            "samples": samples,
+            "mean_ratio": acc["ratio_sum"] / samples if samples else 0,
+            "mean_abs_error": acc["abs_error_sum"] / samples * 100 if samples else 0,
+            "under": acc["under"],
+            "on_target": acc["on_target"],
+            "over": acc["over"],
+            "buckets": list(acc["buckets"])
+        }
+        
+        heatmap = self.heatmap()
+        by_hour = [sum(column) for column in zip(*heatmap["minutes"])]
+        by_weekday = [sum(row) for row in heatmap["minutes"]]
+        total_tracked = sum(by_weekday)
+        weekday_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+        productivity = {
+            "sessions": self.sessions,
+            "total_tracked": total_tracked,
+            "average_session": total_tracked / self.sessions if self.sessions else 0,
+            "longest_session": self.longest_session,
+            "by_hour": by_hour,
+            "by_weekday": dict(zip(weekday_names, by_weekday)),
+            "best_hour": max(range(24), key=by_hour.__getitem__) if total_tracked else None,
+            "best_weekday": weekday_names[max(range(7), key=by_weekday.__getitem__)] if total_tracked else None,
+            "heatmap": heatmap
+        }
+        
+        return {
+            "scanned": self.scanned,
+            "daily": daily,
+            "weekly": {d: dict(v) for d, v in self.weekly.items()},
+            "category": {c: dict(v) for c, v in sorted(self.categories.items())},
+            "estimation": estimation,
+            "productivity": productivity
+        }
 
-def main_menu():
+def stream_reports(tasks, days=7, chunk_size=2000):
+    """Scan tasks once, newest first, yielding (scanned, total, reports) per chunk"""
+    accumulator = ReportAccumulator(days)
+    total = len(tasks)
+    for task in reversed(tasks):
+        accumulator.add(task)
+        if accumulator.scanned % chunk_size == 0 and accumulator.scanned < total:
+            yield accumulator.scanned, total, accumulator.results()
+    yield accumulator.scanned, total, accumulator.results()
+
+def render_report(name, reports):
+    """Render one report as ANSI text"""
+    import sessionstore
+    
+    fmt = format_minutes_to_time
+    lines = [Theme.header(ReportAccumulator.TITLES[name].upper())]
+    
+    if name == "daily":
+        d = reports["daily"]
+        lines.append(Theme.table(
+            ["Tasks", "Completed", "Estimated", "Actual", "Tracked today", "Efficiency"],
+            [[d["tasks"], d["completed"], fmt(d["estimated"]), fmt(d["actual"]),
+              fmt(d["tracked_today"]), f"{d['efficiency']:.0f}%"]],
+            [">"] * 6
+        ))
+        lines.append(Theme.progress_bar(d["completion_rate"] / 100))
+    
+    elif name == "weekly":
+        weekly = reports["weekly"]
+        rows = []
+        for day, v in weekly.items():
+            rate = v["completed"] / v["tasks"] * 100 if v["tasks"] else 0
+            rows.append([datetime.strptime(day, "%Y-%m-%d").strftime("%a %m-%d"), v["tasks"], v["completed"],
+                         f"{rate:.0f}%", fmt(v["estimated"]), fmt(v["actual"]), fmt(v["tracked"])])
+        lines.append(Theme.table(["Day", "Tasks", "Done", "Rate", "Estimated", "Actual", "Tracked"], rows))
+        lines.append(f"{Theme.LIGHT_TEXT}Tracked   {Theme.RESET}{Theme.sparkline(v['tracked'] for v in weekly.values())}")
+        lines.append(f"{Theme.LIGHT_TEXT}Completed {Theme.RESET}{Theme.sparkline((v['completed'] for v in weekly.values()), Theme.INFO)}")
+    
+    elif name == "category":
+        rows = []
+        for category, v in reports["category"].items():
+            efficiency = f"{v['actual'] / v['estimated'] * 100:.0f}%" if v["estimated"] else "N/A"
+            rows.append([category, v["tasks"], v["completed"], fmt(v["estimated"]), fmt(v["actual"]), efficiency])
+        if rows:
+            lines.append(Theme.table(["Category", "Tasks", "Done", "Estimated", "Actual", "Efficiency"], rows))
+            lines.append(f"{Theme.LIGHT_TEXT}Time share {Theme.RESET}{Theme.sparkline(v['actual'] for v in reports['category'].values())}")
+        else:
+            lines.append(Theme.status("No categorized time in the last 30 days.", "info"))
+    
+    elif name == "estimation":
+        e = reports["estimation"]
+        if e["samples"]:
+            lines.append(Theme.table(
+                ["Samples", "Avg actual/est", "Mean error", "Underestimated", "On target", "Overestimated"],
+                [[e["samples"], f"{e['mean_ratio']:.2f}x", f"{e['mean_abs_error']:.0f}%",
+                  e["under"], e["on_target"], e["over"]]],
+                [">"] * 6
+            ))
+            lines.append(f"{Theme.LIGHT_TEXT}Ratio <0.5 … ≥2.0 {Theme.RESET}{Theme.sparkline(e['buckets'], Theme.SECONDARY)}")
+        else:
+            lines.append(Theme.status("No completed tasks with both an estimate and tracked time yet.", "info"))
+    
+    elif name == "productivity":
+        p = reports["productivity"]
+        if p["sessions"]:
+            lines.append(Theme.table(
+                ["Sessions", "Tracked", "Avg session", "Longest", "Best hour", "Best day"],
+                [[p["sessions"], fmt(p["total_tracked"]), fmt(p["average_session"]),
+                  fmt(p["longest_session"]), f"{p['best_hour']:02d}:00", p["best_weekday"]]],
+                [">"] * 6
+            ))
+            lines.append(f"{Theme.LIGHT_TEXT}By hour 00→23 {Theme.RESET}{Theme.sparkline(p['by_hour'])}")
+            lines.append(f"{Theme.LIGHT_TEXT}By day  M→S   {Theme.RESET}{Theme.sparkline(p['by_weekday'].values(), Theme.INFO)}")
+            heatmap = p["heatmap"]
+            lines.append(Theme.section("Tracked time by hour of week"))
+            lines.append(Theme.heatmap(heatmap["minutes"], sessionstore.WEEKDAYS))
+            rows = []
+            for category, grid in heatmap["by_category"].items():
+                minutes = [value for row in grid for value in row]
+                peak = max(range(len(minutes)), key=minutes.__getitem__)
+                rows.append([category, fmt(sum(minutes)), f"{sum(minutes) / p['total_tracked'] * 100:.0f}%",
+                             f"{sessionstore.WEEKDAYS[peak // 24]} {peak % 24:02d}:00",
+                             Theme.sparkline(map(sum, zip(*grid)))])
+            lines.append(Theme.table(["Category", "Tracked", "Share", "Peak slot", "By hour 00→23"], rows))
+        else:
+            lines.append(Theme.status("No completed time sessions yet.", "info"))
+    
+    return "\n".join(lines)
+
+@metrics.timed(metrics.REPORT_SECONDS, report="interactive")
+def show_reports(data, names):
+    """Stream the reports, repainting the screen as the scan progresses"""
+    for scanned, total, reports in stream_reports(data["tasks"]):
+        clear_screen()
+        screen.print(Theme.header("TIME ANALYTICS", "📊"))
+        if scanned < total:
+            screen.print(f"{Theme.LIGHT_TEXT}Scanning history… {scanned:,} of {total:,} tasks{Theme.RESET}")
+            screen.print(Theme.progress_bar(scanned / total))
+        else:
+            screen.print(f"{Theme.LIGHT_TEXT}{total:,} tasks scanned{Theme.RESET}")
+        for name in names:
+            screen.print("\n" + render_report(name, reports))
+        screen.flush()
+
+def main_menu(data):
     """Professional main menu interface"""
     clear_screen()
     
@@ -468,7 +888,7 @@ def main_menu():
         greeting = "Good night"
     
     # System status indicators
-    active_timer = get_active_timer(load_tasks()) is not None
+    active_timer = get_active_timer(data) is not None
     timer_status = f"{Theme.ACCENT}◉ Active{Theme.RESET}" if active_timer else f"{Theme.LIGHT_TEXT}◉ Idle{Theme.RESET}"
     
     # Create header content
@@ -477,19 +897,19 @@ def main_menu():
         f"{Theme.LIGHT_TEXT}TaskFlow v2.1 │ {timer_status}{Theme.RESET}\n"
         f"{Theme.LIGHT_TEXT}A professional task management system{Theme.RESET}"
     )
-    print(Theme.card("WELCOME", header_content, Theme.PRIMARY))
+    screen.print(Theme.card("WELCOME", header_content, Theme.PRIMARY))
     
-    print(f"\n{Theme.header('MAIN MENU')}")
-    print(Theme.menu_item(1, "Create new task", "N"))
-    print(Theme.menu_item(2, "View & manage today's tasks", "T"))
-    print(Theme.menu_item(3, "Time tracking", "S"))
-    print(Theme.menu_item(4, "Analytics & reports", "R"))
-    print(Theme.menu_item(5, "Task archive", "A"))
-    print(Theme.menu_item(6, "System settings", "G"))
-    print(Theme.menu_item(0, "Exit application", "Q"))
+    screen.print(f"\n{Theme.header('MAIN MENU')}")
+    screen.print(Theme.menu_item(1, "Create new task", "N"))
+    screen.print(Theme.menu_item(2, "View & manage today's tasks", "T"))
+    screen.print(Theme.menu_item(3, "Time tracking", "S"))
+    screen.print(Theme.menu_item(4, "Analytics & reports", "R"))
+    screen.print(Theme.menu_item(5, "Task archive", "A"))
+    screen.print(Theme.menu_item(6, "System settings", "G"))
+    screen.print(Theme.menu_item(0, "Exit application", "Q"))
     
-    print(f"\n{Theme.BORDER}{'─' * (MAX_LINE_WIDTH - 10)}{Theme.RESET}")
-    print(f"{Theme.LIGHT_TEXT}Use number keys or shortcut letters to navigate │ Press ESC to cancel any action{Theme.RESET}")
+    screen.print(f"\n{Theme.BORDER}{'─' * (MAX_LINE_WIDTH - 10)}{Theme.RESET}")
+    screen.print(f"{Theme.LIGHT_TEXT}Use number keys or shortcut letters to navigate │ Press ESC to cancel any action{Theme.RESET}")
 
 # Helper functions (get_active_timer, generate reports, etc.) remain similar to previous implementation
 # but with professional styling applied
@@ -509,13 +929,471 @@ def get_active_timer(data):
                 }
     return None
 
+class TaskStore:
+    """In-memory task store: load once, apply any number of operations, save once"""
+    PRIORITIES = ("High", "Medium", "Low")
+    
+    def __init__(self, data, stamp=None):
+        self.data = data
+        self.tasks_by_id = {task["id"]: task for task in data["tasks"]}
+        self.next_id = max(self.tasks_by_id, default=0) + 1
+        self.dirty = False
+        self._active = None
+        self._active_scanned = False
+        # Stamp of the data file when loaded; None skips the concurrency check on save
+        self.stamp = stamp
+        # id -> checksum before the first local change since the last save (None for new tasks)
+        self.base_checksums = {}
+        self.conflicts = []
+        self.renumbered = {}
+        # (SyncState, path) written once the synced tasks are saved
+        self.sync_state = None
+    
+    @classmethod
+    def load(cls):
+        """Create a store from the data file"""
+        import changefeed
+        
+        stamp = changefeed.file_stamp(DATA_FILE)
+        return cls(load_tasks(), stamp)
+    
+    def save(self):
+        """Write the data file if anything changed since the last save.
+        
+        If another program wrote the file since it was loaded, local changes
+        are replayed onto its version first (see rebase).
+        """
+        import changefeed
+        
+        if self.dirty:
+            if self.stamp is None:
+                save_tasks(self.data)
+            else:
+                with changefeed.locked(DATA_FILE):
+                    if changefeed.file_stamp(DATA_FILE) != self.stamp:
+                        self.rebase(load_tasks())
+                    save_tasks(self.data)
+                    self.stamp = changefeed.file_stamp(DATA_FILE)
+            self.base_checksums = {}
+            self.dirty = False
+        if self.sync_state is not None:
+            state, path = self.sync_state
+            for old_id, new_id in self.renumbered.items():
+                if old_id in state.tasks:
+                    state.tasks[new_id] = state.tasks.pop(old_id)
+            state.save(path)
+            self.sync_state = None
+    
+    def _touch(self, task, new=False):
+        """Remember a task's stored checksum before its first local change"""
+        import changefeed
+        
+        if self.stamp is not None and task["id"] not in self.base_checksums:
+            self.base_checksums[task["id"]] = None if new else changefeed.task_checksum(task)
+    
+    def rebase(self, stored):
+        """Replay local changes onto a newer version of the data file.
+        
+        Tasks changed both here and in stored keep the stored version and
+        their ids are added to self.conflicts; new local tasks whose id was
+        taken in the meantime get a new id.
+        """
+        import changefeed
+        
+        tasks = stored["tasks"]
+        positions = {task["id"]: i for i, task in enumerate(tasks)}
+        added = []
+        deleted = set()
+        for task_id, base in self.base_checksums.items():
+            mine = self.tasks_by_id.get(task_id)
+            if base is None:
+                if mine is not None:
+                    added.append(mine)
+                continue
+            i = positions.get(task_id)
+            ours = changefeed.task_checksum(mine) if mine is not None else None
+            theirs = changefeed.task_checksum(tasks[i]) if i is not None else None
+            if ours == base or ours == theirs:
+                continue
+            if theirs != base:
+                self.conflicts.append(task_id)
+            elif mine is None:
+                deleted.add(task_id)
+            else:
+                tasks[i] = mine
+        
+        next_id = max(list(positions) + [task["id"] for task in added], default=0) + 1
+        for task in added:
+            if task["id"] in positions:
+                self.renumbered[task["id"]] = next_id
+                task["id"] = next_id
+                next_id += 1
+        
+        # Update in place: callers hold on to self.data
+        self.data["tasks"] = [t for t in tasks if t["id"] not in deleted] + added
+        self.data["last_carryover_date"] = max(stored["last_carryover_date"], self.data["last_carryover_date"])
+        self.data["max_carryovers"] = stored["max_carryovers"]
+        self.tasks_by_id = {task["id"]: task for task in self.data["tasks"]}
+        self.next_id = max(self.next_id, next_id)
+        self._active_scanned = False
+    
+    def get_task(self, task_id):
+        """Return a task by id or raise ValueError"""
+        task = self.tasks_by_id.get(int(task_id))
+        if task is None:
+            raise ValueError(f"Task {task_id} not found")
+        return task
+    
+    def active_session(self):
+        """Return (task, session) for the running timer, or None"""
+        metrics.record_cache("active_session", self._active_scanned)
+        if not self._active_scanned:
+            self._active = None
+            for task in self.data["tasks"]:
+                for session in task["time_sessions"]:
+                    if "end_time" not in session:
+                        self._active = (task, session)
+            self._active_scanned = True
+        return self._active
+    
+    def add_task(self, description, category="General", priority="Medium",
+                 due_date=None, is_recurring=False, recurrence_pattern="",
+                 notes="", estimated_time="", max_time="", no_carryover=False,
+                 subtasks=None):
+        """Add a new task and return it"""
+        description = (description or "").strip()
+        if not description:
+            raise ValueError("Task description is required")
+        priority = str(priority).capitalize()
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Invalid priority '{priority}'")
+        if due_date:
+            due_date = resolve_date(due_date)
+        
+        subtask_list = []
+        for i, subtask in enumerate(subtasks or [], 1):
+            if isinstance(subtask, dict):
+                subtask = subtask.get("description", "")
+            subtask_list.append({"id": i, "description": str(subtask), "completed": False})
+        
+        task = {
+            "id": self.next_id,
+            "description": description,
+            "category": category,
+            "priority": priority,
+            "is_recurring": bool(is_recurring or recurrence_pattern),
+            "recurrence_pattern": recurrence_pattern,
+            "notes": notes,
+            "due_date": due_date or datetime.now().strftime("%Y-%m-%d"),
+            "completed": False,
+            "no_carryover": no_carryover,
+            "carry_count": 0,
+            "estimated_time": estimated_time,
+            "max_time": max_time,
+            "subtasks": subtask_list,
+            "created_at": datetime.now().isoformat(),
+            "completed_at": None,
+            "time_spent": 0,
+            "time_sessions": []
+        }
+        
+        self.data["tasks"].append(task)
+        self.tasks_by_id[task["id"]] = task
+        self.next_id += 1
+        self._touch(task, new=True)
+        self.dirty = True
+        return task
+    
+    def complete_task(self, task_id, complete_subtasks=False):
+        """Mark a task completed, stopping its timer if it is running"""
+        task = self.get_task(task_id)
+        if task["completed"]:
+            return task
+        
+        active = self.active_session()
+        if active and active[0] is task:
+            self.stop_timer()
+        
+        self._touch(task)
+        task["completed"] = True
+        task["completed_at"] = datetime.now().isoformat()
+        if complete_subtasks:
+            for subtask in task["subtasks"]:
+                subtask["completed"] = True
+        self.dirty = True
+        return task
+    
+    def start_timer(self, task_id):
+        """Start a time session for a task, stopping any running timer first"""
+        task = self.get_task(task_id)
+        if task["completed"]:
+            raise ValueError(f"Task {task_id} is already completed")
+        
+        if self.active_session():
+            self.stop_timer()
+        
+        session = {
+            "start_time": datetime.now().isoformat(),
+            "session_id": max([s.get("session_id", 0) for s in task["time_sessions"]] + [0]) + 1
+        }
+        self._touch(task)
+        task["time_sessions"].append(session)
+        self._active = (task, session)
+        self.dirty = True
+        metrics.TIMER_EVENTS.inc(event="start")
+        return task, session
+    
+    def stop_timer(self):
+        """Stop the running timer and record its duration"""
+        active = self.active_session()
+        if not active:
+            raise ValueError("No active timer")
+        
+        task, session = active
+        self._touch(task)
+        now = datetime.now()
+        duration = (now - datetime.fromisoformat(session["start_time"])).total_seconds() / 60
+        session["end_time"] = now.isoformat()
+        session["duration"] = round(duration, 1)
+        task["time_spent"] += session["duration"]
+        
+        self._active = None
+        self.dirty = True
+        metrics.TIMER_EVENTS.inc(event="stop")
+        metrics.TIMER_SESSION_MINUTES.observe(duration)
+        return task, session
+    
+    def import_tasks(self, tasks, merge=False):
+        """Add tasks from another file, assigning new ids on conflict.
+        
+        With merge, tasks already in the store (by content hash) are merged
+        instead of duplicated.
+        """
+        from merge import TaskMerger
+        
+        if merge:
+            # Any stored task may absorb an imported duplicate
+            for task in self.data["tasks"]:
+                self._touch(task)
+            merger = TaskMerger(self.data["tasks"])
+            counts = merger.add_all(normalize_task(dict(task)) for task in tasks)
+            for task in self.data["tasks"]:
+                self._touch(task, new=True)
+            self.tasks_by_id = {task["id"]: task for task in self.data["tasks"]}
+            self.next_id = merger.next_id
+            self._active_scanned = False
+            self.dirty = self.dirty or counts["added"] + counts["merged"] > 0
+            return counts
+        
+        imported = 0
+        remapped = 0
+        for task in tasks:
+            task = normalize_task(dict(task))
+            if not isinstance(task.get("id"), int) or task["id"] in self.tasks_by_id:
+                task["id"] = self.next_id
+                remapped += 1
+            self.next_id = max(self.next_id, task["id"] + 1)
+            self.data["tasks"].append(task)
+            self.tasks_by_id[task["id"]] = task
+            self._touch(task, new=True)
+            imported += 1
+        
+        self._active_scanned = False
+        self.dirty = self.dirty or imported > 0
+        return {"imported": imported, "remapped": remapped}
+    
+    def put_task(self, task):
+        """Insert or replace a whole task record, keyed by its id"""
+        task = normalize_task(validate_task(dict(task)))
+        existing = self.tasks_by_id.get(task["id"])
+        if existing is None:
+            self.data["tasks"].append(task)
+            self.tasks_by_id[task["id"]] = task
+            self.next_id = max(self.next_id, task["id"] + 1)
+            self._touch(task, new=True)
+        else:
+            # Replace in place so the task keeps its position in the list
+            self._touch(existing)
+            existing.clear()
+            existing.update(task)
+            task = existing
+        self._active_scanned = False
+        self.dirty = True
+        return task
+    
+    def delete_tasks(self, task_ids):
+        """Remove tasks by id; return how many existed"""
+        task_ids = {int(task_id) for task_id in task_ids} & self.tasks_by_id.keys()
+        if task_ids:
+            for task_id in task_ids:
+                self._touch(self.tasks_by_id[task_id])
+            self.data["tasks"] = [t for t in self.data["tasks"] if t["id"] not in task_ids]
+            for task_id in task_ids:
+                del self.tasks_by_id[task_id]
+            self._active_scanned = False
+            self.dirty = True
+        return len(task_ids)
+    
+    def carry_over(self, force=False):
+        """Run the daily carryover once per day; return (carried, recurred) counts"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        if self.data.get("last_carryover_date") == today and not force:
+            return 0, 0
+        for task in self.data["tasks"]:
+            if not task["completed"] and task["due_date"] < today:
+                self._touch(task)
+        with metrics.CARRYOVER_SECONDS.time():
+            ids = itertools.count(self.next_id)
+            carried, recurred = carryover.carry_over(
+                self.data["tasks"], self.data.get("max_carryovers", MAX_CARRYOVERS), lambda: next(ids)
+            )
+        for task in recurred:
+            self.tasks_by_id[task["id"]] = task
+            self._touch(task, new=True)
+        self.next_id += len(recurred)
+        metrics.CARRYOVER_TASKS.inc(carried, action="carried")
+        metrics.CARRYOVER_TASKS.inc(len(recurred), action="recurred")
+        self.data["last_carryover_date"] = today
+        self.dirty = True
+        return carried, len(recurred)
+    
+    def sync(self, hub, state_path):
+        """Exchange changes with a sync hub (see deltasync); return the counts.
+        
+        The sync state at state_path is updated by the next save().
+        """
+        import deltasync
+        
+        state = deltasync.SyncState.load(state_path)
+        counts = deltasync.sync(self.data["tasks"], state, hub, self._touch)
+        self.tasks_by_id = {task["id"]: task for task in self.data["tasks"]}
+        self.next_id = max(self.tasks_by_id, default=0) + 1
+        self._active_scanned = False
+        self.dirty = self.dirty or counts["pulled"] + counts["pushed"] > 0
+        self.sync_state = (state, state_path)
+        return counts
+    
+    def search_index(self):
+        """The full-text index, synced with the store"""
+        return load_search_index(self.data["tasks"])
+    
+    def list_tasks(self, due="today", status="all", where=None):
+        """Tasks selected like `list`: due date and status, then an optional filter expression"""
+        tasks = filter_tasks(self.data["tasks"], due, status)
+        if not where:
+            return tasks
+        import query
+        
+        plan = query.compile_query(where)
+        text_search = None
+        if plan.words:
+            index = self.search_index()
+            text_search = lambda words: index.search(words, limit=None, archived=False)[1]
+        return plan.run(query.TaskIndex(tasks), text_search=text_search).tasks
+    
+    def search(self, text, category=None, priority=None, status="all", limit=None):
+        """Ranked full-text matches as (task, score) pairs"""
+        import search
+        
+        completed = {"open": False, "done": True}.get(status)
+        # The index is shared with the web app, which also indexes the archive
+        total, results = self.search_index().search(text, category, priority, completed,
+                                                    limit=limit or search.DEFAULT_LIMIT, archived=False)
+        return [(self.tasks_by_id[task_id], score) for task_id, score in results if task_id in self.tasks_by_id]
+    
+    def report(self, days=7):
+        """All five reports in one pass"""
+        with metrics.REPORT_SECONDS.time(report="all"):
+            accumulator = ReportAccumulator(days)
+            for task in self.data["tasks"]:
+                accumulator.add(task)
+            return accumulator.results()
+
+def resolve_date(value):
+    """Resolve 'today', 'tomorrow', 'yesterday' or YYYY-MM-DD to a date string"""
+    value = value.strip().lower()
+    offsets = {"today": 0, "tomorrow": 1, "yesterday": -1}
+    if value in offsets:
+        return (date.today() + timedelta(days=offsets[value])).strftime("%Y-%m-%d")
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+def create_task_flow(store):
+    """Interactive task creation"""
+    clear_screen()
+    screen.print(Theme.header("NEW TASK", "➕"))
+    
+    description = screen.input(f"{Theme.TEXT}Task description:{Theme.RESET} ").strip()
+    if not description:
+        screen.print(f"\n{Theme.status('Task creation cancelled.', 'warning')}")
+        screen.pause(1.5)
+        return None
+    
+    priority = screen.input(f"{Theme.TEXT}Priority [H/M/L, default M]:{Theme.RESET} ").strip().lower()
+    priority = {"h": "High", "l": "Low"}.get(priority[:1], "Medium")
+    category = screen.input(f"{Theme.TEXT}Category [General]:{Theme.RESET} ").strip() or "General"
+    estimated_time = screen.input(f"{Theme.TEXT}Estimated time (e.g. 30m, 1h):{Theme.RESET} ").strip()
+    max_time = screen.input(f"{Theme.TEXT}Maximum time (e.g. 1h, 2h):{Theme.RESET} ").strip()
+    recurrence_pattern = screen.input(
+        f"{Theme.TEXT}Recurrence (daily, weekly, monthly, mon,wed,fri or blank):{Theme.RESET} "
+    ).strip().lower()
+    no_carryover = screen.input(f"{Theme.TEXT}Exclude from carryover? [y/N]:{Theme.RESET} ").strip().lower() == "y"
+    notes = screen.input(f"{Theme.TEXT}Notes & attachments:{Theme.RESET} ").strip()
+    subtasks = screen.input(f"{Theme.TEXT}Subtasks (comma separated):{Theme.RESET} ").strip()
+    
+    task = store.add_task(
+        description,
+        category=category,
+        priority=priority,
+        recurrence_pattern=recurrence_pattern,
+        notes=notes,
+        estimated_time=estimated_time,
+        max_time=max_time,
+        no_carryover=no_carryover,
+        subtasks=[s.strip() for s in subtasks.split(",") if s.strip()]
+    )
+    store.save()
+    
+    message = f"Task created: {task['description']}"
+    screen.print(f"\n{Theme.status(message, 'success')}")
+    screen.pause(1.5)
+    return task
+
+def handle_timer_choice(store, active, choice):
+    """Apply a time tracking menu selection"""
+    if active:
+        if choice in ['1', 's']:
+            task, session = store.stop_timer()
+            store.save()
+            message = f"Timer stopped. Spent {format_minutes_to_time(session['duration'])} on '{task['description']}'"
+            screen.print(f"\n{Theme.status(message, 'success')}")
+            screen.pause(1.5)
+        elif choice in ['2', 'r']:
+            clear_screen()
+            display_todays_tasks(get_todays_tasks(store.data))
+            screen.input(f"\n{Theme.LIGHT_TEXT}Press Enter to return...{Theme.RESET}")
+        return
+    
+    today = datetime.now().strftime("%Y-%m-%d")
+    incomplete_tasks = [t for t in store.data["tasks"]
+                        if t["due_date"] == today and not t["completed"]]
+    if choice.isdigit() and 1 <= int(choice) <= len(incomplete_tasks):
+        task, session = store.start_timer(incomplete_tasks[int(choice) - 1]["id"])
+        store.save()
+        message = f"Timer started for '{task['description']}'"
+        screen.print(f"\n{Theme.status(message, 'success')}")
+    else:
+        screen.print(f"\n{Theme.status('Invalid selection.', 'danger')}")
+    screen.pause(1.5)
+
 def main():
     """Professional application entry point with clean UI flow"""
-    data = load_tasks()
+    metrics.start_from_env()
+    store = TaskStore.load()
+    data = store.data
     
     while True:
-        main_menu()
-        choice = input(f"\n{Theme.BOLD}{Theme.PRIMARY}Select option [{Theme.LIGHT_TEXT}1-6 or 0{Theme.PRIMARY}]: {Theme.RESET}").strip().lower()
+        main_menu(data)
+        choice = screen.input(f"\n{Theme.BOLD}{Theme.PRIMARY}Select option [{Theme.LIGHT_TEXT}1-6 or 0{Theme.PRIMARY}]: {Theme.RESET}").strip().lower()
         
         if choice in ['0', 'q']:
             # Professional exit experience
@@ -525,61 +1403,382 @@ def main():
                 f"{Theme.BOLD}Thank you for using TaskFlow{Theme.RESET}\n"
                 f"{Theme.LIGHT_TEXT}All data saved securely │ Next sync: {datetime.now().strftime('%I:%M %p')}{Theme.RESET}"
             )
-            print(Theme.card("SESSION COMPLETE", exit_content, Theme.SUCCESS))
-            time.sleep(2)
+            screen.print(Theme.card("SESSION COMPLETE", exit_content, Theme.SUCCESS))
+            screen.pause(2)
+            metrics.flush()
             sys.exit(0)
         
         elif choice in ['1', 'n']:
             # Create new task flow
-            clear_screen()
-            print(Theme.header("NEW TASK", "➕"))
-            
-            description = input(f"{Theme.TEXT}Task description:{Theme.RESET} ").strip()
-            # ... (rest of task creation with professional UI)
-            
+            create_task_flow(store)
+        
         elif choice in ['2', 't']:
             # Today's tasks view
             clear_screen()
             todays_tasks = get_todays_tasks(data)
             display_todays_tasks(todays_tasks)
             
-            input(f"\n{Theme.LIGHT_TEXT}Press Enter to return to main menu...{Theme.RESET}")
+            screen.input(f"\n{Theme.LIGHT_TEXT}Press Enter to return to main menu...{Theme.RESET}")
         
         elif choice in ['3', 's']:
             # Time tracking menu
             while True:
                 active = time_tracking_menu(data)
-                timer_choice = input(f"\n{Theme.BOLD}{Theme.PRIMARY}Select action: {Theme.RESET}").strip().lower()
+                timer_choice = screen.input(f"\n{Theme.BOLD}{Theme.PRIMARY}Select action: {Theme.RESET}").strip().lower()
                 
                 if timer_choice in ['0', 'esc']:
                     break
-                # ... (timer handling logic)
+                handle_timer_choice(store, active, timer_choice)
         
         elif choice in ['4', 'r']:
             # Reports menu
             while True:
                 reports_menu(data)
-                report_choice = input(f"\n{Theme.BOLD}{Theme.PRIMARY}Select report: {Theme.RESET}").strip().lower()
+                report_choice = screen.input(f"\n{Theme.BOLD}{Theme.PRIMARY}Select report: {Theme.RESET}").strip().lower()
                 
                 if report_choice in ['0', 'esc']:
                     break
-                # ... (report generation logic)
+                
+                choices = {'1': 'daily', 'd': 'daily', '2': 'weekly', 'w': 'weekly',
+                           '3': 'category', 'c': 'category', '4': 'estimation', 'e': 'estimation',
+                           '5': 'productivity', 'p': 'productivity'}
+                if report_choice in choices:
+                    show_reports(data, [choices[report_choice]])
+                elif report_choice in ['6', 'a']:
+                    show_reports(data, ReportAccumulator.NAMES)
+                else:
+                    continue
+                screen.input(f"\n{Theme.LIGHT_TEXT}Press Enter to return to reports...{Theme.RESET}")
+        
+        else:
+            screen.print(f"\n{Theme.status('Invalid selection. Please choose a valid option from the menu.', 'danger')}")
+            screen.pause(1.5)
+
+# Non-interactive command line interface. Every invocation loads the store
+# once, applies all operations (from arguments or JSON lines on stdin), saves
+# once, and writes one JSON object per line to stdout.
+
+def emit(obj, stream=None):
+    """Write one compact JSON line"""
+    (stream or sys.stdout).write(json.dumps(obj, separators=(",", ":"), default=str) + "\n")
+
+def read_json_lines(stream):
+    """Yield one operation dict per non-empty input line; bare integers are task ids"""
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"_error": f"line {line_no}: {e.msg}"}
+            continue
+        if isinstance(value, dict):
+            yield value
+        elif isinstance(value, int) and not isinstance(value, bool):
+            # A bare task id, as in `printf '1\n2\n' | terminaltodo.py complete`
+            yield {"id": value}
+        else:
+            yield {"_error": f"line {line_no}: expected a JSON object or a task id"}
+
+def apply_operation(store, op):
+    """Apply one batch operation to the store and return its result"""
+    if not isinstance(op, dict):
+        raise TypeError("An operation must be a JSON object")
+    if "_error" in op:
+        raise ValueError(op["_error"])
+    
+    args = dict(op)
+    name = args.pop("op", None)
+    
+    if name == "add":
+        args["due_date"] = args.pop("due", args.get("due_date"))
+        task = store.add_task(**args)
+        return {"op": name, "ok": True, "id": task["id"]}
+    elif name == "complete":
+        task = store.complete_task(args["id"], args.get("subtasks", False))
+        return {"op": name, "ok": True, "id": task["id"]}
+    elif name == "start":
+        task, session = store.start_timer(args["id"])
+        return {"op": name, "ok": True, "id": task["id"], "session_id": session["session_id"]}
+    elif name == "stop":
+        task, session = store.stop_timer()
+        return {"op": name, "ok": True, "id": task["id"], "duration": session["duration"]}
+    raise ValueError(f"Unknown operation '{name}'")
+
+def run_operations(store, operations):
+    """Apply a stream of operations, emitting one result line each"""
+    failures = 0
+    for op in operations:
+        try:
+            emit(apply_operation(store, op))
+        except (ValueError, KeyError, TypeError) as e:
+            failures += 1
+            emit(operation_error(op, e))
+    return failures
+
+def operation_error(op, error):
+    """Result line for an operation that failed"""
+    return {"op": op.get("op") if isinstance(op, dict) else None, "ok": False, "error": str(error)}
+
+def stdin_operations(name):
+    """Read operations for a single subcommand from stdin"""
+    for op in read_json_lines(sys.stdin):
+        op.setdefault("op", name)
+        yield op
+
+def filter_tasks(tasks, due="today", status="all"):
+    """Filter tasks by due date selector and completion status"""
+    if due == "all":
+        selected = tasks
+    elif due == "overdue":
+        today = date.today().strftime("%Y-%m-%d")
+        selected = (t for t in tasks if t["due_date"] < today and not t["completed"])
+    else:
+        target = resolve_date(due)
+        selected = (t for t in tasks if t["due_date"] == target)
+    
+    if status == "open":
+        return [t for t in selected if not t["completed"]]
+    if status == "done":
+        return [t for t in selected if t["completed"]]
+    return list(selected)
+
+def load_search_index(tasks):
+    """The persisted full-text index next to the data file, synced with tasks.
+    
+    The web app keeps the same file, stamped and scoped the same way: the
+    data file's tasks plus the archive segments.
+    """
+    import archive
+    import search
+    import sessionstore
+    
+    path = f"{DATA_FILE}.search"
+    directory = archive.archive_dir(DATA_FILE)
+    stamp = sessionstore.source_stamp(DATA_FILE, os.path.join(directory, archive.INDEX_FILE))
+    index = search.load(path)
+    if index.stamp != stamp:
+        segments = [s["file"] for s in archive.load_index(directory)["segments"]]
+        if not index.segments <= set(segments):
+            # The archive was discarded or replaced
+            index = search.SearchIndex()
+        index.sync(tasks, ((name, archive.read_segment(directory, name)) for name in segments
+                           if name not in index.segments))
+        index.stamp = stamp
+        search.save(index, path)
+    return index
+
+def iter_import_tasks(path):
+    """Yield tasks from a JSON export, a bare task list, or JSON lines, incrementally"""
+    import jsonstream
+    
+    stream = sys.stdin if path == "-" else open(path, 'r')
+    try:
+        for record in jsonstream.iter_records(stream):
+            if record[0] == "task":
+                yield record[1]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def build_parser():
+    """Build the argument parser for the batch CLI"""
+    import argparse
+    
+    import client
+    
+    parser = argparse.ArgumentParser(
+        prog="terminaltodo.py",
+        description="TaskFlow batch interface. Run without arguments for the interactive app."
+    )
+    parser.add_argument("--file", help=f"Data file (default: {DATA_FILE})")
+    parser.add_argument("--server", default=os.environ.get(client.ENV_VAR),
+                        help=f"Use a running TaskFlow server, e.g. http://127.0.0.1:8765 or unix:/path "
+                             f"(default: ${client.ENV_VAR}); --file is then ignored")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    add = sub.add_parser("add", help="Add tasks (JSON lines on stdin when no description is given)")
+    add.add_argument("description", nargs="?")
+    add.add_argument("-p", "--priority", default="Medium", choices=["High", "Medium", "Low"])
+    add.add_argument("-c", "--category", default="General")
+    add.add_argument("--due", help="today, tomorrow or YYYY-MM-DD")
+    add.add_argument("--est", dest="estimated_time", default="", help="Estimated time, e.g. 30m")
+    add.add_argument("--max", dest="max_time", default="", help="Maximum time, e.g. 1h")
+    add.add_argument("--recur", dest="recurrence_pattern", default="", help="daily, weekly, monthly or mon,wed,fri")
+    add.add_argument("--notes", default="")
+    add.add_argument("--no-carryover", action="store_true")
+    add.add_argument("--subtask", dest="subtasks", action="append", default=[])
+    
+    lst = sub.add_parser("list", help="List tasks as JSON lines")
+    lst.add_argument("--due", default="today", help="today, tomorrow, overdue, all or YYYY-MM-DD")
+    lst.add_argument("--status", default="all", choices=["all", "open", "done"])
+    lst.add_argument("--where", help="Filter expression, e.g. 'category:Work est:>1h completed:<7d'")
+    
+    complete = sub.add_parser("complete", help="Complete tasks (ids on stdin when none are given)")
+    complete.add_argument("ids", nargs="*", type=int)
+    complete.add_argument("--subtasks", action="store_true", help="Also complete all subtasks")
+    
+    start = sub.add_parser("start", help="Start a timer (ids on stdin when none is given)")
+    start.add_argument("id", nargs="?", type=int)
+    
+    sub.add_parser("stop", help="Stop the running timer")
+    
+    report = sub.add_parser("report", help="All five analytics reports in one pass")
+    report.add_argument("--days", type=int, default=7)
+    
+    find = sub.add_parser("search", help="Full-text search of descriptions, notes and subtasks, best first")
+    find.add_argument("query")
+    find.add_argument("-c", "--category")
+    find.add_argument("-p", "--priority", choices=["High", "Medium", "Low"])
+    find.add_argument("--status", default="all", choices=["all", "open", "done"])
+    find.add_argument("--limit", type=int, help="Maximum number of results")
+    
+    imp = sub.add_parser("import", help="Import tasks from a JSON export or JSON lines ('-' for stdin)")
+    imp.add_argument("path")
+    imp.add_argument("--merge", action="store_true",
+                     help="Merge tasks already present (by content hash) instead of adding copies")
+    
+    exp = sub.add_parser("export", help="Export the store")
+    exp.add_argument("--format", default="json", choices=["json", "jsonl", "csv", "parquet"],
+                     help="csv and parquet write a zip of tasks, subtasks and sessions tables")
+    exp.add_argument("-o", "--output", help="Output file (default: stdout; required for csv and parquet)")
+    exp.add_argument("--since", type=resolve_date, help="Only tasks created on or after this date")
+    exp.add_argument("--until", type=resolve_date, help="Only tasks created on or before this date")
+    exp.add_argument("--category", action="append", help="Only tasks in this category (repeatable)")
+    
+    sub.add_parser("batch", help='Apply JSON lines operations from stdin, e.g. {"op": "add", ...}')
+    
+    sync = sub.add_parser("sync", help="Pull and push task changes through a sync hub")
+    sync.add_argument("--remote", help="Hub: a server started with --hub, or file:PATH (default: $TASKFLOW_SYNC)")
+    return parser
+
+def run_cli(argv):
+    """Run one batch CLI invocation and return the process exit code"""
+    global DATA_FILE
+    args = build_parser().parse_args(argv)
+    if args.file:
+        DATA_FILE = args.file
+    
+    metrics.start_from_env()
+    if args.server:
+        import client
+    store = client.RemoteStore(client.Client(args.server)) if args.server else TaskStore.load()
+    failures = 0
+    
+    if args.command == "add":
+        if args.description is None:
+            failures = run_operations(store, stdin_operations("add"))
+        else:
+            failures = run_operations(store, [{
+                "op": "add",
+                "description": args.description,
+                "category": args.category,
+                "priority": args.priority,
+                "due_date": args.due,
+                "estimated_time": args.estimated_time,
+                "max_time": args.max_time,
+                "recurrence_pattern": args.recurrence_pattern,
+                "notes": args.notes,
+                "no_carryover": args.no_carryover,
+                "subtasks": args.subtasks
+            }])
+    elif args.command == "complete":
+        ops = ([{"op": "complete", "id": i, "subtasks": args.subtasks} for i in args.ids]
+               if args.ids else stdin_operations("complete"))
+        failures = run_operations(store, ops)
+    elif args.command == "start":
+        ops = [{"op": "start", "id": args.id}] if args.id is not None else stdin_operations("start")
+        failures = run_operations(store, ops)
+    elif args.command == "stop":
+        failures = run_operations(store, [{"op": "stop"}])
+    elif args.command == "batch":
+        failures = run_operations(store, read_json_lines(sys.stdin))
+    elif args.command == "list":
+        try:
+            tasks = store.list_tasks(args.due, args.status, args.where)
+        except ValueError as e:
+            emit({"op": "list", "ok": False, "error": str(e)})
+            tasks = []
+            failures = 1
+        for task in tasks:
+            emit(task)
+    elif args.command == "search":
+        for task, score in store.search(args.query, args.category, args.priority, args.status, args.limit):
+            emit(dict(task, score=round(score, 3)))
+    elif args.command == "report":
+        emit(store.report(args.days))
+    elif args.command == "import":
+        # A failed import leaves the store unmarked, so nothing is saved
+        try:
+            result = store.import_tasks(iter_import_tasks(args.path), merge=args.merge)
+            emit(dict(result, op="import", ok=True))
+        except (ValueError, OSError) as e:
+            emit({"op": "import", "ok": False, "error": str(e)})
+            failures = 1
+    elif args.command == "sync":
+        import deltasync
+        
+        args.remote = args.remote or os.environ.get(deltasync.ENV_VAR)
+        try:
+            if not args.remote:
+                raise ValueError(f"--remote or ${deltasync.ENV_VAR} is required")
+            if args.server:
+                raise ValueError("sync works on a data file; the server's store is not a sync replica")
+            counts = store.sync(deltasync.connect(args.remote), f"{DATA_FILE}.sync")
+            emit(dict(counts, op="sync", ok=True))
+        except (ValueError, OSError) as e:
+            emit({"op": "sync", "ok": False, "error": str(e)})
+            failures = 1
+    elif args.command == "export":
+        import export
         
+        source = lambda: export.select_tasks(store.data["tasks"], args.since, args.until, args.category)
+        if args.format in ("csv", "parquet"):
+            try:
+                if not args.output:
+                    raise ValueError(f"--output is required for {args.format} exports")
+                export.export_file(source, args.format, args.output)
+            except ValueError as e:
+                emit({"op": "export", "ok": False, "error": str(e)})
+                failures = 1
         else:
-            print(f"\n{Theme.status('Invalid selection. Please choose a valid option from the menu.', 'danger')}")
-            time.sleep(1.5)
+            out = open(args.output, 'w') if args.output else sys.stdout
+            try:
+                if args.format == "jsonl":
+                    export.write_jsonl(source(), out)
+                elif args.since or args.until or args.category:
+                    json.dump(dict(store.data, tasks=list(source())), out, indent=2)
+                    out.write("\n")
+                else:
+                    json.dump(store.data, out, indent=2)
+                    out.write("\n")
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+    
+    store.save()
+    if store.conflicts:
+        emit({"op": "save", "ok": False, "conflicts": store.conflicts,
+              "error": "Tasks changed by another program since loading kept their saved version"})
+        failures += 1
+    metrics.flush()
+    return 1 if failures else 0
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+    
     try:
         main()
     except KeyboardInterrupt:
         clear_screen()
-        print(Theme.status("Application terminated by user. All data saved.", "info"))
-        time.sleep(1)
+        screen.print(Theme.status("Application terminated by user. All data saved.", "info"))
+        screen.pause(1)
         sys.exit(0)
     except Exception as e:
         clear_screen()
-        print(Theme.status(f"Critical error: {str(e)}", "danger"))
-        print(Theme.status("Contact support with the error details above.", "warning"))
-        time.sleep(3)
+        screen.print(Theme.status(f"Critical error: {str(e)}", "danger"))
+        screen.print(Theme.status("Contact support with the error details above.", "warning"))
+        screen.pause(3)
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+import terminaltodo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(data_file, *args, stdin=""):
+    """Run the batch CLI; return (exit code, result lines)"""
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, "terminaltodo.py"), "--file", str(data_file), *args],
+                          input=stdin, capture_output=True, text=True, cwd=ROOT)
+    return proc.returncode, [json.loads(line) for line in proc.stdout.splitlines()]
+
+def test_complete_reads_bare_ids_from_stdin(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    run(data_file, "add", "standup")
+    run(data_file, "add", "review")
+    
+    code, results = run(data_file, "complete", stdin="1\n2\n")
+    
+    assert code == 0
+    assert results == [{"op": "complete", "ok": True, "id": 1}, {"op": "complete", "ok": True, "id": 2}]
+
+def test_non_object_lines_fail_without_stopping_the_batch(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    run(data_file, "add", "standup")
+    
+    code, results = run(data_file, "complete", stdin='"one"\n[1]\ntrue\n1\n')
+    
+    assert code == 1
+    assert [result["ok"] for result in results] == [False, False, False, True]
+    assert results[0]["error"] == "line 1: expected a JSON object or a task id"
+
+def test_read_json_lines():
+    lines = ['{"op": "stop"}', "", "7", "1.5", "{oops"]
+    
+    ops = list(terminaltodo.read_json_lines(lines))
+    
+    assert ops[:2] == [{"op": "stop"}, {"id": 7}]
+    assert "_error" in ops[2] and "_error" in ops[3]
+
+def test_operation_error_accepts_non_dicts():
+    assert terminaltodo.operation_error(3, ValueError("bad")) == {"op": None, "ok": False, "error": "bad"}
+
+def test_unreadable_import_file_is_reported(tmp_path):
+    data_file = tmp_path / "tasks.json"
+    run(data_file, "add", "standup")
+    before = data_file.read_text()
+    
+    code, results = run(data_file, "import", str(tmp_path / "missing.json"))
+    
+    assert code == 1
+    assert results[0]["op"] == "import" and results[0]["ok"] is False
+    assert data_file.read_text() == before
@@ -0,0 +1,116 @@
+import deltasync
+from schema import normalize_task
+
+def new_task(task_id, description):
+    return normalize_task({"id": task_id, "description": description,
+                           "created_at": "2026-10-01T09:00:00", "due_date": "2026-10-19"})
+
+def session(start, minutes):
+    return {"session_id": 1, "start_time": f"2026-10-19T{start}:00",
+            "end_time": f"2026-10-19T{start[:2]}:{int(start[3:]) + minutes:02d}:00", "duration": minutes}
+
+class Replica:
+    """A task list synced through a hub, as a data file and its sync state would be"""
+    
+    def __init__(self, hub, tasks=()):
+        self.hub = hub
+        self.tasks = list(tasks)
+        self.state = deltasync.SyncState()
+    
+    def sync(self, now):
+        return deltasync.sync(self.tasks, self.state, self.hub, now=now)
+    
+    def task(self, description):
+        return next(task for task in self.tasks if task["description"] == description)
+    
+    def view(self):
+        """Tasks without their replica-local ids, in a stable order"""
+        return sorted((deltasync.strip_id(task) for task in self.tasks), key=lambda task: task["description"])
+
+def replicas(*descriptions):
+    """Two replicas sharing tasks through an in-process SyncHub"""
+    hub = deltasync.SyncHub()
+    a = Replica(hub, [new_task(i, d) for i, d in enumerate(descriptions, 1)])
+    b = Replica(hub)
+    a.sync("2026-10-19T08:00:00")
+    b.sync("2026-10-19T08:00:01")
+    assert b.view() == a.view()
+    return a, b
+
+def test_new_tasks_reach_the_other_replica():
+    a, b = replicas("standup", "review")
+    
+    b.tasks.append(new_task(10, "write report"))
+    counts = b.sync("2026-10-19T09:00:00")
+    a.sync("2026-10-19T09:00:01")
+    
+    assert counts["pushed"] == 1
+    assert [task["description"] for task in a.view()] == ["review", "standup", "write report"]
+    assert a.sync("2026-10-19T09:00:02")["pulled"] == 0
+
+def test_concurrent_edits_converge():
+    a, b = replicas("standup")
+    a.task("standup")["priority"] = "High"
+    b.task("standup")["completed"] = True
+    b.task("standup")["completed_at"] = "2026-10-19T10:30:00"
+    
+    a.sync("2026-10-19T10:00:00")
+    counts = b.sync("2026-10-19T11:00:00")
+    a.sync("2026-10-19T11:00:01")
+    
+    assert counts["conflicts"] == 1
+    assert a.view() == b.view()
+    merged = a.task("standup")
+    # Completion sticks; other fields come from the newer change (b's)
+    assert merged["completed"] and merged["completed_at"] == "2026-10-19T10:30:00"
+    assert merged["priority"] == "Medium"
+
+def test_edit_beats_an_earlier_pushed_delete():
+    a, b = replicas("standup", "review")
+    a.tasks.remove(a.task("standup"))
+    b.task("standup")["notes"] = "kept"
+    
+    a.sync("2026-10-19T10:00:00")
+    b.sync("2026-10-19T10:00:01")
+    a.sync("2026-10-19T10:00:02")
+    
+    assert a.view() == b.view()
+    assert a.task("standup")["notes"] == "kept"
+
+def test_delete_of_an_already_edited_task_is_rejected():
+    a, b = replicas("standup", "review")
+    b.task("standup")["notes"] = "kept"
+    b.sync("2026-10-19T10:00:00")
+    a.tasks.remove(a.task("standup"))
+    
+    a.sync("2026-10-19T10:00:01")
+    b.sync("2026-10-19T10:00:02")
+    
+    assert a.view() == b.view()
+    assert a.task("standup")["notes"] == "kept"
+
+def test_unedited_delete_propagates():
+    a, b = replicas("standup", "review")
+    a.tasks.remove(a.task("standup"))
+    
+    a.sync("2026-10-19T10:00:00")
+    b.sync("2026-10-19T10:00:01")
+    
+    assert [task["description"] for task in b.view()] == ["review"]
+
+def test_sessions_are_unioned():
+    a, b = replicas("standup")
+    for replica, start in ((a, "09:00"), (b, "14:00")):
+        task = replica.task("standup")
+        task["time_sessions"].append(session(start, 30))
+        task["time_spent"] += 30
+    
+    a.sync("2026-10-19T15:00:00")
+    b.sync("2026-10-19T15:00:01")
+    a.sync("2026-10-19T15:00:02")
+    
+    assert a.view() == b.view()
+    merged = a.task("standup")
+    assert [s["start_time"][11:16] for s in merged["time_sessions"]] == ["09:00", "14:00"]
+    assert merged["time_spent"] == 60
+    assert len({s["session_id"] for s in merged["time_sessions"]}) == 2
@@ -0,0 +1,52 @@
+import io
+import json
+
+import pytest
+
+import jsonstream
+import schema
+
+def batches(text, batch_size=2):
+    """Migrated batches of a document, read the way the app imports it"""
+    records = jsonstream.iter_records(io.StringIO(text), chunk_size=64)
+    return schema.migrate_batches(jsonstream.iter_batches(records, batch_size))
+
+def document(tasks, **meta):
+    data = dict(schema.new_data(), tasks=tasks, **meta)
+    stream = io.StringIO()
+    jsonstream.write_document(stream, data)
+    return stream.getvalue()
+
+def test_version_is_written_before_tasks():
+    text = document([{"id": 1, "description": "a"}])
+    
+    assert text.index('"schema_version"') < text.index('"tasks"')
+    assert json.loads(text)["schema_version"] == schema.SCHEMA_VERSION
+
+def test_every_batch_sees_the_document_version():
+    tasks = [schema.normalize_task({"id": i, "description": f"task {i}"}) for i in range(1, 6)]
+    
+    seen = [(list(batch), meta.get("schema_version")) for batch, meta in batches(document(tasks))]
+    
+    assert [version for _, version in seen] == [schema.SCHEMA_VERSION] * 3
+    assert [task for batch, _ in seen for task in batch] == tasks
+
+def test_unversioned_tasks_are_migrated_in_every_batch():
+    text = json.dumps([{"id": i, "description": f"task {i}", "due_date": "2026-01-02"} for i in range(1, 6)])
+    
+    tasks = [task for batch, _ in batches(text) for task in batch]
+    
+    assert len(tasks) == 5
+    assert all(task["created_at"] == "2026-01-02T00:00:00" and task["time_sessions"] == [] for task in tasks)
+
+def test_newer_schema_is_rejected_before_the_first_batch():
+    text = document([{"id": i, "description": "x"} for i in range(1, 6)], schema_version=schema.SCHEMA_VERSION + 1)
+    
+    with pytest.raises(ValueError, match="newer"):
+        next(batches(text))
+
+def test_trailing_newer_version_is_still_rejected():
+    text = json.dumps({"tasks": [{"id": 1, "description": "x"}], "schema_version": schema.SCHEMA_VERSION + 1})
+    
+    with pytest.raises(ValueError, match="newer"):
+        list(batches(text))
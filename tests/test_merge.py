@@ -0,0 +1,103 @@
+import copy
+from datetime import date, datetime
+
+import carryover
+from merge import TaskMerger, task_hash
+from schema import normalize_task
+
+TODAY = date(2026, 10, 20)
+
+def recurring_task():
+    return normalize_task({
+        "id": 1,
+        "description": "standup",
+        "is_recurring": True,
+        "recurrence_pattern": "daily",
+        "due_date": "2026-10-19",
+        "created_at": "2026-10-01T09:00:00",
+        "completed": True,
+        "completed_at": "2026-10-19T09:15:00"
+    })
+
+def carried_pair():
+    """A completed recurring task and the copy carry_over made of it"""
+    tasks = [recurring_task()]
+    _, recurred = carryover.carry_over(tasks, 3, lambda: 2, TODAY)
+    assert len(recurred) == 1
+    return tasks
+
+def test_recurring_copy_has_its_own_identity():
+    completed, instance = carried_pair()
+    
+    assert instance["created_at"] != completed["created_at"]
+    assert datetime.fromisoformat(instance["created_at"]).date() == TODAY
+    assert task_hash(instance) != task_hash(completed)
+
+def test_merging_a_recurring_task_with_its_carried_copy():
+    completed, instance = carried_pair()
+    local = [copy.deepcopy(completed)]
+    
+    counts = TaskMerger(local).add_all(copy.deepcopy([completed, instance]))
+    
+    assert (counts["added"], counts["merged"], counts["duplicates"]) == (1, 0, 1)
+    assert local[0] == completed
+    assert local[1]["description"] == "standup" and not local[1]["completed"]
+    assert local[1]["due_date"] == "2026-10-21"
+
+def test_same_task_is_merged_across_copies():
+    task = recurring_task()
+    incoming = copy.deepcopy(task)
+    incoming["id"] = 7
+    incoming["time_sessions"] = [{"session_id": 1, "start_time": "2026-10-19T09:00:00",
+                                  "end_time": "2026-10-19T09:10:00", "duration": 10}]
+    incoming["time_spent"] = 10
+    local = [task]
+    
+    counts = TaskMerger(local).add_all([incoming])
+    
+    assert (counts["added"], counts["merged"]) == (0, 1)
+    assert local[0]["time_spent"] == 10 and local[0]["id"] == 1
+
+def test_new_occurrence_of_an_archived_task_is_added():
+    sibling, instance = carried_pair()
+    
+    counts = TaskMerger([], [sibling]).add_all([copy.deepcopy(instance)])
+    
+    assert (counts["added"], counts["duplicates"]) == (1, 0)
+
+def test_only_exact_copies_of_archived_tasks_are_duplicates():
+    sibling = recurring_task()
+    # An occurrence carried over before occurrences had their own created_at
+    legacy = dict(copy.deepcopy(sibling), id=2, completed=False, completed_at=None, due_date="2026-10-20")
+    local = []
+    
+    counts = TaskMerger(local, [sibling]).add_all([dict(copy.deepcopy(sibling), id=9), legacy])
+    
+    assert (counts["added"], counts["duplicates"]) == (1, 1)
+    assert local[0]["id"] == 2 and not local[0]["completed"]
+
+def test_reimporting_legacy_recurring_occurrences_changes_nothing():
+    original = recurring_task()
+    # Occurrences carried over before they had their own created_at share the original's identity
+    occurrence = dict(copy.deepcopy(original), id=2, completed=False, completed_at=None, due_date="2026-10-20")
+    local = [copy.deepcopy(original), copy.deepcopy(occurrence)]
+    
+    counts = TaskMerger(local).add_all(copy.deepcopy([original, occurrence]))
+    
+    assert (counts["added"], counts["merged"], counts["duplicates"]) == (0, 0, 2)
+    assert local == [original, occurrence]
+
+def test_legacy_occurrences_merge_into_the_matching_local_task():
+    original = recurring_task()
+    occurrence = dict(copy.deepcopy(original), id=2, completed=False, completed_at=None, due_date="2026-10-20")
+    local = [copy.deepcopy(original), copy.deepcopy(occurrence)]
+    incoming = copy.deepcopy(occurrence)
+    incoming["time_sessions"] = [{"session_id": 1, "start_time": "2026-10-20T09:00:00",
+                                  "end_time": "2026-10-20T09:10:00", "duration": 10}]
+    incoming["time_spent"] = 10
+    
+    counts = TaskMerger(local).add_all([incoming])
+    
+    assert counts["merged"] == 1
+    assert local[0] == original
+    assert local[1]["time_spent"] == 10 and not local[1]["completed"]
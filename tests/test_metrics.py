@@ -0,0 +1,72 @@
+import pytest
+
+import metrics
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A private registry with recording enabled"""
+    monkeypatch.setattr(metrics, "_enabled", True)
+    return metrics.Registry()
+
+def test_counter_text_format(registry):
+    events = registry.counter("taskflow_test_events_total", "Events seen", ["event"])
+    events.inc(event="start")
+    events.inc(2, event="start")
+    events.inc(event='say "hi"\n')
+    
+    assert registry.render() == (
+        "# HELP taskflow_test_events_total Events seen\n"
+        "# TYPE taskflow_test_events_total counter\n"
+        'taskflow_test_events_total{event="say \\"hi\\"\\n"} 1\n'
+        'taskflow_test_events_total{event="start"} 3\n'
+    )
+
+def test_histogram_buckets_are_cumulative(registry):
+    seconds = registry.histogram("taskflow_test_seconds", "Durations", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        seconds.observe(value)
+    
+    lines = registry.render().splitlines()
+    
+    assert lines[1] == "# TYPE taskflow_test_seconds histogram"
+    assert lines[2:] == [
+        'taskflow_test_seconds_bucket{le="0.1"} 1',
+        'taskflow_test_seconds_bucket{le="1"} 3',
+        'taskflow_test_seconds_bucket{le="+Inf"} 4',
+        "taskflow_test_seconds_sum 4.05",
+        "taskflow_test_seconds_count 4"
+    ]
+
+def test_gauge_and_unlabelled_values(registry):
+    size = registry.gauge("taskflow_test_bytes", "Size")
+    size.set(2048)
+    size.inc(-48)
+    
+    assert registry.render().splitlines()[-1] == "taskflow_test_bytes 2000"
+
+def test_nothing_is_recorded_while_disabled(registry, monkeypatch):
+    events = registry.counter("taskflow_test_events_total", "Events seen")
+    monkeypatch.setattr(metrics, "_enabled", False)
+    events.inc()
+    
+    assert registry.render().splitlines()[2:] == []
+
+def test_label_and_registration_errors(registry):
+    events = registry.counter("taskflow_test_events_total", "Events seen", ["event"])
+    
+    with pytest.raises(ValueError):
+        events.inc(kind="start")
+    with pytest.raises(ValueError):
+        events.inc(-1, event="start")
+    with pytest.raises(ValueError):
+        registry.gauge("taskflow_test_events_total", "Events seen", ["event"])
+    assert registry.counter("taskflow_test_events_total", "Events seen", ["event"]) is events
+
+def test_textfile_matches_render(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+    path = tmp_path / "taskflow.prom"
+    
+    metrics.write_textfile(str(path))
+    
+    assert path.read_text() == metrics.render()
+    assert "# TYPE taskflow_report_build_seconds histogram" in path.read_text()
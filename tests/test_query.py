@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+
+import pytest
+
+import archive
+import query
+from schema import normalize_task
+
+TODAY = date.today()
+
+def days_ago(n):
+    return (TODAY - timedelta(days=n)).isoformat()
+
+def task(task_id, category="Work", created=None, completed_days_ago=None, **fields):
+    created = created or days_ago(30)
+    completed = completed_days_ago is not None
+    return normalize_task(dict({
+        "id": task_id, "description": f"task {task_id}", "category": category,
+        "created_at": f"{created}T09:00:00", "due_date": created,
+        "completed": completed, "completed_at": f"{days_ago(completed_days_ago)}T17:00:00" if completed else None
+    }, **fields))
+
+TASKS = [
+    task(1, completed_days_ago=2),
+    task(2, completed_days_ago=10),
+    task(3, "Personal"),
+    task(4, "Personal", completed_days_ago=1, estimated_time="2h"),
+    task(5, "Health", estimated_time="30m")
+]
+
+def run(expression, tasks=TASKS, **kwargs):
+    return query.compile_query(expression).run(query.TaskIndex(tasks), **kwargs)
+
+def ids(result):
+    return sorted(t["id"] for t in result.tasks)
+
+def test_ages_flip_into_date_comparisons():
+    plan = query.compile_query("completed:<7d")
+    
+    assert str(plan) == f"completed:>{days_ago(7)}"
+    assert ids(run("completed:<7d")) == [1, 4]
+    assert ids(run("completed:>7d")) == [2]
+
+def test_negation_and_choices():
+    assert ids(run("-category:Personal")) == [1, 2, 5]
+    assert ids(run("category:personal,HEALTH")) == [3, 4, 5]
+    assert ids(run("-category:Work est:>=1h")) == [4]
+
+def test_completed_flags_mean_status():
+    assert str(query.compile_query("completed:no")) == "status:open"
+    assert ids(run("completed:no")) == [3, 5]
+    assert ids(run("completed:yes")) == [1, 2, 4]
+
+def test_the_most_selective_index_is_used():
+    result = run("category:Health status:open")
+    
+    assert ids(result) == [5]
+    assert "Access: category:health index (1 candidates)" in result.steps
+    assert "Filter: status:open" in result.steps
+
+def test_full_text_matches_drive_access_and_order():
+    result = run("category:Work,Personal report", text_search=lambda words: [(4, 2.0), (1, 1.0), (9, 0.5)])
+    
+    assert [t["id"] for t in result.tasks] == [4, 1]
+    assert "Access: full-text matches (2 hot candidates)" in result.steps
+    assert "Order: relevance" in result.steps
+    with pytest.raises(ValueError):
+        run("report")
+
+def test_archive_segments_are_pruned_by_their_index_entries(tmp_path):
+    directory = str(tmp_path / "archive")
+    archived = [task(10, created="2024-01-05", completed_days_ago=600),
+                task(11, "Personal", created="2024-02-05", completed_days_ago=600)]
+    archive.compact(directory, archived, "9999-12-31", 3)
+    
+    result = run("created:>=2024-02-01 created:<2024-03-01", archive_dir=directory)
+    
+    assert ids(result) == [11]
+    assert result.archived_ids == {11}
+    assert "Archive: reading 1 of 2 segments" in result.steps
+    assert ids(run("category:Health", archive_dir=directory)) == [5]
+
+def test_malformed_expressions_are_rejected():
+    for expression in ["colour:red", "est:>soon", "status:maybe", "-report", "priority:>High"]:
+        with pytest.raises(ValueError):
+            query.compile_query(expression)
+
+def test_query_cache_keeps_recent_results_per_version():
+    cache = query.QueryCache(size=2)
+    plans = [query.compile_query(e) for e in ("status:open", "category:Work", "est:>1h")]
+    for plan in plans:
+        cache.put(plan, 1, run(str(plan)))
+    
+    assert cache.get(plans[0], 1) is None
+    assert ids(cache.get(query.compile_query("est:>60m"), 1)) == [4]
+    assert cache.get(plans[1], 2) is None
@@ -0,0 +1,41 @@
+import io
+import os
+
+import terminaltodo
+
+class Terminal(io.StringIO):
+    def isatty(self):
+        return True
+    
+    def fileno(self):
+        return 1
+
+def renderer(monkeypatch, answers, columns=80, lines=24):
+    monkeypatch.setattr(terminaltodo.os, "get_terminal_size", lambda fd: os.terminal_size((columns, lines)))
+    answers = iter(answers)
+    monkeypatch.setattr("builtins.input", lambda: next(answers))
+    return terminaltodo.Renderer(Terminal())
+
+def test_answers_stay_in_the_frame_between_prompts(monkeypatch):
+    screen = renderer(monkeypatch, ["Write report", "Work"])
+    screen.begin()
+    screen.print("New task")
+    
+    assert screen.input("Description: ") == "Write report"
+    written = len(screen.stream.getvalue())
+    assert screen.input("Category: ") == "Work"
+    
+    # Only the new prompt is painted, on the row below the first answer
+    assert screen.stream.getvalue()[written:] == "\033[3;1HCategory: \033[K"
+    assert screen.previous == ["New task", "Description: Write report", "Category: Work", ""]
+
+def test_wrapped_answer_forces_a_full_redraw(monkeypatch):
+    screen = renderer(monkeypatch, ["x" * 100], columns=40)
+    screen.begin()
+    screen.print("New task")
+    screen.input("Description: ")
+    
+    assert screen.previous is None
+    screen.print("Saved")
+    screen.flush()
+    assert screen.stream.getvalue().endswith(terminaltodo.Renderer.CLEAR + "New task\nDescription: " + "x" * 100 + "\nSaved\n")
@@ -0,0 +1,33 @@
+from datetime import date
+
+import terminaltodo
+from schema import normalize_task
+
+def task(category, *sessions):
+    return normalize_task({
+        "id": 1, "task": "focus", "category": category, "due_date": "2024-01-08",
+        "time_sessions": [{"start_time": start, "end_time": end, "duration": minutes} for start, end, minutes in sessions]
+    })
+
+def test_hourly_figures_split_sessions_like_the_heatmap():
+    accumulator = terminaltodo.ReportAccumulator(today=date(2024, 1, 8))
+    accumulator.add(task("Work", ("2024-01-08T09:30:00", "2024-01-08T11:15:00", 105)))
+    
+    p = accumulator.results()["productivity"]
+    
+    assert p["best_hour"] == 10
+    assert p["by_hour"][9:12] == [30, 60, 15]
+    assert p["heatmap"]["minutes"][0][9:12] == [30, 60, 15]
+    assert p["by_weekday"]["Mon"] == p["total_tracked"] == 105
+
+def test_sessions_across_midnight_count_on_both_weekdays():
+    accumulator = terminaltodo.ReportAccumulator(today=date(2024, 1, 8))
+    accumulator.add(task("Work", ("2024-01-07T23:00:00", "2024-01-08T01:00:00", 60)))
+    accumulator.add(task("Home", ("2024-01-08T20:00:00", "2024-01-08T20:30:00", 30)))
+    
+    p = accumulator.results()["productivity"]
+    
+    assert p["by_weekday"]["Sun"] == 30
+    assert p["by_weekday"]["Mon"] == 60
+    assert list(p["heatmap"]["by_category"]) == ["Work", "Home"]
+    assert "Tracked time by hour of week" in terminaltodo.render_report("productivity", accumulator.results())
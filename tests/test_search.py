@@ -0,0 +1,110 @@
+import copy
+
+import search
+from schema import normalize_task
+
+def task(task_id, description, notes="", created="2026-10-01", **fields):
+    return normalize_task(dict({"id": task_id, "description": description, "notes": notes,
+                                "created_at": f"{created}T09:00:00", "due_date": created}, **fields))
+
+TASKS = [
+    task(1, "Review budget", category="Work", priority="High"),
+    task(2, "Call plumber", notes="ask about the budget", category="Home"),
+    task(3, "Review pull requests", category="Work", completed=True, created="2026-10-10"),
+    task(4, "Buy groceries", subtasks=[{"id": 1, "description": "budget coffee", "completed": False}])
+]
+
+def index_of(tasks):
+    index = search.SearchIndex()
+    index.sync(tasks)
+    return index
+
+def ids(results):
+    return [task_id for task_id, _ in results]
+
+def test_description_matches_rank_above_subtasks_and_notes():
+    total, results = index_of(TASKS).search("budget")
+    
+    assert total == 3
+    assert ids(results) == [1, 4, 2]
+
+def test_only_the_last_term_matches_as_a_prefix():
+    index = index_of(TASKS)
+    
+    assert ids(index.search("review bud")[1]) == [1]
+    assert index.search("rev budget") == (0, [])
+
+def test_filters_combine_with_the_text_match():
+    index = index_of(TASKS)
+    
+    assert ids(index.search("review", category="Work", completed=False)[1]) == [1]
+    assert ids(index.search("review", since="2026-10-05")[1]) == [3]
+    assert ids(index.search("budget", priority="High")[1]) == [1]
+    assert index.search("budget", category="Garden") == (0, [])
+
+def test_sync_reindexes_edits_and_drops_deleted_tasks():
+    tasks = copy.deepcopy(TASKS)
+    index = index_of(tasks)
+    tasks[0]["description"] = "Review forecast"
+    del tasks[1]
+    
+    assert index.sync(tasks) == 2
+    assert ids(index.search("budget")[1]) == [4]
+    assert ids(index.search("forecast")[1]) == [1]
+    assert "plumber" not in index.postings
+    assert index.sync(tasks) == 0
+
+def test_sync_with_changed_ids_only_touches_those_tasks():
+    tasks = copy.deepcopy(TASKS)
+    index = index_of(tasks)
+    tasks[0]["description"] = "Review forecast"
+    # Edited without being reported, so it stays as indexed
+    tasks[2]["description"] = "Merge pull requests"
+    new = task(5, "Forecast review")
+    
+    assert index.sync([tasks[0], new], changed={1, 2, 5}) == 3
+    assert sorted(ids(index.search("forecast")[1])) == [1, 5]
+    assert 2 not in index.docs
+    assert ids(index.search("review pull")[1]) == [3]
+
+def test_removing_a_task_keeps_prefix_lookups_in_step():
+    index = index_of(TASKS)
+    assert ids(index.search("pl")[1]) == [2]
+    
+    index.remove(2)
+    index.add(task(6, "Plan trip"))
+    
+    assert ids(index.search("pl")[1]) == [6]
+    assert "plumber" not in index.postings
+
+def test_archived_tasks_can_be_excluded():
+    index = index_of(TASKS)
+    index.sync(TASKS, [("2026-09.jsonl.gz", [task(7, "Review budget 2025", created="2025-09-01")])])
+    
+    assert ids(index.search("budget", archived=False)[1]) == [1, 4, 2]
+    assert index.search("budget")[0] == 4
+    assert index.is_archived(7)
+
+def test_limited_search_ranks_only_the_newest_matches(monkeypatch):
+    monkeypatch.setattr(search, "MAX_SCORED", 2)
+    index = index_of(TASKS)
+    
+    total, results = index.search("budget")
+    
+    assert total == 3
+    assert sorted(ids(results)) == [2, 4]
+    assert ids(index.search("budget", limit=None)[1]) == [1, 4, 2]
+
+def test_index_persists_with_its_stamp(tmp_path):
+    path = str(tmp_path / "tasks.json.search")
+    index = index_of(TASKS)
+    index.stamp = [1, 2, 0]
+    search.save(index, path)
+    
+    loaded = search.load(path)
+    
+    assert loaded.stamp == [1, 2, 0]
+    assert loaded.search("review") == index.search("review")
+    loaded.version = search.INDEX_VERSION - 1
+    search.save(loaded, path)
+    assert search.load(path).docs == {}
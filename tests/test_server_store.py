@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import server
+import terminaltodo
+
+@pytest.fixture
+def data_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "tasks.json")
+    monkeypatch.setattr(terminaltodo, "DATA_FILE", path)
+    store = terminaltodo.TaskStore.load()
+    store.add_task("first")
+    store.save()
+    return path
+
+def descriptions(path):
+    with open(path) as f:
+        return sorted(task["description"] for task in json.load(f)["tasks"])
+
+def test_delayed_save_keeps_other_writers_changes(data_file):
+    task_server = server.TaskServer(server.ServerStore.load())
+    task_server.store.add_task("from the server")
+    
+    other = terminaltodo.TaskStore.load()
+    other.add_task("from the terminal")
+    other.complete_task(1)
+    other.save()
+    
+    task_server.save()
+    
+    assert descriptions(data_file) == ["first", "from the server", "from the terminal"]
+    assert task_server.store.tasks_by_id[1]["completed"]
+    assert len({task["id"] for task in task_server.store.data["tasks"]}) == 3
+
+def test_replacing_the_document_keeps_other_writers_changes(data_file):
+    task_server = server.TaskServer(server.ServerStore.load())
+    document = json.loads(json.dumps(task_server.store.data))
+    document["tasks"][0]["notes"] = "edited over PUT"
+    
+    other = terminaltodo.TaskStore.load()
+    other.add_task("from the terminal")
+    other.save()
+    
+    task_server.put_data({}, json.dumps(document).encode("utf-8"))
+    task_server.save()
+    
+    assert descriptions(data_file) == ["first", "from the terminal"]
+    assert task_server.store.tasks_by_id[1]["notes"] == "edited over PUT"
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import sessionstore
+
+def task(task_id, category, *sessions):
+    return {
+        "id": task_id,
+        "category": category,
+        "time_spent": sum(duration for _, _, duration in sessions),
+        "time_sessions": [{"session_id": i, "start_time": start, "end_time": end, "duration": duration}
+                          for i, (start, end, duration) in enumerate(sessions, 1)]
+    }
+
+TASKS = [
+    task(1, "Work", ("2026-10-12T09:30:00", "2026-10-12T11:15:00", 105)),
+    task(2, "Home", ("2026-10-13T18:00:00", "2026-10-13T18:30:00", 30)),
+    task(3, "Work", ("2026-10-14T10:00:00", "2026-10-14T10:45:00", 45),
+         ("2026-10-15T14:00:00", "2026-10-15T15:00:00", 60)),
+    task(4, "Study", ("2026-10-16T20:00:00", "2026-10-16T21:00:00", 60))
+]
+START, END = datetime(2026, 10, 12), datetime(2026, 10, 19)
+
+def test_layers_answer_like_one_store(tmp_path):
+    path = str(tmp_path / "sessions")
+    sessionstore.build(path, TASKS)
+    whole = sessionstore.SessionStore(path)
+    sessionstore.build(path + ".archive", TASKS[2:])
+    layered = sessionstore.LayeredStore([sessionstore.RowCache().columns(TASKS[:2]),
+                                         sessionstore.SessionStore(path + ".archive")])
+    
+    assert layered.minutes_between(START, END) == whole.minutes_between(START, END) == 300
+    assert np.array_equal(layered.daily_minutes(START, 7), whole.daily_minutes(START, 7))
+    assert sorted(layered.categories) == sorted(whole.categories)
+    for name in whole.categories:
+        assert np.allclose(layered.hour_of_week(START, END)[layered.categories.index(name)],
+                           whole.hour_of_week(START, END)[whole.categories.index(name)])
+    assert list(layered.task_sessions(3)["duration"]) == [45, 60]
+
+def test_row_cache_rereads_changed_tasks_only():
+    cache = sessionstore.RowCache()
+    tasks = [dict(t, time_sessions=list(t["time_sessions"])) for t in TASKS]
+    cache.columns(tasks)
+    kept = cache.rows[2][1]
+    
+    tasks[0]["time_sessions"].append({"session_id": 2, "start_time": "2026-10-17T08:00:00"})
+    columns = cache.columns(tasks)
+    
+    assert cache.rows[2][1] is kept
+    assert len(columns.task_sessions(1)) == 2 and columns.task_sessions(1)["end"][-1] == -1
+    assert columns.minutes_between(START, END) == 300